@@ -1,8 +1,14 @@
 import os
 import json
+import asyncio
+import time
 import google.generativeai as genai
 from dotenv import load_dotenv
-from utils.indicators import simple_moving_average, rsi, macd, bollinger_bands, adx
+from utils.indicators import TECH_INDICATORS, IndicatorFrame
+from utils.cache import content_key, get_cache
+from utils.circuit_breaker import get_breaker
+from utils.prompt_builder import build_analysis_prompt
+from utils.singleflight import AsyncSingleFlight, register
 
 load_dotenv()
 
@@ -15,23 +21,109 @@ else:
 
 # Use a model that supports JSON mode or structured output if possible, 
 # otherwise we'll use prompt engineering.
-model = genai.GenerativeModel('gemini-2.0-flash')
+MODEL_NAME = 'gemini-2.0-flash'
+model = genai.GenerativeModel(MODEL_NAME)
+
+# Bump whenever the prompt text or its inputs change shape, so cached answers
+# from the old prompt are not reused.
+PROMPT_VERSION = 2
+
+# Answers are cached by a hash of the exact model inputs; a new bar or
+# headline changes the inputs and so the key. TTL and size come from
+# AI_CACHE_TTL / AI_CACHE_SIZE (see utils.cache.POLICIES).
+ai_cache = get_cache("ai_recommendation")
+
+# Gemini calls are awaited on the event loop (generate_content_async), capped
+# at AI_MAX_CONCURRENCY in flight; each call, including time spent queued for
+# a slot, must finish within AI_TIMEOUT seconds or we fall back to "Hold".
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "20"))
+
+_ai_flight = register("ai_service.getAIRecommendation", AsyncSingleFlight("getAIRecommendation"))
+
+_slots = None
+_slots_loop = None
+_stats = {
+    "in_flight": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "completed": 0,
+    "timeouts": 0,
+    "errors": 0,
+    "prompt_tokens_total": 0,
+    "last_prompt_tokens": None,
+}
+
+
+def ai_stats():
+    return {**_stats, "max_concurrency": AI_MAX_CONCURRENCY, "timeout": AI_TIMEOUT, "cache": ai_cache.stats()}
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
+
+
+async def _generate(prompt: str, on_token=None) -> str:
+    """Model output for `prompt`; with `on_token`, streamed and passed on chunk by chunk."""
+    queued = True
+    _stats["queued"] += 1
+    _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+    try:
+        async with _get_slots():
+            _stats["queued"] -= 1
+            queued = False
+            _stats["in_flight"] += 1
+            try:
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config={"response_mime_type": "application/json"},
+                    stream=on_token is not None,
+                )
+                if on_token is None:
+                    return response.text
+                parts = []
+                async for chunk in response:
+                    parts.append(chunk.text)
+                    on_token(chunk.text)
+                return "".join(parts)
+            finally:
+                _stats["in_flight"] -= 1
+    finally:
+        if queued:
+            _stats["queued"] -= 1
+
+
+def _fallback(reason: str):
+    return {
+        "recommendation": "Hold",
+        "confidence": 0.5,
+        "reasoning": f"{reason}. Defaulting to 'Hold'."
+    }
 
-async def getAIRecommendation(stock_data, fundamentals, news):
+async def getAIRecommendation(stock_data, fundamentals, news, frame=None, indicators=None, on_token=None,
+                              refresh=False):
     """
     Analyzes stock data using Google Gemini to provide a recommendation.
+    Pass the IndicatorFrame built by the caller to skip re-parsing stock_data,
+    or `indicators` (TECH_INDICATORS values, e.g. from the nightly snapshot)
+    to skip computing them. `on_token(text)` receives the model's answer as it
+    is generated (not called for cached answers or when joining an identical
+    call already in flight). `refresh` skips the cached answer, so the entry
+    is renewed (services.warmer uses it ahead of expiry).
     """
     # Calculate Technical Indicators
-    tech_ind = {
-        "SMA_20": simple_moving_average(stock_data, 20),
-        "SMA_50": simple_moving_average(stock_data, 50),
-        "SMA_200": simple_moving_average(stock_data, 200),
-        "RSI": rsi(stock_data),
-        "MACD": macd(stock_data),
-        "Bollinger": bollinger_bands(stock_data),
-        "ADX": adx(stock_data),
-        "Volume_Trend": "Neutral" # Placeholder, could be improved
-    }
+    if indicators is not None:
+        tech_ind = dict(indicators)
+    else:
+        if frame is None:
+            frame = IndicatorFrame(stock_data)
+        tech_ind = frame.compute(TECH_INDICATORS)
+    tech_ind["Volume_Trend"] = "Neutral" # Placeholder, could be improved
     
     # Infer Volume Trend
     if len(stock_data) >= 20:
@@ -65,52 +157,38 @@ async def getAIRecommendation(stock_data, fundamentals, news):
         else:
             market_regime = "Bear"
 
-    prompt = f"""
-    **EDUCATIONAL PURPOSE ONLY**: This analysis is a simulation for educational purposes.
-
-    You are a **Decisive Financial Analysis Engine**. 
-    Your goal is to provide a clear **Buy, Sell, or Hold** recommendation based on the weight of evidence.
-
-    **INPUT DATA**:
-    - **Price History**: {json.dumps(stock_data[:30])}
-    - **Technical Indicators**: {json.dumps(tech_ind)}
-    - **Fundamentals**: {json.dumps(fund_input)}
-    - **News & Sentiment**: {json.dumps(news_input)}
-    - **Context**: Sector Trend="Neutral", Market Regime="{market_regime}"
-
-    **DECISION LOGIC (WEIGHTED RESOLUTION)**:
-    1.  **Do NOT default to "Hold"** just because signals conflict. You MUST resolve the conflict.
-    2.  **Trend Priority**: If the Medium-Term Trend (SMA50, MACD) is strong, follow the trend for the Recommendation (Buy/Sell).
-    3.  **Fundamental Impact**: Use Fundamentals to adjust the **Confidence Score**, not to block the trade. 
-        - *Example*: Strong Uptrend + Weak Fundamentals = **"Buy"** (with Low Confidence/Speculative warning).
-        - *Example*: Strong Downtrend + Strong Fundamentals = **"Sell"** (Price action leads).
-    4.  **"Hold" Criteria**: ONLY recommend "Hold" if the market is truly ranging/sideways (e.g., ADX < 20, Flat SMAs) with no clear directional bias.
-
-    **SCORING GUIDE**:
-    - **Strong Buy**: Bullish Trend + Bullish Fundamentals + Positive News.
-    - **Buy**: Bullish Trend (even if Fundamentals are mixed).
-    - **Sell**: Bearish Trend (even if Fundamentals are mixed).
-    - **Strong Sell**: Bearish Trend + Bearish Fundamentals + Negative News.
-    - **Hold**: Neutral Trend / Sideways Market.
-
-    **OUTPUT FORMAT (STRICT JSON)**:
-    {{
-      "recommendation": "Strong Buy" | "Buy" | "Hold" | "Sell" | "Strong Sell",
-      "confidence": 0.0 to 1.0,
-      "reasoning": "Explain the decision. If signals conflict, explain why the Trend won out (e.g., 'Despite weak fundamentals, the strong technical breakout dictates a speculative Buy')."
-    }}
-
-    Return ONLY the JSON.
-    """
+    cache_key = content_key(PROMPT_VERSION, MODEL_NAME, stock_data[:30], tech_ind, fund_input, news_input, market_regime)
+    cached = None if refresh else ai_cache.get(cache_key)
+    if isinstance(cached, dict):
+        return dict(cached)
+
+    # Identical concurrent requests share one Gemini call; each caller gets
+    # its own copy of the (cached) answer
+    return dict(await _ai_flight.do(cache_key, _ask_model, cache_key, stock_data, tech_ind, fund_input, news_input,
+                                    market_regime, on_token))
 
+
+async def _ask_model(cache_key, stock_data, tech_ind, fund_input, news_input, market_regime, on_token=None):
+    prompt, prompt_tokens = build_analysis_prompt(stock_data, tech_ind, fund_input, news_input, market_regime)
+    _stats["last_prompt_tokens"] = prompt_tokens
+    _stats["prompt_tokens_total"] += prompt_tokens["total"]
+
+    breaker = get_breaker("gemini")
+    if not breaker.allow():
+        return _fallback("AI service temporarily unavailable (too many recent failures)")
+    started = time.monotonic()
     try:
         # Gemini generation
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
-        
-        content = response.text
+        try:
+            content = await asyncio.wait_for(_generate(prompt, on_token), AI_TIMEOUT)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        breaker.record(True, time.monotonic() - started)
+        _stats["completed"] += 1
         print(f"DEBUG: Raw Gemini content: {content!r}")
         
         # Clean up markdown code blocks if present (though response_mime_type should handle it)
@@ -119,13 +197,19 @@ async def getAIRecommendation(stock_data, fundamentals, news):
         elif "```" in content:
             content = content.split("```")[1].split("```")[0].strip()
             
-        return json.loads(content)
+        result = json.loads(content)
+        if not isinstance(result, dict):
+            raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+        ai_cache.set(cache_key, result)
+        return result
+
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        print(f"AI recommendation timed out after {AI_TIMEOUT}s")
+        return _fallback(f"AI analysis timed out after {AI_TIMEOUT:g}s")
 
     except Exception as e:
+        _stats["errors"] += 1
         print(f"AI recommendation error: {e}")
         # Return a default or error response
-        return {
-            "recommendation": "Hold",
-            "confidence": 0.5,
-            "reasoning": f"AI analysis failed due to an error: {str(e)}. Defaulting to 'Hold'."
-        }
\ No newline at end of file
+        return _fallback(f"AI analysis failed due to an error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Backtest a recommendation rule over the universe, sweeping its parameters.
+
+    python -m jobs.backtest --rule rsi --param period=7,14,21 --param lower=20,30
+    python -m jobs.backtest --rule sma --param short_window=10,20 --param long_window=50,100 --short
+
+Each worker process loads a chunk of symbols' full stored history as one
+symbols x bars frame and runs every parameter combination on it
+(utils/backtest.py), so per symbol the prices are read once and each
+indicator is computed once per distinct parameter. Per-symbol results are
+aggregated per combination (mean and median over symbols with trades),
+ranked by --sort and printed; --out writes them all as JSON. If a chunk
+fails the ranking is still printed but marked incomplete, --out is not
+written and the job exits non-zero.
+"""
+import argparse
+import inspect
+import itertools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import orjson
+
+from services.price_store import canonical_symbol, store
+from utils.backtest import RULES, backtest
+from utils.ohlcv import stack_frame
+
+CHUNK_SIZE = 200
+METRICS = ["total_return", "annual_return", "sharpe", "max_drawdown", "hit_rate", "trades", "exposure", "buy_hold_return"]
+
+
+def _parse_value(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def rule_params(rule: str) -> List[str]:
+    """The keyword parameters --param may sweep for `rule`."""
+    return [name for name in inspect.signature(RULES[rule]).parameters if name not in ("frame", "short")]
+
+
+def param_grid(specs: List[str], rule: str) -> List[Dict]:
+    """["period=7,14", "lower=20,30"] -> every combination as keyword dicts for `rule`."""
+    allowed = rule_params(rule)
+    names, values = [], []
+    for spec in specs:
+        name, _, raw = spec.partition("=")
+        if not raw:
+            raise ValueError(f"Bad --param {spec!r}, expected name=v1,v2,...")
+        name = name.strip()
+        if name not in allowed:
+            raise ValueError(f"Unknown --param {name!r} for rule {rule} (expected one of: {', '.join(allowed)})")
+        names.append(name)
+        values.append([_parse_value(v.strip()) for v in raw.split(",") if v.strip()])
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def run_chunk(symbols: List[str], rule: str, grid: List[Dict], cost_bps: float, short: bool) -> Dict:
+    """Per-symbol metrics for every parameter set: {"symbols": [...], "results": [{metric: [...]}]}."""
+    loaded = [(s, store.read(s)) for s in symbols]
+    loaded = [(s, series) for s, series in loaded if len(series) > 1]
+    if not loaded:
+        return {"symbols": [], "results": [{} for _ in grid]}
+    frame = stack_frame([series for _, series in loaded])
+    results = []
+    for params in grid:
+        positions = RULES[rule](frame, **params, short=short)
+        metrics = backtest(frame.close, positions, cost_bps)
+        results.append({name: metrics[name].tolist() for name in METRICS})
+    return {"symbols": [s for s, _ in loaded], "results": results}
+
+
+def _summary(values: np.ndarray) -> Dict:
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"mean": None, "median": None}
+    return {"mean": round(float(values.mean()), 4), "median": round(float(np.median(values)), 4)}
+
+
+def run(symbols: List[str], rule: str, grid: List[Dict], cost_bps: float = 0.0, short: bool = False,
+        workers: int | None = None, chunk: int = CHUNK_SIZE) -> Tuple[List[Dict], List[str]]:
+    """Aggregated rows per parameter set, and the symbols of chunks that failed."""
+    symbols = list(dict.fromkeys(canonical_symbol(s) for s in symbols))
+    chunks = [symbols[i:i + chunk] for i in range(0, len(symbols), chunk)]
+    per_symbol: List[Dict[str, Dict[str, float]]] = [{} for _ in grid]
+    start = time.monotonic()
+    done = 0
+    failed: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_chunk, c, rule, grid, cost_bps, short): c for c in chunks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"backtest: chunk failed: {e!r}", flush=True)
+                failed.extend(futures[future])
+                result = {"symbols": [], "results": [{} for _ in grid]}
+            for i, metrics in enumerate(result["results"]):
+                for j, symbol in enumerate(result["symbols"]):
+                    per_symbol[i][symbol] = {name: values[j] for name, values in metrics.items()}
+            done += len(futures[future])
+            print(f"backtest: {done}/{len(symbols)} symbols x {len(grid)} parameter sets "
+                  f"({time.monotonic() - start:.1f}s)", flush=True)
+
+    rows = []
+    for params, results in zip(grid, per_symbol):
+        traded = [r for r in results.values() if r["trades"] > 0]
+        rows.append({
+            "params": params,
+            "symbols": len(results),
+            "traded": len(traded),
+            **{name: _summary(np.array([r[name] for r in traded], dtype=float)) for name in METRICS},
+            "per_symbol": results,
+        })
+    return rows, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest a recommendation rule over many symbols.")
+    parser.add_argument("--rule", choices=sorted(RULES), default="rsi")
+    parser.add_argument("--param", action="append", default=[], help="name=v1,v2,... (repeatable; swept as a grid)")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: every symbol in the price store)")
+    parser.add_argument("--short", action="store_true", help="Go short on sell signals instead of flat")
+    parser.add_argument("--cost-bps", type=float, default=10.0, help="Cost per unit of position change, in basis points")
+    parser.add_argument("--sort", choices=METRICS, default="sharpe", help="Rank parameter sets by this metric's median")
+    parser.add_argument("--top", type=int, default=10, help="Parameter sets to print")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="Symbols per worker task")
+    parser.add_argument("--out", type=Path, help="Write every parameter set's results (with per-symbol metrics) as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        grid = param_grid(args.param, args.rule)
+    except ValueError as e:
+        parser.error(str(e))
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] if args.symbols else store.symbols()
+    if not symbols:
+        print("backtest: no symbols (the price store is empty; pass --symbols)")
+        return 1
+
+    start = time.monotonic()
+    rows, failed = run(symbols, args.rule, grid, args.cost_bps, args.short, args.workers, args.chunk)
+    rows.sort(key=lambda r: -float("inf") if r[args.sort]["median"] is None else r[args.sort]["median"], reverse=True)
+    print(f"backtest: {args.rule} over {len(symbols)} symbols, {len(grid)} parameter sets in "
+          f"{time.monotonic() - start:.1f}s (ranked by median {args.sort})")
+    for row in rows[:args.top]:
+        print(f"  {row['params']}: traded {row['traded']}/{row['symbols']}, "
+              f"return {row['total_return']['median']}, sharpe {row['sharpe']['median']}, "
+              f"max dd {row['max_drawdown']['median']}, hit rate {row['hit_rate']['median']}, "
+              f"buy&hold {row['buy_hold_return']['median']}")
+    if failed:
+        print(f"backtest: INCOMPLETE, {len(failed)} of {len(symbols)} symbols failed "
+              f"({', '.join(failed[:10])}{', ...' if len(failed) > 10 else ''}); not writing --out")
+        return 1
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_bytes(orjson.dumps(rows, option=orjson.OPT_SERIALIZE_NUMPY))
+        print(f"backtest: wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
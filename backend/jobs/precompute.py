@@ -0,0 +1,173 @@
+"""
+Nightly precompute of recommendations across the universe.
+
+    python -m jobs.precompute [--symbols A,B] [--workers N] [--no-refresh]
+
+Run from the backend directory after the close. Steps:
+
+1. refresh: bring every symbol's stored prices up to the last session (bulk
+   yfinance download, NSE for misses; Alpha Vantage is left to users);
+2. gather each symbol's fundamentals from the provider caches (or fetch them
+   with --fetch-fundamentals);
+3. spread the symbols, in chunks, over a process pool; each worker computes
+   indicators (one 2-D pass per chunk), the basic recommendation and the
+   fundamentals analysis from the price store;
+4. write the snapshot the API reads (services/snapshot.py).
+
+Finished symbols are appended to a checkpoint file next to the snapshot, so
+an interrupted run started again for the same session resumes where it
+stopped (--fresh ignores it). If a chunk fails (a worker crashing takes
+the pool down with it) the snapshot is left as it was, the checkpoint is
+kept and the job exits non-zero; running it again computes only the
+symbols that are still missing.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import orjson
+
+from services.price_providers import fetch_prices_batch
+from services.price_store import DEFAULT_DAYS, canonical_symbol, load_prices_batch_async, store
+from services.screener import cached_fundamentals
+from services.snapshot import SNAPSHOT_PATH, compute_entries
+from services.yfinance_service import fetch_yf_fundamentals
+from utils.market_hours import last_session_date
+
+REFRESH_ORDER = ["yfinance", "nse"]
+REFRESH_CHUNK = 100
+CHUNK_SIZE = 50
+
+
+def _checkpoint_path(out: Path) -> Path:
+    return out.with_suffix(".partial.jsonl")
+
+
+def _read_checkpoint(path: Path, as_of: str) -> Dict[str, Dict]:
+    """Entries already computed for session `as_of`; a run for another session is discarded."""
+    done: Dict[str, Dict] = {}
+    try:
+        with open(path, 'rb') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return done
+    try:
+        if not lines or orjson.loads(lines[0]).get("as_of") != as_of:
+            return done
+    except ValueError:
+        return done
+    for line in lines[1:]:
+        try:
+            entry = orjson.loads(line)
+        except ValueError:
+            continue  # torn last line from an interrupted run
+        done[entry["symbol"]] = entry
+    return done
+
+
+def _write_snapshot(out: Path, as_of: str, entries: Dict[str, Dict]):
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    tmp.write_bytes(orjson.dumps({
+        "as_of": as_of,
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "symbols": entries,
+    }))
+    os.replace(tmp, out)
+
+
+def refresh_prices(symbols: List[str], days: int = DEFAULT_DAYS):
+    async def run():
+        for i in range(0, len(symbols), REFRESH_CHUNK):
+            group = symbols[i:i + REFRESH_CHUNK]
+            await load_prices_batch_async(group, lambda g, d: fetch_prices_batch(g, d, REFRESH_ORDER), days)
+            print(f"precompute: refreshed {min(i + REFRESH_CHUNK, len(symbols))}/{len(symbols)} symbols", flush=True)
+    asyncio.run(run())
+
+
+def gather_fundamentals(symbols: List[str], fetch: bool = False, threads: int = 8) -> Dict[str, Dict | None]:
+    if not fetch:
+        return {s: cached_fundamentals(s) for s in symbols}
+    with ThreadPoolExecutor(threads) as pool:
+        fetched = dict(zip(symbols, pool.map(fetch_yf_fundamentals, symbols)))
+    return {s: fetched[s] or cached_fundamentals(s) for s in symbols}
+
+
+def run(symbols: List[str], out: Path = SNAPSHOT_PATH, workers: int | None = None, chunk: int = CHUNK_SIZE,
+        refresh: bool = True, fetch_fundamentals: bool = False,
+        fresh: bool = False) -> Tuple[Dict[str, Dict], List[str]]:
+    """Compute and write the snapshot; returns the entries and the symbols of chunks that failed."""
+    as_of = last_session_date().isoformat()
+    symbols = list(dict.fromkeys(canonical_symbol(s) for s in symbols))
+    checkpoint = _checkpoint_path(out)
+    done = {} if fresh else _read_checkpoint(checkpoint, as_of)
+    todo = [s for s in symbols if s not in done]
+    print(f"precompute: session {as_of}, {len(symbols)} symbols, {len(done)} already done", flush=True)
+
+    if todo and refresh:
+        refresh_prices(todo)
+    fundamentals = gather_fundamentals(todo, fetch_fundamentals) if todo else {}
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if not done:
+        checkpoint.write_bytes(orjson.dumps({"as_of": as_of}) + b"\n")
+    chunks = [[(s, fundamentals[s]) for s in todo[i:i + chunk]] for i in range(0, len(todo), chunk)]
+    start = time.monotonic()
+    finished = 0
+    failed: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(checkpoint, 'ab') as log:
+        futures = {pool.submit(compute_entries, items): [s for s, _ in items] for items in chunks}
+        for future in as_completed(futures):
+            try:
+                entries = future.result()
+            except Exception as e:
+                print(f"precompute: chunk failed: {e!r}", flush=True)
+                failed.extend(futures[future])
+                entries = []
+            for entry in entries:
+                done[entry["symbol"]] = entry
+                log.write(orjson.dumps(entry) + b"\n")
+            log.flush()
+            finished += len(futures[future])
+            elapsed = time.monotonic() - start
+            rate = finished / elapsed if elapsed else 0.0
+            eta = (len(todo) - finished) / rate if rate else 0.0
+            print(f"precompute: {finished}/{len(todo)} symbols ({rate:.0f}/s, ~{eta:.0f}s left)", flush=True)
+
+    if failed:
+        print(f"precompute: {len(failed)} symbols failed ({', '.join(failed[:10])}"
+              f"{', ...' if len(failed) > 10 else ''}); kept {checkpoint}, run again to retry them", flush=True)
+        return done, failed
+    _write_snapshot(out, as_of, done)
+    checkpoint.unlink(missing_ok=True)
+    print(f"precompute: wrote {len(done)} symbols to {out}", flush=True)
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute recommendations for the whole universe.")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: every symbol in the price store)")
+    parser.add_argument("--out", type=Path, default=SNAPSHOT_PATH, help="Snapshot file")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="Symbols per worker task")
+    parser.add_argument("--no-refresh", dest="refresh", action="store_false", help="Don't fetch missing price days first")
+    parser.add_argument("--fetch-fundamentals", action="store_true", help="Fetch fundamentals from yfinance instead of using cached ones")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] if args.symbols else store.symbols()
+    if not symbols:
+        print("precompute: no symbols (the price store is empty; pass --symbols)")
+        return 1
+    _, failed = run(symbols, args.out, args.workers, args.chunk, args.refresh, args.fetch_fundamentals, args.fresh)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
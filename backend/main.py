@@ -1,5 +1,9 @@
-from fastapi import FastAPI
+import os
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,8 +11,20 @@ load_dotenv()
 from routes.stock import router as stock_router
 from routes.predict import router as predict_router
 from routes.news import router as news_router
+from routes.screen import router as screen_router
+from routes.quotes import router as quotes_router
+from services import http_client, symbol_master
+from services.av_quota import quota as av_quota
+from services.snapshot import snapshot
+from services.warmer import warmer
+from services.quote_hub import hub as quote_hub
+from utils.cache import cache_stats, caches, invalidate
+from utils.circuit_breaker import breaker_states
+from utils.singleflight import single_flight_stats
 
-app = FastAPI(title="AI-Driven Indian Stock Market API")
+# orjson serializes several times faster than the stdlib encoder (and writes
+# NaN as null instead of failing)
+app = FastAPI(title="AI-Driven Indian Stock Market API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,10 +33,31 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Responses above GZIP_MIN_SIZE bytes are compressed for clients that accept it
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1000")),
+    compresslevel=int(os.getenv("GZIP_LEVEL", "5")),
+)
 
 app.include_router(stock_router, prefix="/api", tags=["stock"])
 app.include_router(predict_router, prefix="/api", tags=["predict"])
 app.include_router(news_router, prefix="/api", tags=["news"])
+app.include_router(screen_router, prefix="/api", tags=["screen"])
+app.include_router(quotes_router, prefix="/api", tags=["quotes"])
+
+
+@app.on_event("startup")
+async def startup():
+    symbol_master.start()
+    warmer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await warmer.stop()
+    await symbol_master.stop()
+    await http_client.aclose()
 
 
 @app.get("/")
@@ -28,3 +65,33 @@ def root():
     return {"status": "ok"}
 
 
+@app.get("/api/stats")
+def stats():
+    return {
+        "single_flight": single_flight_stats(),
+        "alpha_vantage_quota": av_quota.stats(),
+        "cache": cache_stats(),
+        "symbol_master": symbol_master.stats(),
+        "snapshot": snapshot.stats(),
+        "warmer": warmer.stats(),
+        "quotes": quote_hub.stats(),
+    }
+
+
+@app.delete("/api/cache")
+def clear_caches():
+    invalidate()
+    return {"cleared": sorted(caches)}
+
+
+@app.delete("/api/cache/{name}")
+def clear_cache(name: str):
+    if name not in caches:
+        raise HTTPException(status_code=404, detail=f"Unknown cache '{name}'")
+    invalidate(name)
+    return {"cleared": [name]}
+
+
+@app.get("/api/health/providers")
+def provider_health():
+    return breaker_states()
@@ -1,67 +1,201 @@
+import asyncio
+import functools
+import os
 from fastapi import APIRouter, HTTPException
-from services.alphavantage_service import fetch_daily_adjusted
+from fastapi.responses import StreamingResponse
 from services.recommendation_service import generate_recommendation
-from services.yfinance_service import fetch_yf_fundamentals, fetch_yf_daily
-from services.nse_service import fetch_nse_daily
-from ai_service import getAIRecommendation
-from services.news_service import fetch_news
+from services.yfinance_service import fetch_yf_fundamentals
+from ai_service import getAIRecommendation, ai_stats
+from services.price_store import load_prices_async, load_prices_batch_async
+from services.price_providers import fetch_prices, fetch_prices_batch
+from services.news_service import fetch_news_async
+from services.local_search_service import lookup_company_name, record_request
+from services.snapshot import snapshot
+from utils.batch import NDJSON, SSE, STREAM_HEADERS, ndjson_as_completed, parse_symbols, sse_event
+from utils.indicators import TECH_INDICATORS, batch_frames
 
 router = APIRouter()
 
 
+# Preferred price provider order; later ones are hedged in (see price_providers)
+PRICE_ORDER = ["yfinance", "alphavantage", "nse"]
+
+# Per-stage timeouts (seconds) for /predict
+PRICES_TIMEOUT = float(os.getenv("PREDICT_PRICES_TIMEOUT", "25"))
+FUNDAMENTALS_TIMEOUT = float(os.getenv("PREDICT_FUNDAMENTALS_TIMEOUT", "10"))
+NEWS_TIMEOUT = float(os.getenv("PREDICT_NEWS_TIMEOUT", "10"))
+
+
+@router.get("/ai/stats")
+def get_ai_stats():
+    return ai_stats()
+
+
+@router.get("/predict/batch")
+async def predict_batch(symbols: str):
+    """
+    /predict/{symbol} for many comma-separated symbols, streamed as NDJSON in
+    completion order. Prices arrive in one bulk download and the technical
+    indicators are computed for all symbols together in one 2-D pass; the
+    fundamentals, news and AI steps then run per symbol.
+    """
+    wanted = parse_symbols(symbols)
+    prices_task = asyncio.create_task(_stage("prices", _load_batch(wanted), PRICES_TIMEOUT, {}))
+
+    async def prices_for(symbol):
+        # shield: one symbol's job being cancelled must not cancel the shared load
+        return (await asyncio.shield(prices_task)).get(symbol, (None, None))
+
+    jobs = {s: functools.partial(_predict, s, functools.partial(prices_for, s)) for s in wanted}
+
+    async def stream():
+        try:
+            async for line in ndjson_as_completed(jobs):
+                yield line
+        finally:
+            prices_task.cancel()
+    return StreamingResponse(stream(), media_type=NDJSON, headers=STREAM_HEADERS)
+
+
+async def _load_batch(symbols):
+    loaded = await load_prices_batch_async(symbols, lambda group, days: fetch_prices_batch(group, days, PRICE_ORDER))
+    usable = [s for s in symbols if len(loaded[s])]
+    frames = batch_frames([loaded[s].frame() for s in usable])
+    return {s: (loaded[s], frame) for s, frame in zip(usable, frames)}
+
+
 @router.get("/predict/{symbol}")
 async def predict(symbol: str):
+    record_request(symbol)
     try:
-        # 1. Fetch technical data (prices)
-        # 1. Fetch technical data (prices) with fallback (YF -> AV -> NSE)
-        prices = []
+        return await _predict(symbol, functools.partial(_prices, symbol))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred for symbol {symbol}: {str(e)}")
+
+
+@router.get("/predict/{symbol}/stream")
+async def predict_stream(symbol: str):
+    """
+    /predict/{symbol} as Server-Sent Events, one per stage as soon as it is
+    ready (in completion order): prices, indicators, basic_recommendation,
+    fundamentals, news, then ai_token events while Gemini writes its answer
+    and ai_recommendation. Ends with done (the full /predict body) or error.
+    """
+    record_request(symbol)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event, data):
+        queue.put_nowait((event, data))
+
+    async def run():
+        try:
+            emit("done", await _predict(symbol, functools.partial(_prices, symbol), emit))
+        except Exception as e:
+            emit("error", {"detail": f"An error occurred for symbol {symbol}: {str(e)}"})
+        finally:
+            queue.put_nowait(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
         try:
-            prices = fetch_yf_daily(symbol)
-        except Exception:
-            pass
-        
-        if not prices:
-            try:
-                prices = fetch_daily_adjusted(symbol)
-            except Exception:
-                pass
-        
-        if not prices:
-            try:
-                prices = fetch_nse_daily(symbol)
-            except Exception:
-                pass
-                
-        if not prices:
+            while (item := await queue.get()) is not None:
+                yield sse_event(*item)
+        finally:
+            task.cancel()
+    return StreamingResponse(stream(), media_type=SSE, headers=STREAM_HEADERS)
+
+
+async def warm_prediction(symbol: str):
+    """
+    Run the /predict pipeline without a request, renewing its news and AI
+    cache entries even when they haven't expired yet (see services.warmer).
+    """
+    return await _predict(symbol, functools.partial(_prices, symbol), refresh=True)
+
+
+async def warm_news(symbol: str):
+    """Refetch the news /predict shows for `symbol`, renewing its cache entry (see services.warmer)."""
+    company_name = lookup_company_name(symbol)
+    if not company_name:
+        company_name = (await asyncio.to_thread(fetch_yf_fundamentals, symbol) or {}).get("name")
+    return await fetch_news_async.refresh(symbol, company_name)
+
+
+async def _prices(symbol: str):
+    # Fetch technical data (prices) from the local store, asking the
+    # providers (YF -> AV -> NSE) only for missing days
+    series = await _stage(
+        "prices", load_prices_async(symbol, lambda days: fetch_prices(symbol, days, PRICE_ORDER)), PRICES_TIMEOUT, None)
+    # Parse the series once; both recommendation layers share it
+    return series, series.frame() if series is not None and len(series) else None
+
+
+async def _predict(symbol: str, prices_stage, emit=None, refresh=False):
+    """
+    prices_stage() -> (PriceArrays, IndicatorFrame), or (None, None) when no
+    provider had data. `emit(event, data)`, if given, is told about each stage
+    as it completes (see predict_stream). `refresh` refetches the news and
+    the AI answer instead of using their cached entries.
+    """
+    on_token = (lambda text: emit("ai_token", {"text": text})) if emit else None
+    emit = emit or (lambda event, data: None)
+    # Prices, fundamentals and news are independent, so they run concurrently,
+    # each with its own timeout; only the AI step needs all three. News gets
+    # the company name from the local symbol list and only falls back to
+    # waiting for fundamentals when the symbol isn't listed there.
+    fundamentals_task = asyncio.create_task(_stage(
+        "fundamentals", asyncio.to_thread(fetch_yf_fundamentals, symbol), FUNDAMENTALS_TIMEOUT, {}))
+    news_task = asyncio.create_task(_stage(
+        "news", _fetch_news(symbol, fundamentals_task, refresh), NEWS_TIMEOUT, []))
+    for name, task in (("fundamentals", fundamentals_task), ("news", news_task)):
+        task.add_done_callback(lambda t, name=name: None if t.cancelled() else emit(name, t.result()))
+    try:
+        # 1. Technical data
+        series, frame = await prices_stage()
+        if series is None or not len(series):
             raise ValueError(f"Could not fetch price data for {symbol} from any source.")
-        basic_result = generate_recommendation(prices)
+        prices = series.to_records()
+        emit("prices", {"bars": len(prices), "from": prices[-1]["date"], "to": prices[0]["date"], "latest": prices[0]})
+        # The nightly snapshot already holds the CPU work for this bar
+        snap = snapshot.lookup(symbol, series)
+        indicators = snap["indicators"] if snap else frame.compute(TECH_INDICATORS)
+        emit("indicators", indicators)
+        basic_result = dict(snap["basic_recommendation"]) if snap else generate_recommendation(prices, frame)
         basic_result["symbol"] = symbol
         basic_result["error"] = None
+        emit("basic_recommendation", basic_result)
 
-        # 2. Fetch data needed for AI analysis
-        raw_fundamentals = {}
-        company_name = None
-        try:
-            raw_fundamentals = fetch_yf_fundamentals(symbol)
-            # Extract company name from fundamentals for better news search
-            company_name = raw_fundamentals.get("ShortName")
-        except Exception:
-            pass
-        news = []
-        try:
-            news = fetch_news(symbol, company_name)
-        except Exception:
-            pass  # News is optional
+        # 2. Data needed for AI analysis (already in flight)
+        raw_fundamentals, news = await asyncio.gather(fundamentals_task, news_task)
 
         # 3. Get AI-driven recommendation
-        ai_rec = await getAIRecommendation(prices, raw_fundamentals, news)
+        ai_rec = await getAIRecommendation(prices, raw_fundamentals, news, frame, indicators=indicators,
+                                           on_token=on_token, refresh=refresh)
+        emit("ai_recommendation", ai_rec)
 
         return {
             "symbol": symbol,
             "basic_recommendation": basic_result,
             "ai_recommendation": ai_rec
         }
+    finally:
+        fundamentals_task.cancel()
+        news_task.cancel()
+
+
+async def _stage(name: str, awaitable, timeout: float, default):
+    """Await one pipeline stage; on failure or timeout log it and degrade to `default`."""
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An error occurred for symbol {symbol}: {str(e)}")
+        print(f"predict: {name} stage failed: {e!r}")
+        return default
 
 
+async def _fetch_news(symbol: str, fundamentals_task: asyncio.Task, refresh: bool = False):
+    company_name = lookup_company_name(symbol)
+    if not company_name:
+        # shield: timing out the news stage must not cancel the fundamentals stage
+        company_name = (await asyncio.shield(fundamentals_task)).get("name")
+    fetch = fetch_news_async.refresh if refresh else fetch_news_async
+    return await fetch(symbol, company_name)
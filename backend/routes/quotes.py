@@ -0,0 +1,63 @@
+import asyncio
+import orjson
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.quote_hub import Subscriber, hub
+
+router = APIRouter()
+
+
+@router.websocket("/quotes/ws")
+async def quotes_ws(websocket: WebSocket, symbols: str | None = None):
+    """
+    Live quotes. Subscribe with ?symbols=A,B and/or by sending
+    {"action": "subscribe" | "unsubscribe", "symbols": [...]}.
+    Each symbol's first message carries the full quote, later ones only the
+    fields that changed: {"type": "quote", "symbol": ..., "price": ..., ...}.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+    send_lock = asyncio.Lock()
+
+    async def send(message):
+        async with send_lock:
+            await websocket.send_text(orjson.dumps(message, default=str).decode())
+
+    async def forward_quotes():
+        while True:
+            for symbol, fields in (await subscriber.next()).items():
+                await send({"type": "quote", "symbol": symbol, **fields})
+
+    async def apply(action, wanted):
+        done = []
+        for symbol in wanted:
+            if not isinstance(symbol, str) or not symbol.strip():
+                continue
+            if action == "subscribe":
+                done.append(hub.subscribe(subscriber, symbol.strip()))
+            else:
+                hub.unsubscribe(subscriber, symbol.strip())
+                done.append(symbol.strip().upper())
+        await send({"type": f"{action}d", "symbols": done})
+
+    forwarder = asyncio.create_task(forward_quotes())
+    try:
+        if symbols:
+            try:
+                await apply("subscribe", symbols.split(","))
+            except ValueError as e:
+                await send({"type": "error", "detail": str(e)})
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = orjson.loads(raw)
+                action = message.get("action")
+                if action not in ("subscribe", "unsubscribe") or not isinstance(message.get("symbols"), list):
+                    raise ValueError('Expected {"action": "subscribe" | "unsubscribe", "symbols": [...]}')
+                await apply(action, message["symbols"])
+            except (ValueError, AttributeError) as e:
+                await send({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        forwarder.cancel()
+        hub.unsubscribe_all(subscriber)
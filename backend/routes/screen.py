@@ -0,0 +1,23 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from services.screener import SCREEN_MAX_LIMIT, get_universe, screen
+from utils.batch import json_response
+
+router = APIRouter()
+
+
+@router.get("/screen")
+async def screen_universe(
+    filter: str | None = Query(None, description='e.g. rsi < 30 and sma_50 > sma_200 and fund_class == "STRONG"'),
+    sort: str | None = Query(None, description="Comma-separated columns, '-' prefix for descending, e.g. -fund_score,rsi"),
+    fields: str | None = Query(None, description="Comma-separated columns to return"),
+    limit: int = Query(50, ge=1, le=SCREEN_MAX_LIMIT),
+):
+    """Screen every symbol in the price store by indicators and fundamentals scores."""
+    universe = await asyncio.to_thread(get_universe)
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        result = await asyncio.to_thread(screen, universe, filter, sort, columns, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(result)
@@ -1,12 +1,41 @@
-from fastapi import APIRouter, HTTPException
-from services.alphavantage_service import fetch_daily_adjusted, fetch_overview, search_symbols
-from services.yfinance_service import fetch_yf_daily, fetch_yf_fundamentals
-from services.nse_service import fetch_nse_daily, fetch_nse_fundamentals
+import asyncio
+import datetime
+import functools
+import os
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from services.alphavantage_service import fetch_overview_async, overview_fundamentals, search_symbols
+from services.yfinance_service import fetch_yf_fundamentals
+from services.nse_service import fetch_nse_fundamentals
+from services.price_store import DEFAULT_DAYS, load_prices_async, load_prices_batch_async
+from services.price_providers import AV_COMPACT_DAYS, fetch_prices, fetch_prices_batch
+from utils.batch import NDJSON, STREAM_HEADERS, json_response, ndjson_as_completed, parse_symbols
+from utils.ohlcv import COLUMNS, PriceArrays
 from utils.fundamentals import analyze_fundamentals
 
 router = APIRouter()
 
-from services.local_search_service import search_local_symbols
+# Top-level keys of a /stock response, selectable with ?fields=
+STOCK_FIELDS = ("symbol", "company_name", "price", "fundamentals", "fundamental_analysis", "prices", "error")
+# ...and the ones that need the fundamentals lookups
+_FUNDAMENTAL_FIELDS = {"company_name", "fundamentals", "fundamental_analysis", "error"}
+MAX_DAYS = int(os.getenv("STOCK_MAX_DAYS", str(10 * 365)))
+
+EMPTY_FUNDAMENTALS = {
+    "pe_ratio": None,
+    "eps": None,
+    "market_cap": None,
+    "price_to_book": None,
+    "return_on_equity": None,
+    "debt_to_equity": None,
+    "dividend_yield": None,
+    "high_52w": None,
+    "low_52w": None,
+    "name": None,
+}
+
+from services.local_search_service import record_request, search_local_symbols
+from services import symbol_master
 
 @router.get("/stock/search")
 def search_stock(query: str):
@@ -19,7 +48,9 @@ def search_stock(query: str):
     # 2. If we have enough local matches, return them to save API calls
     # You can adjust this threshold. If user types specific symbol not in local, 
     # we might still want to hit API. But for single letters like "T", local is best.
-    if len(local_matches) >= 5:
+    # With the exchange symbol masters loaded the local index covers the whole
+    # market, so Alpha Vantage has nothing to add.
+    if len(local_matches) >= 5 or symbol_master.covers_market():
         return format_results(local_matches)
 
     # 3. If not enough local matches, try Alpha Vantage
@@ -54,70 +85,135 @@ def format_results(matches):
     return results
 
 
+@router.get("/stock/batch")
+async def get_stock_batch(symbols: str):
+    """
+    /stock/{symbol} for many comma-separated symbols, streamed as NDJSON (one
+    line per symbol, in completion order). Prices for the whole list come
+    from one bulk provider download; fundamentals are fetched per symbol.
+    """
+    wanted = parse_symbols(symbols)
+    series = await load_prices_batch_async(wanted, _fetch_prices_batch)
+    jobs = {s: functools.partial(_stock_payload, s, series[s]) for s in wanted}
+    return StreamingResponse(ndjson_as_completed(jobs), media_type=NDJSON, headers=STREAM_HEADERS)
+
+
+async def _fetch_prices_batch(symbols, days):
+    return await fetch_prices_batch(symbols, days, _price_order(days))
+
+
 @router.get("/stock/{symbol}")
-def get_stock(symbol: str):
-    prices = []
-    overview = {}
-    company_name = None
-    fundamentals = {
-        "pe_ratio": None,
-        "eps": None,
-        "market_cap": None,
-        "price_to_book": None,
-        "return_on_equity": None,
-        "debt_to_equity": None,
-        "dividend_yield": None,
-        "high_52w": None,
-        "low_52w": None,
-        "name": None,
-    }
+async def get_stock(
+    symbol: str,
+    days: int | None = Query(None, ge=1, le=MAX_DAYS, description="Only the last N calendar days of prices"),
+    start: str | None = Query(None, alias="from", description="First price date (YYYY-MM-DD)"),
+    end: str | None = Query(None, alias="to", description="Last price date (YYYY-MM-DD)"),
+    fields: str | None = Query(None, description="e.g. price,fundamentals,prices.close"),
+    format: str = Query("rows", pattern="^(rows|columnar)$", description="prices as row dicts or parallel arrays"),
+):
+    top, columns = _parse_fields(fields)
+    start_date, end_date = _parse_date(start, "from"), _parse_date(end, "to")
+    record_request(symbol)
 
-    # 1. Try Alpha Vantage (silently)
+    # 1. Prices come from the local store; providers (AV -> yfinance -> NSE)
+    # are only asked for the days it is missing. The store always keeps at
+    # least the default year; the requested range is sliced out of it.
+    load_days = DEFAULT_DAYS
+    if days:
+        load_days = max(load_days, days)
+    if start_date is not None:
+        load_days = min(MAX_DAYS, max(load_days, (datetime.date.today() - start_date).days + 1))
+    series = await load_prices_async(symbol, lambda n: fetch_prices(symbol, n, _price_order(n)), load_days)
+    if days:
+        series = series.last_days(days)
+    if start_date is not None or end_date is not None:
+        series = series.between(start_date, end_date)
+    return json_response(await _stock_payload(symbol, series, top, columns, columnar=format == "columnar"))
+
+
+def _parse_fields(fields: str | None):
+    """`fields` -> (top-level keys, price columns). "prices.close" implies "prices"."""
+    if not fields:
+        return set(STOCK_FIELDS), COLUMNS
+    top, columns, picked = {"symbol"}, [], False
+    for name in (f.strip() for f in fields.split(",")):
+        if name.startswith("prices."):
+            col = name[len("prices."):]
+            if col != "date" and col not in COLUMNS:
+                raise HTTPException(status_code=400, detail=f"Unknown price field '{col}'")
+            top.add("prices")
+            picked = True
+            if col != "date" and col not in columns:
+                columns.append(col)
+        elif name in STOCK_FIELDS:
+            top.add(name)
+        elif name:
+            raise HTTPException(status_code=400, detail=f"Unknown field '{name}'")
+    # Bare "prices" means every column; "prices.date" alone just the dates
+    return top, tuple(columns) if picked else COLUMNS
+
+
+def _parse_date(value: str | None, name: str):
+    if not value:
+        return None
     try:
-        prices = fetch_daily_adjusted(symbol)
-    except Exception:
-        pass  # Silent - will try next source
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be a YYYY-MM-DD date")
+
+
+async def _stock_payload(symbol: str, series: PriceArrays, fields=STOCK_FIELDS, columns=COLUMNS, columnar: bool = False):
+    # Fundamentals cost up to three provider calls; skip them when none of
+    # the fields that depend on them were asked for
+    company_name, fundamentals = None, dict(EMPTY_FUNDAMENTALS)
+    if _FUNDAMENTAL_FIELDS & set(fields):
+        company_name, fundamentals = await _fundamentals(symbol)
+
+    # Determine if we have ANY usable data
+    has_price_data = len(series) > 0
+    has_fundamental_data = any(fundamentals[k] is not None for k in ("pe_ratio", "eps", "market_cap"))
+    
+    # Only show error if EVERYTHING failed
+    error_message = None
+    if not has_price_data and not has_fundamental_data:
+        error_message = "Data is temporarily unavailable for this ticker. Try again later or use a different stock symbol."
     
+    latest_price = float(series.close[-1]) if has_price_data else None
+    if latest_price != latest_price:
+        latest_price = None  # NaN close
+    
+    out = {
+        "symbol": symbol,
+        "company_name": company_name,
+        "price": latest_price,
+        "fundamentals": fundamentals,
+        "fundamental_analysis": analyze_fundamentals(fundamentals) if "fundamental_analysis" in fields else None,
+        "prices": None,
+        "error": error_message,  # Single clean error message or None
+    }
+    if "prices" in fields:
+        out["prices"] = series.to_columns(columns) if columnar else series.to_records(columns)
+    return {k: v for k, v in out.items() if k in fields}
+
+
+async def _fundamentals(symbol: str):
+    """(company_name, fundamentals) from AV OVERVIEW, then yfinance, then NSE."""
+    company_name = None
+    fundamentals = dict(EMPTY_FUNDAMENTALS)
+
     try:
-        overview = fetch_overview(symbol)
+        overview = await fetch_overview_async(symbol)
     except Exception:
         overview = {}
     
     if overview:
         company_name = overview.get("Name")
-        fundamentals.update({
-            "pe_ratio": safe_float(overview.get("PERatio")),
-            "eps": safe_float(overview.get("EPS")),
-            "market_cap": safe_float(overview.get("MarketCapitalization")),
-            "high_52w": safe_float(overview.get("52WeekHigh")),
-            "low_52w": safe_float(overview.get("52WeekLow")),
-            "price_to_book": safe_float(overview.get("PriceToBookRatio")),
-            "return_on_equity": safe_float(overview.get("ReturnOnEquityTTM")),
-            "return_on_assets": safe_float(overview.get("ReturnOnAssetsTTM")),
-            "profit_margin": safe_float(overview.get("ProfitMargin")),
-            "operating_margin": safe_float(overview.get("OperatingMarginTTM")),
-            "debt_to_equity": safe_float(overview.get("DebtToEquityRatio")) or safe_float(overview.get("DebtToEquity")),
-            "dividend_yield": safe_float(overview.get("DividendYield")),
-            "ev_to_ebitda": safe_float(overview.get("EVToEBITDA")),
-            "quarterly_earnings_growth_yoy": safe_float(overview.get("QuarterlyEarningsGrowthYOY")),
-            "quarterly_revenue_growth_yoy": safe_float(overview.get("QuarterlyRevenueGrowthYOY")),
-            "beta": safe_float(overview.get("Beta")),
-            "industry_pe": safe_float(overview.get("IndustryPE")),
-            "book_value": safe_float(overview.get("BookValue")),
-            "face_value": safe_float(overview.get("FaceValue")),
-        })
+        fundamentals.update(overview_fundamentals(overview))
 
-    # 2. If AV fails, try yfinance (silently)
-    if not prices:
-        try:
-            prices = fetch_yf_daily(symbol)
-        except Exception:
-            pass  # Silent - will try next source
-    
-    # Try yfinance fundamentals IF missing key metrics
+    # 2. Try yfinance fundamentals IF missing key metrics
     if all(fundamentals[k] is None for k in ("pe_ratio","eps","market_cap")):
         try:
-            yf_fund = fetch_yf_fundamentals(symbol)
+            yf_fund = await asyncio.to_thread(fetch_yf_fundamentals, symbol)
             if yf_fund:
                 fundamentals.update({k: v for k, v in yf_fund.items() if v is not None})
                 if yf_fund.get("name"):
@@ -125,17 +221,10 @@ def get_stock(symbol: str):
         except Exception:
             pass  # Silent
 
-    # 3. If both fail, try NSE (silently)
-    if not prices:
-        try:
-            prices = fetch_nse_daily(symbol)
-        except Exception:
-            pass  # Silent
-    
-    # Try NSE fundamentals IF missing key metrics
+    # 3. Try NSE fundamentals IF missing key metrics
     if all(fundamentals[k] is None for k in ("pe_ratio","eps","market_cap")):
         try:
-            nse_fund = fetch_nse_fundamentals(symbol)
+            nse_fund = await asyncio.to_thread(fetch_nse_fundamentals, symbol)
             if nse_fund:
                 fundamentals.update({k: v for k, v in nse_fund.items() if v is not None})
                 if nse_fund.get("name"):
@@ -143,32 +232,14 @@ def get_stock(symbol: str):
         except Exception:
             pass  # Silent
 
-    # Determine if we have ANY usable data
-    has_price_data = len(prices) > 0
-    has_fundamental_data = any(fundamentals[k] is not None for k in ("pe_ratio", "eps", "market_cap"))
-    
-    # Only show error if EVERYTHING failed
-    error_message = None
-    if not has_price_data and not has_fundamental_data:
-        error_message = "Data is temporarily unavailable for this ticker. Try again later or use a different stock symbol."
-    
-    analysis = analyze_fundamentals(fundamentals)
-    latest_price = prices[0]["close"] if prices else None
-    
-    return {
-        "symbol": symbol,
-        "company_name": company_name,
-        "price": latest_price,
-        "fundamentals": fundamentals,
-        "fundamental_analysis": analysis,
-        "prices": prices,
-        "error": error_message,  # Single clean error message or None
-    }
+    return company_name, fundamentals
 
-def safe_float(x):
-    try:
-        return float(x)
-    except Exception:
-        return None
+
+def _price_order(days: int):
+    # Short tails go to Alpha Vantage first; a full history fill goes to
+    # yfinance first since AV's compact series can't cover it.
+    if days > AV_COMPACT_DAYS:
+        return ["yfinance", "alphavantage", "nse"]
+    return ["alphavantage", "yfinance", "nse"]
 
 
@@ -1,8 +1,13 @@
 import os
-import requests
 from dotenv import load_dotenv
 from pathlib import Path
 
+from services.http_client import get_json, get_json_sync
+from services.av_quota import quota, QuotaExhausted, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from utils.cache import cached
+from utils.circuit_breaker import CircuitOpen, get_breaker
+from utils.singleflight import single_flight, single_flight_async
+
 # Explicitly load .env from backend directory
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -11,6 +16,28 @@ ALPHA_VANTAGE_KEY = os.getenv("ALPHA_VANTAGE_KEY")
 BASE_URL = "https://www.alphavantage.co/query"
 
 
+# Every request goes through the quota scheduler and the circuit breaker
+# first; QuotaExhausted / CircuitOpen mean the call was skipped without
+# spending anything or waiting on the provider.
+def _av_get(params, priority: int, read_timeout: float | None = None):
+    _check_circuit()
+    quota.acquire(priority)
+    return get_json_sync(BASE_URL, params=params, read_timeout=read_timeout, breaker="alphavantage")
+
+
+async def _av_get_async(params, priority: int, read_timeout: float | None = None):
+    _check_circuit()
+    await quota.acquire_async(priority)
+    return await get_json(BASE_URL, params=params, read_timeout=read_timeout, breaker="alphavantage")
+
+
+def _check_circuit():
+    # Don't spend quota on a call the breaker would refuse anyway
+    if not get_breaker("alphavantage").available():
+        raise CircuitOpen("alphavantage circuit is open")
+
+
+@cached("prices", key="alphavantage.daily")
 def fetch_daily_adjusted(symbol: str):
     if not ALPHA_VANTAGE_KEY:
         return []  # Silent failure - no API key
@@ -21,6 +48,8 @@ def fetch_daily_adjusted(symbol: str):
             out = _fetch_daily(candidate)
             if out and len(out) > 0:
                 return out
+        except (QuotaExhausted, CircuitOpen):
+            return []
         except Exception:
             # Silent failure - try next candidate
             continue
@@ -29,37 +58,35 @@ def fetch_daily_adjusted(symbol: str):
     return []
 
 
+@cached("prices", key="alphavantage.daily")
+async def fetch_daily_adjusted_async(symbol: str):
+    if not ALPHA_VANTAGE_KEY:
+        return []
+    for candidate in _symbol_candidates(symbol):
+        try:
+            out = await _fetch_daily_async(candidate)
+            if out and len(out) > 0:
+                return out
+        except (QuotaExhausted, CircuitOpen):
+            return []
+        except Exception:
+            continue
+    return []
+
+
+@cached("fundamentals", key="alphavantage.overview")
+@single_flight
 def fetch_overview(symbol: str):
     if not ALPHA_VANTAGE_KEY:
         return {} # No key, return empty gracefully
     last_error = None
     for candidate in _symbol_candidates(symbol):
         try:
-            params = {
-                "function": "OVERVIEW",
-                "symbol": candidate,
-                "apikey": ALPHA_VANTAGE_KEY,
-            }
-            r = requests.get(BASE_URL, params=params, timeout=30)
-            r.raise_for_status()
-            data = r.json()
-            
-            # Check for rate limit
-            if data.get("Note"):
-                note = data["Note"]
-                if "Thank you for using Alpha Vantage" in note or "rate limit" in note.lower():
-                    raise ValueError("Alpha Vantage API rate limit reached. Please wait 1 minute and try again.")
-                last_error = note
-                continue
-            
-            # Check for error message
-            if data.get("Error Message"):
-                last_error = data["Error Message"]
-                continue
-            
-            # Valid data must have Symbol field
-            if data and data.get("Symbol"):
+            data = _av_get(_overview_params(candidate), PRIORITY_NORMAL)
+            if _check_overview(data):
                 return data
+        except (QuotaExhausted, CircuitOpen):
+            return {}
         except ValueError:
             # Re-raise rate limit errors
             raise
@@ -74,23 +101,76 @@ def fetch_overview(symbol: str):
     return {}
 
 
+@cached("fundamentals", key="alphavantage.overview")
+@single_flight_async
+async def fetch_overview_async(symbol: str):
+    if not ALPHA_VANTAGE_KEY:
+        return {}
+    for candidate in _symbol_candidates(symbol):
+        try:
+            data = await _av_get_async(_overview_params(candidate), PRIORITY_NORMAL)
+            if _check_overview(data):
+                return data
+        except (QuotaExhausted, CircuitOpen):
+            return {}
+        except ValueError:
+            raise
+        except Exception:
+            continue
+    return {}
+
+
+def _overview_params(symbol: str):
+    return {
+        "function": "OVERVIEW",
+        "symbol": symbol,
+        "apikey": ALPHA_VANTAGE_KEY,
+    }
+
+
+def _check_overview(data) -> bool:
+    """True for a usable OVERVIEW payload; raises ValueError on rate limit."""
+    # Check for rate limit
+    if data.get("Note"):
+        note = data["Note"]
+        if "Thank you for using Alpha Vantage" in note or "rate limit" in note.lower():
+            quota.exhaust_minute()
+            raise ValueError("Alpha Vantage API rate limit reached. Please wait 1 minute and try again.")
+        return False
+    
+    # Check for error message
+    if data.get("Error Message"):
+        return False
+    
+    # Valid data must have Symbol field
+    return bool(data and data.get("Symbol"))
+
+
 def _fetch_daily(symbol: str):
-    params = {
+    return _parse_daily(_av_get(_daily_params(symbol), PRIORITY_HIGH))
+
+
+async def _fetch_daily_async(symbol: str):
+    return _parse_daily(await _av_get_async(_daily_params(symbol), PRIORITY_HIGH))
+
+
+def _daily_params(symbol: str):
+    return {
         "function": "TIME_SERIES_DAILY",
         "symbol": symbol,
         "outputsize": "compact",
         "apikey": ALPHA_VANTAGE_KEY,
     }
-    r = requests.get(BASE_URL, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
-    
+
+
+def _parse_daily(data):
     response_keys = list(data.keys()) if isinstance(data, dict) else []
     
     # Check for Information key (can be rate limit or premium endpoint)
     if data.get("Information"):
         info = data["Information"]
         if "rate limit" in info.lower() or "25 requests per day" in info.lower():
+            quota.exhaust_day()
             raise ValueError("Alpha Vantage daily rate limit reached (25 requests/day). The limit resets at midnight UTC or you can upgrade to premium.")
         if "premium" in info.lower() and "endpoint" in info.lower():
             raise ValueError(f"Premium endpoint required: {info}")
@@ -101,6 +181,7 @@ def _fetch_daily(symbol: str):
     if data.get("Note"):
         note = data["Note"]
         if "Thank you for using Alpha Vantage" in note or "rate limit" in note.lower():
+            quota.exhaust_minute()
             raise ValueError("Alpha Vantage API rate limit reached. Please wait 1 minute and try again.")
         raise ValueError(note)
     
@@ -165,6 +246,31 @@ def _series_to_list(series: dict, prefer_adjusted: bool) -> list:
     return out
 
 
+def overview_fundamentals(overview: dict) -> dict:
+    """OVERVIEW fields mapped onto the fundamentals keys the routes use."""
+    return {
+        "pe_ratio": safe_float(overview.get("PERatio")),
+        "eps": safe_float(overview.get("EPS")),
+        "market_cap": safe_float(overview.get("MarketCapitalization")),
+        "high_52w": safe_float(overview.get("52WeekHigh")),
+        "low_52w": safe_float(overview.get("52WeekLow")),
+        "price_to_book": safe_float(overview.get("PriceToBookRatio")),
+        "return_on_equity": safe_float(overview.get("ReturnOnEquityTTM")),
+        "return_on_assets": safe_float(overview.get("ReturnOnAssetsTTM")),
+        "profit_margin": safe_float(overview.get("ProfitMargin")),
+        "operating_margin": safe_float(overview.get("OperatingMarginTTM")),
+        "debt_to_equity": safe_float(overview.get("DebtToEquityRatio")) or safe_float(overview.get("DebtToEquity")),
+        "dividend_yield": safe_float(overview.get("DividendYield")),
+        "ev_to_ebitda": safe_float(overview.get("EVToEBITDA")),
+        "quarterly_earnings_growth_yoy": safe_float(overview.get("QuarterlyEarningsGrowthYOY")),
+        "quarterly_revenue_growth_yoy": safe_float(overview.get("QuarterlyRevenueGrowthYOY")),
+        "beta": safe_float(overview.get("Beta")),
+        "industry_pe": safe_float(overview.get("IndustryPE")),
+        "book_value": safe_float(overview.get("BookValue")),
+        "face_value": safe_float(overview.get("FaceValue")),
+    }
+
+
 def safe_float(x):
     try:
         return float(x)
@@ -197,35 +303,47 @@ def _symbol_candidates(symbol: str):
     return uniq
 
 
+@cached("search", key="alphavantage.search")
 def search_symbols(keywords: str):
     if not ALPHA_VANTAGE_KEY:
         return []
     
-    params = {
-        "function": "SYMBOL_SEARCH",
-        "keywords": keywords,
-        "apikey": ALPHA_VANTAGE_KEY,
-    }
-    
     try:
-        r = requests.get(BASE_URL, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        
-        if "bestMatches" in data:
-            # Filter for prefix matching (starts with)
-            filtered = []
-            kw = keywords.strip().lower()
-            for m in data["bestMatches"]:
-                sym = m.get("1. symbol", "").lower()
-                name = m.get("2. name", "").lower()
-                if sym.startswith(kw) or name.startswith(kw):
-                    filtered.append(m)
-            return filtered
-        return []
+        data = _av_get(_search_params(keywords), PRIORITY_LOW, read_timeout=10)
+        return _filter_matches(data, keywords)
     except Exception:
         # Silent failure
         return []
 
 
+@cached("search", key="alphavantage.search")
+async def search_symbols_async(keywords: str):
+    if not ALPHA_VANTAGE_KEY:
+        return []
+    try:
+        data = await _av_get_async(_search_params(keywords), PRIORITY_LOW, read_timeout=10)
+        return _filter_matches(data, keywords)
+    except Exception:
+        return []
+
+
+def _search_params(keywords: str):
+    return {
+        "function": "SYMBOL_SEARCH",
+        "keywords": keywords,
+        "apikey": ALPHA_VANTAGE_KEY,
+    }
 
+
+def _filter_matches(data, keywords: str):
+    if "bestMatches" in data:
+        # Filter for prefix matching (starts with)
+        filtered = []
+        kw = keywords.strip().lower()
+        for m in data["bestMatches"]:
+            sym = m.get("1. symbol", "").lower()
+            name = m.get("2. name", "").lower()
+            if sym.startswith(kw) or name.startswith(kw):
+                filtered.append(m)
+        return filtered
+    return []
@@ -0,0 +1,217 @@
+"""
+Alpha Vantage quota scheduler.
+
+A token bucket for the per-minute limit plus a per-day budget (resets at
+midnight UTC, like Alpha Vantage's). Counters are persisted to a small JSON
+file so restarts and other worker processes see what has been spent: every
+update re-reads the file and writes it back while holding a file lock (see
+utils/file_lock.py), so two workers can't both spend the last token.
+
+Callers ask for a slot with a priority. Pending callers are served in
+priority order, and lower priorities leave a reserve of the daily budget to
+higher ones. When no slot can be had in time — or the day is spent — the
+call is refused at once instead of being sent to fail upstream.
+"""
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from utils.file_lock import file_lock
+
+PER_MINUTE = int(os.getenv("AV_PER_MINUTE", "5"))
+PER_DAY = int(os.getenv("AV_PER_DAY", "25"))
+STATE_PATH = Path(os.getenv("AV_QUOTA_FILE") or Path(__file__).resolve().parent.parent / "data" / "av_quota.json")
+
+PRIORITY_HIGH = 0    # price series for a user request
+PRIORITY_NORMAL = 1  # company overview
+PRIORITY_LOW = 2     # symbol search, background refresh
+
+# Daily calls a priority must leave untouched for more important ones
+RESERVE = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 2, PRIORITY_LOW: 5}
+# Longest a caller waits for a per-minute token before giving up
+MAX_WAIT = {PRIORITY_HIGH: 5.0, PRIORITY_NORMAL: 5.0, PRIORITY_LOW: 0.0}
+
+_POLL = 0.05
+
+# Calls made inside background() (e.g. the cache warmer) ask at no better
+# than PRIORITY_LOW, whatever priority the provider function passes
+_priority_floor = contextvars.ContextVar("av_priority_floor", default=PRIORITY_HIGH)
+
+
+@contextlib.contextmanager
+def background():
+    token = _priority_floor.set(PRIORITY_LOW)
+    try:
+        yield
+    finally:
+        _priority_floor.reset(token)
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+def _utc_day() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+class AVQuota:
+    def __init__(self, path: Path = STATE_PATH, per_minute: int = PER_MINUTE, per_day: int = PER_DAY):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.rate = per_minute / 60.0
+        self._lock = threading.Lock()
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self.day = _utc_day()
+        self.used = 0
+        self.tokens = float(per_minute)
+        self.updated = time.time()
+        self.granted = 0
+        self.refused = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("day") == self.day:
+            self.used = int(state.get("used", 0))
+        else:
+            self.used = 0
+        self.tokens = float(state.get("tokens", self.per_minute))
+        self.updated = float(state.get("updated", time.time()))
+
+    def _save(self):
+        state = {"day": self.day, "used": self.used, "tokens": self.tokens, "updated": self.updated}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"AV quota: could not persist state: {e}")
+
+    @contextlib.contextmanager
+    def _shared(self):
+        """Exclusive (across threads and processes) access to fresh counters."""
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            yield
+
+    def _refresh(self):
+        # Roll the day, pick up spending by other processes, refill the bucket
+        today = _utc_day()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+        self._load()
+        now = time.time()
+        self.tokens = min(float(self.per_minute), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _step(self, ticket, priority: int):
+        """One scheduling attempt: True (granted), None (refused) or seconds to wait."""
+        with self._shared():
+            if self.used >= self.per_day - RESERVE.get(priority, 0):
+                return None
+            if self._waiting[0] != ticket:
+                return _POLL
+            if self.tokens >= 1:
+                heapq.heappop(self._waiting)
+                self.tokens -= 1
+                self.used += 1
+                self._save()
+                return True
+            return (1 - self.tokens) / self.rate
+
+    def _enqueue(self, priority: int):
+        ticket = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _leave(self, ticket):
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+            self.refused += 1
+
+    def acquire(self, priority: int = PRIORITY_NORMAL, max_wait: float | None = None):
+        """Block until a call may be made; raises QuotaExhausted if it may not."""
+        priority = max(priority, _priority_floor.get())
+        deadline = time.monotonic() + (MAX_WAIT.get(priority, 0.0) if max_wait is None else max_wait)
+        ticket = self._enqueue(priority)
+        while True:
+            step = self._step(ticket, priority)
+            if step is True:
+                self.granted += 1
+                return
+            if step is None or time.monotonic() + step > deadline:
+                self._leave(ticket)
+                raise QuotaExhausted(self._reason(step))
+            time.sleep(min(step, 0.5))
+
+    async def acquire_async(self, priority: int = PRIORITY_NORMAL, max_wait: float | None = None):
+        priority = max(priority, _priority_floor.get())
+        deadline = time.monotonic() + (MAX_WAIT.get(priority, 0.0) if max_wait is None else max_wait)
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                step = self._step(ticket, priority)
+                if step is True:
+                    self.granted += 1
+                    return
+                if step is None or time.monotonic() + step > deadline:
+                    self._leave(ticket)
+                    raise QuotaExhausted(self._reason(step))
+                await asyncio.sleep(min(step, 0.5))
+        except asyncio.CancelledError:
+            self._leave(ticket)
+            raise
+
+    def _reason(self, step) -> str:
+        if step is None:
+            return f"Alpha Vantage daily budget used ({self.used}/{self.per_day}); skipping call."
+        return "Alpha Vantage per-minute limit reached; skipping call."
+
+    def exhaust_day(self):
+        """Upstream says the daily limit is hit (key shared elsewhere, or counters lost)."""
+        with self._shared():
+            self.used = self.per_day
+            self._save()
+
+    def exhaust_minute(self):
+        with self._shared():
+            self.tokens = 0.0
+            self._save()
+
+    def stats(self):
+        with self._shared():
+            return {
+                "day": self.day,
+                "used_today": self.used,
+                "per_day": self.per_day,
+                "minute_tokens": round(self.tokens, 2),
+                "per_minute": self.per_minute,
+                "waiting": len(self._waiting),
+                "granted": self.granted,
+                "refused": self.refused,
+            }
+
+
+quota = AVQuota()
@@ -0,0 +1,118 @@
+"""
+Shared HTTP clients for the REST providers (Alpha Vantage, NewsAPI).
+
+- async: one httpx.AsyncClient per event loop with keep-alive pooling, a
+  per-host concurrency cap and retry with jittered exponential backoff.
+- sync: one pooled requests.Session for code that still runs in threads.
+
+Both use separate connect and read timeouts.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.circuit_breaker import protected
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_BASE = 0.5  # seconds; attempt n sleeps uniform(0, base * 2**n)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_client: httpx.AsyncClient | None = None
+_client_loop = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=MAX_PER_HOST, pool_maxsize=MAX_PER_HOST)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, BACKOFF_BASE * (2 ** attempt))
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client, _client_loop, _host_slots
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+        _client_loop = loop
+        _host_slots = {}
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get_json(url: str, params: Dict | None = None, read_timeout: float | None = None, retries: int = MAX_RETRIES,
+                   breaker: str | None = None):
+    """
+    GET a JSON document, retrying transport errors, 429 and 5xx responses.
+    With `breaker`, the call (all retries together) counts as one outcome
+    for that provider's circuit breaker, and is refused while it is open.
+    """
+    if breaker:
+        return await protected(breaker)(get_json)(url, params, read_timeout, retries)
+    client = get_client()
+    host = urlsplit(url).netloc
+    slots = _host_slots.setdefault(host, asyncio.Semaphore(MAX_PER_HOST))
+    timeout = httpx.Timeout(read_timeout or READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    attempt = 0
+    while True:
+        try:
+            async with slots:
+                r = await client.get(url, params=params, timeout=timeout)
+            if r.status_code in RETRY_STATUS and attempt < retries:
+                raise httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+            r.raise_for_status()
+            return r.json()
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+            if attempt >= retries or (status is not None and status not in RETRY_STATUS):
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+
+
+def get_json_sync(url: str, params: Dict | None = None, read_timeout: float | None = None, retries: int = MAX_RETRIES,
+                  breaker: str | None = None):
+    """Blocking counterpart of get_json() on the pooled requests session."""
+    if breaker:
+        return protected(breaker)(get_json_sync)(url, params, read_timeout, retries)
+    attempt = 0
+    while True:
+        try:
+            r = session.get(url, params=params, timeout=(CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT))
+            if r.status_code in RETRY_STATUS and attempt < retries:
+                raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
+            r.raise_for_status()
+            return r.json()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = e.response.status_code if getattr(e, "response", None) is not None else None
+            if attempt >= retries or (status is not None and status not in RETRY_STATUS):
+                raise
+            time.sleep(_backoff(attempt))
+            attempt += 1
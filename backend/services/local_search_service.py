@@ -1,7 +1,11 @@
 import json
 import os
+from collections import Counter
 from pathlib import Path
 
+from services.price_store import canonical_symbol
+from services.symbol_index import DEFAULT_LIMIT, HOT_MAX, SymbolIndex
+
 # Load data once at module level
 DATA_PATH = Path(__file__).resolve().parent.parent / 'data' / 'indian_stocks.json'
 
@@ -18,35 +22,61 @@ def _load_stocks():
 
 _load_stocks()
 
-def search_local_symbols(query: str):
+# Prefix/fuzzy index over the listings; rebuilt (and swapped in whole) when
+# the listing set changes
+index = SymbolIndex(_STOCKS)
+
+# Requests per canonical symbol, listed or not; symbols come from request
+# paths, so the counter is pruned to the most requested like index hits
+REQUESTS_MAX = 4 * HOT_MAX
+_requests = Counter()
+
+
+def search_local_symbols(query: str, limit: int = DEFAULT_LIMIT):
     """
-    Search for stocks in the local list that match the query (prefix match).
+    Search for stocks in the local list that match the query (prefix match on
+    symbol, base symbol, name or name word, then close typos), best first.
     Returns a list of dicts formatted like Alpha Vantage results.
     """
     if not query:
         return []
     
-    q = query.strip().lower()
-    matches = []
-    
-    for stock in _STOCKS:
-        symbol = stock.get("symbol", "")
-        name = stock.get("name", "")
-        
-        # Check if symbol or name starts with query
-        # Also check symbol without suffix (e.g. "TCS" matches "TCS.BSE")
-        clean_symbol = symbol.split('.')[0]
-        
-        if (symbol.lower().startswith(q) or 
-            name.lower().startswith(q) or 
-            clean_symbol.lower().startswith(q)):
-            
-            matches.append({
-                "1. symbol": symbol,
-                "2. name": name,
-                "3. type": "Equity",
-                "4. region": "India",
-                "8. currency": "INR"
-            })
-            
-    return matches
+    return [
+        {
+            "1. symbol": stock["symbol"],
+            "2. name": stock.get("name", ""),
+            "3. type": "Equity",
+            "4. region": "India",
+            "8. currency": "INR"
+        }
+        for stock in index.search(query, limit)
+    ]
+
+
+def lookup_company_name(symbol: str):
+    """
+    Company name for an exact symbol from the local list, or None.
+    Exchange suffix variants (.NS/.NSE/.BO/.BSE or none) all resolve.
+    """
+    stock = index.lookup(symbol)
+    return stock.get("name") if stock else None
+
+
+def set_index(new_index: SymbolIndex):
+    """Swap in a rebuilt index; searches already running finish on the old one."""
+    global index
+    new_index.carry_hits(index)
+    index = new_index
+
+
+def record_request(symbol: str):
+    """A user asked for `symbol`: feeds search ranking and the most-requested list."""
+    global _requests
+    _requests[canonical_symbol(symbol)] += 1
+    if len(_requests) > REQUESTS_MAX:
+        _requests = Counter(dict(_requests.most_common(REQUESTS_MAX // 2)))
+    index.record_hit(symbol)
+
+
+def most_requested(n: int = 20):
+    return [symbol for symbol, _ in _requests.most_common(n)]
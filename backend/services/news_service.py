@@ -1,5 +1,8 @@
 import os
-import requests
+
+from services.http_client import get_json, get_json_sync
+from utils.cache import cached
+from utils.singleflight import single_flight, single_flight_async
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 NEWS_URL = "https://newsapi.org/v2/everything"
@@ -26,6 +29,8 @@ def clean_company_name(name: str) -> str:
             
     return clean_name.strip()
 
+@cached("news", key="newsapi.everything")
+@single_flight
 def fetch_news(symbol: str, company_name: str = None):
     """
     Fetch news articles for a specific stock symbol.
@@ -37,9 +42,17 @@ def fetch_news(symbol: str, company_name: str = None):
     Returns:
         List of news articles filtered for relevance to the specific company
     """
-    if not NEWS_API_KEY:
-        raise ValueError("NewsAPI key not set. Please set NEWS_API_KEY environment variable.")
-    
+    return _filter_articles(get_json_sync(NEWS_URL, params=_news_params(symbol, company_name), breaker="newsapi"), symbol, company_name)
+
+
+@cached("news", key="newsapi.everything")
+@single_flight_async
+async def fetch_news_async(symbol: str, company_name: str = None):
+    """Non-blocking fetch_news() on the shared async HTTP client."""
+    return _filter_articles(await get_json(NEWS_URL, params=_news_params(symbol, company_name), breaker="newsapi"), symbol, company_name)
+
+
+def _clean_symbol(symbol: str) -> str:
     # Extract base company name from symbol (e.g., "RELIANCE.BSE" -> "RELIANCE")
     # Remove common suffixes like .BSE, .NSE, .NS, .BO
     clean_symbol = symbol.upper()
@@ -47,6 +60,14 @@ def fetch_news(symbol: str, company_name: str = None):
         if clean_symbol.endswith(suffix):
             clean_symbol = clean_symbol[:-len(suffix)]
             break
+    return clean_symbol
+
+
+def _news_params(symbol: str, company_name: str = None):
+    if not NEWS_API_KEY:
+        raise ValueError("NewsAPI key not set. Please set NEWS_API_KEY environment variable.")
+    
+    clean_symbol = _clean_symbol(symbol)
     
     # Create a more specific search query using company name if available
     if company_name:
@@ -58,17 +79,16 @@ def fetch_news(symbol: str, company_name: str = None):
         # Fallback to symbol-based search
         search_query = f"{clean_symbol} stock"
     
-    params = {
+    return {
         "q": search_query,
         "language": "en",
         "sortBy": "publishedAt",
         "apiKey": NEWS_API_KEY,
         "pageSize": 50,  # Fetch more to filter for relevance
     }
-    r = requests.get(NEWS_URL, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
-    
+
+
+def _filter_articles(data, symbol: str, company_name: str = None):
     # Check for API errors
     if data.get("status") == "error":
         error_msg = data.get("message", "Unknown error from NewsAPI")
@@ -90,7 +110,7 @@ def fetch_news(symbol: str, company_name: str = None):
         search_terms.update(word.lower() for word in cleaned_name.split() if len(word) > 3)
     
     # Add the clean symbol
-    search_terms.add(clean_symbol.lower())
+    search_terms.add(_clean_symbol(symbol).lower())
     
     for a in articles:
         if not a.get("title") or not a.get("url"):
@@ -2,15 +2,18 @@ from nsetools import Nse
 from nsepython import nse_quote_ltp, equity_history
 import datetime
 
+from utils.cache import cached
+from utils.circuit_breaker import protected, provider_error
+from utils.ohlcv import NSE_COLUMNS, NSE_DATE_COLUMN, NSE_DATE_FORMAT, PriceArrays
+
 nse = Nse()
 
 # Basic price and fundamentals from nsetools (real-time)
+@cached("fundamentals")
+@protected("nse", fallback=dict, failure_if=provider_error)
 def fetch_nse_fundamentals(symbol: str):
     symbol = symbol.replace('.NSE', '').replace('.BSE','')
-    try:
-        quote = nse.get_quote(symbol)
-    except Exception as e:
-        return {}
+    quote = nse.get_quote(symbol)
     out = {
         'pe_ratio': quote.get('pChange'), # Not exact, nsetools lacks P/E directly
         'eps': None,
@@ -25,35 +28,53 @@ def fetch_nse_fundamentals(symbol: str):
     }
     return out
 
-def fetch_nse_daily(symbol: str, days: int = 365):
-    nse = Nse()
+# nsetools quote fields -> live quote fields (services/quote_hub.py)
+QUOTE_FIELDS = {
+    "price": "lastPrice",
+    "change": "change",
+    "pchange": "pChange",
+    "open": "open",
+    "high": "dayHigh",
+    "low": "dayLow",
+    "prev_close": "previousClose",
+    "volume": "totalTradedVolume",
+}
+
+
+@protected("nse", failure_if=provider_error)
+def fetch_nse_quote(symbol: str):
+    """Live quote from nsetools, uncached; {} if NSE has no price for it."""
+    quote = nse.get_quote(symbol.split('.')[0].upper()) or {}
+    out = {field: _number(quote.get(key)) for field, key in QUOTE_FIELDS.items()}
+    return out if out["price"] is not None else {}
+
+
+def _number(x):
+    # nsetools sends some figures as "1,234.50"
+    try:
+        return float(str(x).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+@cached("prices")
+@protected("nse", fallback=PriceArrays.empty, failure_if=provider_error)
+def fetch_nse_daily_arrays(symbol: str, days: int = 365) -> PriceArrays:
     symbol_upper = symbol.split('.')[0].upper()
     # Fetch the daily chart data
     today = datetime.date.today()
     start = today - datetime.timedelta(days=days)
     try:
-        # equity_history returns a DataFrame
+        # equity_history returns a DataFrame; dates come as DD-Mon-YYYY and
+        # are parsed for the whole column at once
         df = equity_history(symbol_upper, "EQ", start.strftime("%d-%m-%Y"), today.strftime("%d-%m-%Y"))
-        out = []
-        for index, entry in df.iterrows():
-            # Parse date from DD-Mon-YYYY to YYYY-MM-DD
-            try:
-                dt = datetime.datetime.strptime(entry["mTIMESTAMP"], "%d-%b-%Y").strftime("%Y-%m-%d")
-            except:
-                dt = str(entry["mTIMESTAMP"])
-                
-            out.append({
-                "date": dt,
-                "open": float(entry.get("CH_OPENING_PRICE", 0)),
-                "high": float(entry.get("CH_TRADE_HIGH_PRICE", 0)),
-                "low": float(entry.get("CH_TRADE_LOW_PRICE", 0)),
-                "close": float(entry.get("CH_CLOSING_PRICE", 0)),
-                "volume": int(entry.get("CH_TOT_TRADED_QTY", 0))
-            })
-        # equity_history might be sorted differently, ensure reverse chronological
-        out.sort(key=lambda x: x["date"], reverse=True)
-        return out
+        return PriceArrays.from_frame(df, NSE_COLUMNS, date_column=NSE_DATE_COLUMN, date_format=NSE_DATE_FORMAT)
     except Exception as e:
         print(f"NSE Error: {e}")
-        # As a last resort, return just empty list
-        return []
+        # Re-raised so the nse breaker sees it; protected() returns empty
+        raise
+
+
+def fetch_nse_daily(symbol: str, days: int = 365):
+    """fetch_nse_daily_arrays() as latest-first records."""
+    return fetch_nse_daily_arrays(symbol, days).to_records()
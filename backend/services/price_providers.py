@@ -0,0 +1,161 @@
+"""
+Price provider chain with hedged racing.
+
+In "race" mode the preferred provider starts first; if it hasn't answered
+within PRICE_HEDGE_DELAY seconds (or fails) the next one is started as well,
+and so on. The first non-empty series wins and the rest are cancelled, so a
+slow or rate-limited provider no longer adds its full timeout to the request.
+A provider that can't serve the whole window (Alpha Vantage's compact series
+for a long fill) is neither promoted nor used as a hedge; it is only tried
+once the others have failed.
+"sequential" mode keeps the old one-after-another behaviour.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+from services.alphavantage_service import fetch_daily_adjusted_async
+from services.nse_service import fetch_nse_daily_arrays
+from services.price_store import canonical_symbol
+from services.yfinance_service import fetch_yf_daily_arrays, fetch_yf_daily_batch
+from utils.circuit_breaker import get_breaker, rank_providers
+from utils.ohlcv import PriceArrays
+
+PRICE_FETCH_MODE = os.getenv("PRICE_FETCH_MODE", "race")  # race | sequential
+HEDGE_DELAY = float(os.getenv("PRICE_HEDGE_DELAY", "1.5"))
+PROVIDER_TIMEOUT = float(os.getenv("PRICE_PROVIDER_TIMEOUT", "20"))
+# Alpha Vantage's free "compact" series holds ~100 bars (~140 calendar days)
+AV_COMPACT_DAYS = 140
+# Longest window (calendar days) each provider can fill; absent = any
+MAX_DAYS = {"alphavantage": AV_COMPACT_DAYS}
+
+
+async def _yfinance(symbol: str, days: int):
+    return await asyncio.to_thread(fetch_yf_daily_arrays, symbol, days)
+
+
+async def _alphavantage(symbol: str, days: int):
+    return await fetch_daily_adjusted_async(symbol)
+
+
+async def _nse(symbol: str, days: int):
+    return await asyncio.to_thread(fetch_nse_daily_arrays, symbol, days)
+
+
+PROVIDERS = {
+    "yfinance": _yfinance,
+    "alphavantage": _alphavantage,
+    "nse": _nse,
+}
+
+# symbol -> {"provider": name, "latency": seconds, "at": timestamp}
+_winners: Dict[str, Dict] = {}
+
+
+def provider_winners() -> Dict[str, Dict]:
+    return dict(_winners)
+
+
+def _covers(name: str, days: int) -> bool:
+    return days <= MAX_DAYS.get(name, days)
+
+
+def _ordered(symbol: str, order: List[str], days: int) -> List[str]:
+    # Open circuits are skipped and degraded providers tried last; among the
+    # rest, whoever won last time for this symbol goes first. Providers that
+    # can't cover `days` go last either way.
+    order = rank_providers(order)
+    won = _winners.get(canonical_symbol(symbol), {}).get("provider")
+    if won in order and _covers(won, days) and get_breaker(won).health() >= 0.5:
+        order = [won] + [p for p in order if p != won]
+    return [p for p in order if _covers(p, days)] + [p for p in order if not _covers(p, days)]
+
+
+def _record(symbol: str, provider: str, started: float):
+    _winners[canonical_symbol(symbol)] = {
+        "provider": provider,
+        "latency": round(time.monotonic() - started, 3),
+        "at": time.time(),
+    }
+
+
+async def _call(name: str, symbol: str, days: int):
+    return await asyncio.wait_for(PROVIDERS[name](symbol, days), PROVIDER_TIMEOUT)
+
+
+async def fetch_prices(symbol: str, days: int, order: List[str]) -> List[Dict] | PriceArrays:
+    """Fetch `days` of daily bars from the first provider in `order` that delivers."""
+    order = _ordered(symbol, order, days)
+    if not order:
+        return []  # every provider's circuit is open
+    started = time.monotonic()
+    if PRICE_FETCH_MODE != "race":
+        for name in order:
+            try:
+                prices = await _call(name, symbol, days)
+            except Exception:
+                continue
+            if prices:
+                _record(symbol, name, started)
+                return prices
+        return []
+
+    queue = list(order)
+    pending: Dict[asyncio.Task, str] = {}
+
+    def launch():
+        name = queue.pop(0)
+        pending[asyncio.create_task(_call(name, symbol, days))] = name
+
+    launch()
+    try:
+        while pending:
+            # Only a provider that can fill the whole window is worth a hedge
+            hedge = bool(queue) and _covers(queue[0], days)
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=HEDGE_DELAY if hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                # Preferred provider is slow: hedge with the next one
+                launch()
+                continue
+            for task in done:
+                name = pending.pop(task)
+                if not task.cancelled() and task.exception() is None and task.result():
+                    _record(symbol, name, started)
+                    return task.result()
+            # Everything that finished failed; don't wait out the hedge delay
+            if queue:
+                launch()
+        return []
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_prices_batch(symbols: List[str], days: int, order: List[str]) -> Dict[str, List[Dict] | PriceArrays]:
+    """
+    Fetch many symbols at once: one bulk yfinance download for all of them,
+    then the usual per-symbol chain (without yfinance) for any it missed.
+    """
+    out: Dict[str, List[Dict] | PriceArrays] = {}
+    if "yfinance" in order and get_breaker("yfinance").available():
+        started = time.monotonic()
+        try:
+            bulk = await asyncio.wait_for(asyncio.to_thread(fetch_yf_daily_batch, list(symbols), days),
+                                          PROVIDER_TIMEOUT)
+        except Exception:
+            bulk = {}
+        for symbol, prices in bulk.items():
+            if prices:
+                _record(symbol, "yfinance", started)
+                out[symbol] = prices
+    rest = [s for s in symbols if s not in out]
+    if rest:
+        fallback = [p for p in order if p != "yfinance"]
+        fetched = await asyncio.gather(*(fetch_prices(s, days, fallback) for s in rest))
+        out.update({s: prices for s, prices in zip(rest, fetched) if prices})
+    return out
@@ -0,0 +1,369 @@
+"""
+Persistent columnar OHLCV store.
+
+Each symbol gets a directory of raw little-endian column files (dates as
+datetime64[D], float64 prices, int64 volume) plus a small meta.json holding
+the row count and the last stored date. Columns are read through read-only
+memory maps, so slicing a window never copies. New bars are appended in
+place; only the missing tail is requested from the providers. Writers (API
+workers, the warmer, the jobs/ scripts) take a per-symbol file lock, so
+merges from different processes don't interleave.
+
+Adjusted providers (yfinance) rewrite past closes after a split or
+dividend. A tail update whose overlapping bar, already final when stored,
+comes back with a different close marks the symbol; its whole stored span
+is then fetched again and replaces the old rows.
+"""
+import asyncio
+import datetime
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from utils.file_lock import file_lock
+from utils.market_hours import EOD_SETTLE, IST, MARKET_CLOSE, last_session_date
+from utils.ohlcv import PriceArrays, as_arrays
+from utils.singleflight import AsyncSingleFlight, register
+
+STORE_DIR = Path(os.getenv("PRICE_STORE_DIR") or Path(__file__).resolve().parent.parent / "data" / "prices")
+# Don't ask providers again within this many seconds when they had nothing new
+# (weekends, exchange holidays, symbols that stopped trading).
+RECHECK_SECONDS = int(os.getenv("PRICE_STORE_RECHECK_SECONDS", "3600"))
+# How often a last bar fetched before its session's close (+ settle) is
+# re-requested while that session is still running
+PARTIAL_RECHECK_SECONDS = int(os.getenv("PRICE_STORE_PARTIAL_RECHECK_SECONDS", "300"))
+# History shorter than requested (a recent listing, or a provider that only
+# returned part of the window) is asked for in full at most this often
+HEAD_RECHECK_SECONDS = int(os.getenv("PRICE_STORE_HEAD_RECHECK_SECONDS", str(RECHECK_SECONDS)))
+# A fetch whose first bar is within this many days of the requested start
+# covered the whole window (weekends and holidays leave a gap)
+HEAD_SLACK_DAYS = 7
+# A final bar whose close comes back differing by more than this (relative)
+# means the provider re-adjusted its history
+ADJUST_TOLERANCE = float(os.getenv("PRICE_STORE_ADJUST_TOLERANCE", "0.001"))
+# Symbols whose memory maps are kept open per process
+MAX_MAPS = int(os.getenv("PRICE_STORE_MAX_MAPS", "1024"))
+DEFAULT_DAYS = 365
+
+_DTYPES = {
+    "date": np.dtype("<M8[D]"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<i8"),
+}
+
+
+def _head_days(meta: Dict) -> int:
+    # Older meta files marked the head checked for the whole requested window
+    # whatever the provider returned; they get one more full-window try
+    if "head_tried_at" not in meta:
+        return 0
+    return int(meta.get("head_days", 0))
+
+
+def canonical_symbol(symbol: str) -> str:
+    sym = (symbol or "").strip().upper()
+    if sym.endswith(".NS"):
+        sym = sym[:-3] + ".NSE"
+    elif sym.endswith(".BO"):
+        sym = sym[:-3] + ".BSE"
+    return sym
+
+
+class PriceStore:
+    def __init__(self, root: Path = STORE_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        # symbol -> ((rows, version), PriceArrays over memmaps), least recently read first
+        self._maps: "OrderedDict[str, tuple]" = OrderedDict()
+        self._maps_lock = threading.Lock()
+
+    def _dir(self, symbol: str) -> Path:
+        return self.root / canonical_symbol(symbol).replace("/", "_")
+
+    def meta(self, symbol: str) -> Dict:
+        try:
+            with open(self._dir(symbol) / "meta.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"rows": 0, "first_date": None, "last_date": None, "checked_at": 0, "head_days": 0}
+
+    def _write_meta(self, symbol: str, meta: Dict):
+        path = self._dir(symbol) / "meta.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def symbols(self) -> List[str]:
+        """Canonical symbols that have stored history."""
+        if not self.root.is_dir():
+            return []
+        return sorted(d.name for d in self.root.iterdir() if (d / "meta.json").exists())
+
+    def read(self, symbol: str, days: int | None = None) -> PriceArrays:
+        """Zero-copy view of the stored series, optionally limited to the last `days` calendar days."""
+        sym = canonical_symbol(symbol)
+        meta = self.meta(sym)
+        rows = meta["rows"]
+        if not rows:
+            return PriceArrays.empty()
+        # A rewrite (possibly by another process) replaces the column files
+        # and bumps the version; maps of the old files would serve old data
+        key = (rows, meta.get("version", 0))
+        with self._maps_lock:
+            cached = self._maps.get(sym)
+            if cached is not None and cached[0] == key:
+                self._maps.move_to_end(sym)
+        if cached is None or cached[0] != key:
+            d = self._dir(sym)
+            cols = {
+                name: np.memmap(d / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,))
+                for name, dtype in _DTYPES.items()
+            }
+            cached = (key, PriceArrays(cols["date"], cols["open"], cols["high"], cols["low"], cols["close"], cols["volume"]))
+            with self._maps_lock:
+                self._maps[sym] = cached
+                self._maps.move_to_end(sym)
+                while len(self._maps) > MAX_MAPS:
+                    self._maps.popitem(last=False)
+        series = cached[1]
+        return series.last_days(days) if days else series
+
+    def missing_days(self, symbol: str, days: int = DEFAULT_DAYS, now: datetime.datetime | None = None) -> int:
+        """
+        How many calendar days of history to request from the providers; 0
+        when the store is already current. The last stored bar is always
+        re-requested so an intraday partial bar gets its final values.
+        """
+        meta = self.meta(symbol)
+        if not meta["rows"]:
+            return days
+        now = (now or datetime.datetime.now(IST)).astimezone(IST)
+        now_ts = now.timestamp()
+        today = now.date()
+        first = datetime.date.fromisoformat(meta["first_date"])
+        if meta.get("readjust") and now_ts - meta.get("readjust_tried_at", 0) >= HEAD_RECHECK_SECONDS:
+            # The provider re-adjusted past bars; fetch everything stored again
+            return max(days, (today - first).days + 1)
+        if (_head_days(meta) < days and (today - first).days < days - HEAD_SLACK_DAYS
+                and now_ts - meta.get("head_tried_at", 0) >= HEAD_RECHECK_SECONDS):
+            # Stored history is shorter than requested (e.g. filled from AV's
+            # 100-bar compact series, or a longer range asked for); ask for
+            # the full window again.
+            return days
+        last = datetime.date.fromisoformat(meta["last_date"])
+        if last >= last_session_date(now):
+            # Current, unless the last bar was fetched before its session's
+            # final values were out (an intraday partial bar)
+            final_at = datetime.datetime.combine(last, MARKET_CLOSE, IST) + EOD_SETTLE
+            if meta.get("last_fetched_at", 0) >= final_at.timestamp():
+                return 0
+            checked = max(meta.get("last_fetched_at", 0), meta.get("checked_at", 0))
+            if now_ts - checked < PARTIAL_RECHECK_SECONDS:
+                return 0
+            return min(days, (today - last).days + 1)
+        if now_ts - meta.get("checked_at", 0) < RECHECK_SECONDS:
+            return 0
+        return min(days, (today - last).days + 1)
+
+    def merge(self, symbol: str, prices: List[Dict] | PriceArrays, full_window: int = 0) -> int:
+        """
+        Merge provider rows into the store; returns the number of new bars.
+        full_window is the length in days of the whole history that was asked
+        for (0 for a tail update). When the rows reach back to its start, the
+        head is known to be complete for windows up to that length; otherwise
+        the full window is asked for again after HEAD_RECHECK_SECONDS.
+        """
+        sym = canonical_symbol(symbol)
+        new = as_arrays(prices)
+        if not len(new) and not self.meta(sym)["rows"]:
+            return 0  # nothing stored, nothing to store
+        with self._lock, file_lock(self._dir(sym) / ".lock"):
+            meta = self.meta(sym)
+            meta["checked_at"] = time.time()
+            meta["head_days"] = _head_days(meta)
+            if full_window:
+                meta["head_tried_at"] = meta["checked_at"]
+                start = np.datetime64(datetime.datetime.now(IST).date(), "D") - int(full_window)
+                if len(new) and new.dates[0] <= start + HEAD_SLACK_DAYS:
+                    meta["head_days"] = max(_head_days(meta), int(full_window))
+            meta.pop("head_checked", None)
+            rows = meta["rows"]
+            if meta.get("readjust") and full_window:
+                meta["readjust_tried_at"] = meta["checked_at"]
+            if not len(new):
+                if rows:
+                    self._write_meta(sym, meta)
+                return 0
+
+            d = self._dir(sym)
+            if (meta.get("readjust") and full_window
+                    and new.dates[0] <= np.datetime64(meta["first_date"], "D") + HEAD_SLACK_DAYS):
+                # Re-adjusted history covering everything stored replaces it
+                rows = 0
+                meta.pop("readjust", None)
+                meta.pop("readjust_tried_at", None)
+            if rows and new.dates[0] >= np.datetime64(meta["last_date"], "D"):
+                if self._readjusted(d, rows, meta, new):
+                    meta["readjust"] = True
+                    meta.pop("readjust_tried_at", None)
+                added = self._append_tail(d, rows, meta, new)
+            else:
+                added = self._rewrite(d, rows, new)
+            dates = self._column(d, "date", rows + added)
+            meta.update({
+                "rows": rows + added,
+                "first_date": str(dates[0]),
+                "last_date": str(dates[-1]),
+            })
+            if new.dates[-1] == dates[-1]:
+                # When the last bar was fetched tells whether it can still change
+                meta["last_fetched_at"] = meta["checked_at"]
+            meta["version"] = meta.get("version", 0) + 1
+            self._write_meta(sym, meta)
+            with self._maps_lock:
+                self._maps.pop(sym, None)
+            return added
+
+    def _column(self, d: Path, name: str, rows: int) -> np.ndarray:
+        return np.fromfile(d / f"{name}.bin", dtype=_DTYPES[name], count=rows)
+
+    def _readjusted(self, d: Path, rows: int, meta: Dict, new: PriceArrays) -> bool:
+        # Only a bar that was final when stored can tell: a partial one is
+        # expected to change
+        last = datetime.date.fromisoformat(meta["last_date"])
+        final_at = datetime.datetime.combine(last, MARKET_CLOSE, IST) + EOD_SETTLE
+        if new.dates[0] != np.datetime64(last, "D") or meta.get("last_fetched_at", 0) < final_at.timestamp():
+            return False
+        with open(d / "close.bin", "rb") as f:
+            f.seek((rows - 1) * _DTYPES["close"].itemsize)
+            stored = float(np.frombuffer(f.read(_DTYPES["close"].itemsize), dtype=_DTYPES["close"])[0])
+        fetched = float(new.close[0])
+        if not (np.isfinite(stored) and np.isfinite(fetched)) or not stored:
+            return False
+        return abs(fetched - stored) > ADJUST_TOLERANCE * abs(stored)
+
+    def _append_tail(self, d: Path, rows: int, meta: Dict, new: PriceArrays) -> int:
+        # Common case: the provider returned the last stored bar plus newer ones.
+        last = np.datetime64(meta["last_date"], "D")
+        overwrite = bool(new.dates[0] == last)
+        start = rows - 1 if overwrite else rows
+        # Keep only one row per date (the latest from the provider)
+        keep = np.append(new.dates[1:] != new.dates[:-1], True)
+        for name in _DTYPES:
+            col = new.dates if name == "date" else getattr(new, name)
+            col = np.ascontiguousarray(col[keep], dtype=_DTYPES[name])
+            with open(d / f"{name}.bin", "r+b") as f:
+                # Seeking to the committed row count (and truncating) discards
+                # any bytes left by a write that crashed before meta.json.
+                f.seek(start * _DTYPES[name].itemsize)
+                f.write(col.tobytes())
+                f.truncate()
+        return int(keep.sum()) - (1 if overwrite else 0)
+
+    def _rewrite(self, d: Path, rows: int, new: PriceArrays) -> int:
+        # Rare path: first fill, or older history arrived (backfill). Merge in
+        # memory with the incoming rows winning on duplicate dates.
+        if rows:
+            old = PriceArrays(*(self._column(d, name, rows) for name in _DTYPES))
+            merged = {
+                name: np.concatenate([getattr(old, "dates" if name == "date" else name),
+                                      getattr(new, "dates" if name == "date" else name)])
+                for name in _DTYPES
+            }
+        else:
+            merged = {name: getattr(new, "dates" if name == "date" else name) for name in _DTYPES}
+        # Stable sort on dates, then keep the last occurrence of each date
+        order = np.argsort(merged["date"], kind="stable")
+        dates = merged["date"][order]
+        keep = np.append(dates[1:] != dates[:-1], True)
+        idx = order[keep]
+        for name, dtype in _DTYPES.items():
+            tmp = d / f"{name}.bin.tmp"
+            np.ascontiguousarray(merged[name][idx], dtype=dtype).tofile(tmp)
+            os.replace(tmp, d / f"{name}.bin")
+        return int(keep.sum()) - rows
+
+
+store = PriceStore()
+# Concurrent requests for the same symbol share one provider fetch
+_fetch_flight = register("price_store.load_prices_async", AsyncSingleFlight("load_prices_async"))
+
+
+def load_prices(symbol: str, fetch: Callable[[int], List[Dict]], days: int = DEFAULT_DAYS) -> PriceArrays:
+    """
+    Return up to `days` of history for `symbol` from the store, first asking
+    `fetch(n_days)` (the route's provider chain, returning records or
+    PriceArrays) for whatever is missing.
+    If the store is unavailable the fetched rows are served directly.
+    """
+    need = store.missing_days(symbol, days)
+    fetched = None
+    if need:
+        try:
+            fetched = fetch(need) or []
+        except Exception:
+            fetched = []
+    return _merge_and_read(symbol, need, fetched, days)
+
+
+async def load_prices_async(symbol: str, fetch: Callable[[int], Awaitable[List[Dict]]], days: int = DEFAULT_DAYS) -> PriceArrays:
+    """load_prices() for an async provider chain."""
+    need = store.missing_days(symbol, days)
+    fetched = None
+    if need:
+        try:
+            fetched = await _fetch_flight.do((canonical_symbol(symbol), need), fetch, need) or []
+        except Exception:
+            fetched = []
+    return _merge_and_read(symbol, need, fetched, days)
+
+
+async def load_prices_batch_async(symbols: List[str], fetch_many: Callable[[List[str], int], Awaitable[Dict[str, List[Dict]]]],
+                                  days: int = DEFAULT_DAYS) -> Dict[str, PriceArrays]:
+    """
+    load_prices_async() for many symbols. Symbols missing the same number of
+    days (usually all of them: same last session) are fetched together with
+    one `fetch_many(symbols, n_days)` call returning {symbol: records}.
+    """
+    groups: Dict[int, List[str]] = {}
+    for symbol in symbols:
+        groups.setdefault(store.missing_days(symbol, days), []).append(symbol)
+
+    async def load(need: int, group: List[str]) -> Dict[str, List[Dict]]:
+        if not need:
+            return {}
+        try:
+            return await fetch_many(group, need) or {}
+        except Exception:
+            return {}
+
+    results = await asyncio.gather(*(load(need, group) for need, group in groups.items()))
+    out = {}
+    for (need, group), fetched in zip(groups.items(), results):
+        for symbol in group:
+            out[symbol] = _merge_and_read(symbol, need, fetched.get(symbol, []) if need else None, days)
+    return out
+
+
+def _merge_and_read(symbol: str, need: int, fetched: List[Dict] | PriceArrays | None, days: int) -> PriceArrays:
+    if need:
+        try:
+            store.merge(symbol, fetched, full_window=days if need >= days else 0)
+        except OSError as e:
+            print(f"Price store write failed for {symbol}: {e}")
+            return as_arrays(fetched).last_days(days)
+    try:
+        return store.read(symbol, days)
+    except (OSError, ValueError) as e:
+        print(f"Price store read failed for {symbol}: {e}")
+        return as_arrays(fetched)
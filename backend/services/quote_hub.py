@@ -0,0 +1,150 @@
+"""
+Live quote fan-out.
+
+One polling task per symbol that at least one client is subscribed to,
+however many clients that is; the task stops when the last one leaves.
+Each poll is compared with the previous quote and only the fields that
+changed are pushed to the subscribers.
+
+The poll interval adapts: it halves (down to QUOTE_MIN_INTERVAL) while the
+price keeps changing and grows (up to QUOTE_MAX_INTERVAL) while it doesn't
+or the provider fails. Outside market hours quotes don't move, so symbols
+are polled every QUOTE_CLOSED_INTERVAL.
+
+Subscribers coalesce: updates not yet sent are merged per symbol, so a slow
+client gets the latest values, never a growing backlog.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Set
+
+from services.nse_service import fetch_nse_quote
+from services.price_store import canonical_symbol
+from services.yfinance_service import fetch_yf_quote
+from utils.circuit_breaker import get_breaker
+from utils.market_hours import is_market_open
+
+QUOTE_MIN_INTERVAL = float(os.getenv("QUOTE_MIN_INTERVAL", "2"))
+QUOTE_MAX_INTERVAL = float(os.getenv("QUOTE_MAX_INTERVAL", "30"))
+QUOTE_CLOSED_INTERVAL = float(os.getenv("QUOTE_CLOSED_INTERVAL", "300"))
+QUOTE_MAX_SYMBOLS = int(os.getenv("QUOTE_MAX_SYMBOLS", "50"))
+
+
+def fetch_quote(symbol: str) -> Dict:
+    """NSE first for NSE listings (it is the exchange's own feed), else yfinance."""
+    if not symbol.endswith(".BSE") and get_breaker("nse").available():
+        try:
+            quote = fetch_nse_quote(symbol)
+            if quote:
+                return quote
+        except Exception:
+            pass
+    return fetch_yf_quote(symbol)
+
+
+class Subscriber:
+    """One client's pending updates, merged per symbol until sent."""
+
+    def __init__(self):
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, Dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, symbol: str, fields: Dict):
+        self._pending.setdefault(symbol, {}).update(fields)
+        self._ready.set()
+
+    async def next(self) -> Dict[str, Dict]:
+        """Wait for updates; returns {symbol: changed fields}."""
+        await self._ready.wait()
+        self._ready.clear()
+        out, self._pending = self._pending, {}
+        return out
+
+
+class _Feed:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: Set[Subscriber] = set()
+        self.quote: Dict = {}
+        self.interval = QUOTE_MIN_INTERVAL
+        self.polls = 0
+        self.errors = 0
+        self.task: asyncio.Task | None = None
+
+
+class QuoteHub:
+    def __init__(self, fetch=fetch_quote):
+        self.fetch = fetch
+        self.feeds: Dict[str, _Feed] = {}
+
+    def subscribe(self, subscriber: Subscriber, symbol: str) -> str:
+        symbol = canonical_symbol(symbol)
+        if symbol in subscriber.symbols:
+            return symbol
+        if len(subscriber.symbols) >= QUOTE_MAX_SYMBOLS:
+            raise ValueError(f"At most {QUOTE_MAX_SYMBOLS} symbols per connection")
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            feed = self.feeds[symbol] = _Feed(symbol)
+            feed.task = asyncio.create_task(self._poll(feed))
+        feed.subscribers.add(subscriber)
+        subscriber.symbols.add(symbol)
+        if feed.quote:
+            # Late joiners start from the full current quote
+            subscriber.push(symbol, feed.quote)
+        return symbol
+
+    def unsubscribe(self, subscriber: Subscriber, symbol: str):
+        symbol = canonical_symbol(symbol)
+        subscriber.symbols.discard(symbol)
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            return
+        feed.subscribers.discard(subscriber)
+        if not feed.subscribers:
+            feed.task.cancel()
+            del self.feeds[symbol]
+
+    def unsubscribe_all(self, subscriber: Subscriber):
+        for symbol in list(subscriber.symbols):
+            self.unsubscribe(subscriber, symbol)
+
+    async def _poll(self, feed: _Feed):
+        while True:
+            try:
+                quote = await asyncio.to_thread(self.fetch, feed.symbol)
+            except Exception as e:
+                feed.errors += 1
+                print(f"Quote poll failed for {feed.symbol}: {e!r}")
+                quote = {}
+            feed.polls += 1
+            changed = {k: v for k, v in quote.items() if feed.quote.get(k) != v}
+            if changed:
+                feed.quote.update(changed)
+                changed["ts"] = time.time()
+                for subscriber in feed.subscribers:
+                    subscriber.push(feed.symbol, changed)
+            if not is_market_open():
+                feed.interval = QUOTE_CLOSED_INTERVAL
+            elif quote and "price" in changed:
+                feed.interval = max(QUOTE_MIN_INTERVAL, min(feed.interval, QUOTE_MAX_INTERVAL) / 2)
+            else:
+                feed.interval = min(QUOTE_MAX_INTERVAL, feed.interval * 1.5)
+            await asyncio.sleep(feed.interval)
+
+    def stats(self) -> Dict:
+        return {
+            symbol: {
+                "subscribers": len(feed.subscribers),
+                "interval": round(feed.interval, 2),
+                "polls": feed.polls,
+                "errors": feed.errors,
+                "price": feed.quote.get("price"),
+            }
+            for symbol, feed in self.feeds.items()
+        }
+
+
+hub = QuoteHub()
@@ -1,11 +1,19 @@
 from typing import Dict, List
-from utils.indicators import rsi, simple_moving_average
+from utils.indicators import IndicatorFrame
 
 
-def generate_recommendation(prices: List[Dict]):
-    rsi_val = rsi(prices, period=14)
-    sma_short = simple_moving_average(prices, window=20)
-    sma_long = simple_moving_average(prices, window=50)
+def generate_recommendation(prices: List[Dict], frame: IndicatorFrame | None = None):
+    # Callers that already parsed the prices pass their frame to avoid a re-parse
+    if frame is None:
+        frame = IndicatorFrame(prices)
+    ind = frame.compute({
+        "rsi": ("rsi", 14),
+        "sma_short": ("sma", 20),
+        "sma_long": ("sma", 50),
+    })
+    rsi_val = ind["rsi"]
+    sma_short = ind["sma_short"]
+    sma_long = ind["sma_long"]
 
     # Placeholder rules
     if rsi_val is not None:
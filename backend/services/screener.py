@@ -0,0 +1,337 @@
+"""
+Universe screener: every symbol in the price store at once.
+
+The last SCREEN_BARS bars of each stored symbol are stacked into one
+symbols x bars matrix (right-aligned on the latest bar, NaN-padded like
+indicators.batch_frames), so each indicator is one vectorized pass over the
+whole universe. Fundamentals scores come from whatever the provider caches
+already hold, else the nightly snapshot; nothing is fetched here. The
+matrix is rebuilt in the background once it is older than
+SCREEN_REFRESH_SECONDS.
+
+Filters are Python-style expressions over column names, e.g.
+    rsi < 30 and sma_50 > sma_200 and fund_class == "STRONG"
+parsed with ast and evaluated on whole columns; only names, numbers,
+strings, arithmetic, comparisons and and/or/not are accepted.
+"""
+import ast
+import datetime
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from services.alphavantage_service import fetch_overview, overview_fundamentals
+from services.nse_service import fetch_nse_fundamentals
+from services.price_store import store
+from services.snapshot import snapshot
+from services.yfinance_service import fetch_yf_fundamentals
+from utils.fundamentals import analyze_fundamentals_batch, fundamentals_table
+from utils.indicators import IndicatorFrame
+from utils.ohlcv import stack_frame
+
+# ~1 year of sessions: enough history for SMA_200
+SCREEN_BARS = int(os.getenv("SCREEN_BARS", "260"))
+SCREEN_REFRESH_SECONDS = float(os.getenv("SCREEN_REFRESH_SECONDS", "300"))
+SCREEN_MAX_LIMIT = 500
+MAX_EXPRESSION = 500
+
+DEFAULT_FIELDS = ("close", "change_pct", "rsi", "sma_50", "sma_200", "fund_score", "fund_class")
+# Key metrics whose absence sends _fundamentals() on to the next provider
+_KEY_METRICS = ("pe_ratio", "eps", "market_cap")
+
+_CMP = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+    ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ARITH = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+# Columns taking a bar count, e.g. sma_50, return_20; some have a default (rsi = rsi_14)
+_PARAM_COLUMN = re.compile(r"^(sma|ema|rsi|adx|return|avg_volume|high|low|bb_upper|bb_lower)(?:_(\d+))?$")
+_DEFAULT_PARAM = {"rsi": 14, "adx": 14, "return": 1, "avg_volume": 20, "bb_upper": 20, "bb_lower": 20}
+
+
+def cached_fundamentals(symbol: str) -> Dict | None:
+    """Fundamentals from the provider caches only, in _fundamentals() order."""
+    fundamentals = {}
+    overview = fetch_overview.lookup(symbol)
+    if overview:
+        fundamentals.update(overview_fundamentals(overview))
+    for lookup in (fetch_yf_fundamentals.lookup, fetch_nse_fundamentals.lookup):
+        if all(fundamentals.get(k) is None for k in _KEY_METRICS):
+            extra = lookup(symbol)
+            if extra:
+                fundamentals.update({k: v for k, v in extra.items() if v is not None})
+    return fundamentals or None
+
+
+def _window(x: np.ndarray, n: int, reduce) -> np.ndarray:
+    # reduce over the last n bars; NaN unless all n are present
+    if n <= 0 or x.shape[-1] < n:
+        return np.full(x.shape[0], np.nan)
+    tail = x[:, -n:]
+    out = reduce(np.where(np.isnan(tail), 0, tail), axis=-1).astype(float)
+    out[np.isnan(tail).any(axis=-1)] = np.nan
+    return out
+
+
+class Universe:
+    def __init__(self, symbols: List[str], frame: IndicatorFrame, last_dates: np.ndarray,
+                 fund_score: np.ndarray, fund_class: np.ndarray):
+        self.symbols = np.array(symbols, dtype=object)
+        self.frame = frame
+        self.last_dates = last_dates
+        self.built_at = time.time()
+        self._columns: Dict[str, np.ndarray] = {}
+        self._columns["fund_score"] = fund_score
+        self._columns["fund_class"] = fund_class
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def column(self, name: str) -> np.ndarray:
+        """Latest value of column `name` for every symbol (NaN where undefined)."""
+        if name not in self._columns:
+            self._columns[name] = self._compute(name)
+        return self._columns[name]
+
+    def _compute(self, name: str) -> np.ndarray:
+        f = self.frame
+        last = lambda x: x[:, -1] if x.shape[-1] else np.full(len(self), np.nan)
+        if name in ("open", "high", "low", "close", "volume"):
+            return last(getattr(f, name))
+        if name == "bars":
+            return (~np.isnan(f.close)).sum(axis=-1).astype(float)
+        if name == "change_pct":
+            return self.column("return_1")
+        if name in ("macd", "macd_signal", "macd_hist"):
+            line, sig = f.macd_series()
+            return {"macd": last(line), "macd_signal": last(sig), "macd_hist": last(line - sig)}[name]
+        m = _PARAM_COLUMN.match(name)
+        if m is None:
+            raise ValueError(f"Unknown column: {name}")
+        kind, param = m.group(1), m.group(2)
+        if param is None and kind not in _DEFAULT_PARAM:
+            raise ValueError(f"Column {kind} needs a window, e.g. {kind}_20")
+        n = int(param) if param is not None else _DEFAULT_PARAM[kind]
+        # Bounded windows without leading zeros keep the set of names this
+        # memoizes finite (and ema_0 meaningless values out)
+        if not 1 <= n <= SCREEN_BARS or (param is not None and param != str(n)):
+            raise ValueError(f"Column {name}: window must be a number from 1 to {SCREEN_BARS}, e.g. {kind}_20")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if kind == "sma":
+                return last(f.sma_series(n))
+            if kind == "ema":
+                return last(f.ema_series(n))
+            if kind == "rsi":
+                return last(f.rsi_series(n))
+            if kind == "adx":
+                return last(f.adx_series(n))
+            if kind == "return":
+                if f.close.shape[-1] <= n:
+                    return np.full(len(self), np.nan)
+                return (f.close[:, -1] / f.close[:, -1 - n] - 1) * 100
+            if kind == "avg_volume":
+                return _window(f.volume, n, np.sum) / n
+            if kind == "high":
+                return _window(f.high, n, np.max)
+            if kind == "low":
+                return _window(f.low, n, np.min)
+            band = 2 * last(f.std_series(n))
+            mid = last(f.sma_series(n))
+            return mid + band if kind == "bb_upper" else mid - band
+
+
+def build_universe(symbols: List[str] | None = None, bars: int = SCREEN_BARS) -> Universe:
+    symbols = store.symbols() if symbols is None else symbols
+    series = [(s, store.read(s)) for s in symbols]
+    series = [(s, a) for s, a in series if len(a)]
+    frame = stack_frame([a for _, a in series], bars)
+    last_dates = np.array([a.dates[-1] for _, a in series], dtype="datetime64[D]")
+    names = [s for s, _ in series]
+    return Universe(names, frame, last_dates, *_fundamental_columns(names))
+
+
+def _fundamental_columns(symbols: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """fund_score and fund_class: cached provider data scored in one batch, else the nightly snapshot's analysis."""
+    fundamentals = [cached_fundamentals(s) for s in symbols]
+    batch = analyze_fundamentals_batch(fundamentals_table(fundamentals))
+    fund_score = batch["total_score"].astype(float)
+    fund_class = batch["classification"]
+    for i, symbol in enumerate(symbols):
+        if fundamentals[i]:
+            continue
+        entry = snapshot.entry(symbol)
+        analysis = entry.get("fundamental_analysis") if entry else None
+        fund_score[i] = analysis["total_score"] if analysis else np.nan
+        fund_class[i] = analysis["classification"] if analysis else None
+    return fund_score, fund_class
+
+
+_universe: Universe | None = None
+_build_lock = threading.Lock()
+
+
+def _rebuild() -> Universe:
+    global _universe
+    with _build_lock:
+        if _universe is None or time.time() - _universe.built_at > SCREEN_REFRESH_SECONDS:
+            start = time.perf_counter()
+            _universe = build_universe()
+            print(f"Screener universe: {len(_universe)} symbols built in {time.perf_counter() - start:.2f}s")
+        return _universe
+
+
+def get_universe() -> Universe:
+    """
+    The shared universe. The first call builds it; after that a stale one is
+    served while a background thread rebuilds it.
+    """
+    current = _universe
+    if current is None:
+        return _rebuild()
+    if time.time() - current.built_at > SCREEN_REFRESH_SECONDS and not _build_lock.locked():
+        threading.Thread(target=_rebuild, name="screener-rebuild", daemon=True).start()
+    return current
+
+
+def _names(tree: ast.AST) -> List[str]:
+    return [n.id for n in ast.walk(tree) if isinstance(n, ast.Name)]
+
+
+def parse_filter(expression: str) -> ast.Expression:
+    if len(expression) > MAX_EXPRESSION:
+        raise ValueError(f"Filter longer than {MAX_EXPRESSION} characters")
+    try:
+        return ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter: {e.msg}")
+
+
+def _eval(node: ast.AST, u: Universe):
+    if isinstance(node, ast.Expression):
+        return _eval(node.body, u)
+    if isinstance(node, ast.Name):
+        return u.column(node.id)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) and not isinstance(node.value, bool):
+        # Labels (fund_class) are upper-case; compare case-insensitively
+        if isinstance(node.value, str):
+            return node.value.upper()
+        try:
+            return float(node.value)
+        except OverflowError:
+            raise ValueError("Number out of range")
+    if isinstance(node, ast.BoolOp):
+        values = [_mask(_eval(v, u)) for v in node.values]
+        op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        out = values[0]
+        for v in values[1:]:
+            out = op(out, v)
+        return out
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return ~_mask(_eval(node.operand, u))
+        if isinstance(node.op, ast.USub):
+            return -_numeric(_eval(node.operand, u))
+        if isinstance(node.op, ast.UAdd):
+            return _numeric(_eval(node.operand, u))
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        left, right = _numeric(_eval(node.left, u)), _numeric(_eval(node.right, u))
+        try:
+            with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+                return _ARITH[type(node.op)](left, right)
+        except TypeError:
+            raise ValueError("Arithmetic needs numeric columns and numbers, not text or comparisons")
+    if isinstance(node, ast.Compare):
+        out, left = None, _eval(node.left, u)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _CMP:
+                raise ValueError("Only <, <=, >, >=, == and != comparisons are supported")
+            right = _eval(comparator, u)
+            try:
+                with np.errstate(invalid="ignore"):
+                    step = np.asarray(_CMP[type(op)](left, right), dtype=bool)
+            except TypeError:
+                raise ValueError("Text columns only support == and != against a string")
+            out = step if out is None else out & step
+            left = right
+        return out
+    raise ValueError(f"Unsupported filter syntax: {ast.dump(node)[:60]}")
+
+
+def _numeric(value):
+    # Text (fund_class, string constants) would raise in NumPy, or worse
+    # succeed: "a" * 10**9 builds a huge string. Comparison results are
+    # masks, not numbers (NumPy refuses to negate a bool array)
+    if isinstance(value, (str, np.bool_)) or (isinstance(value, np.ndarray) and value.dtype.kind not in "iuf"):
+        raise ValueError("Arithmetic needs numeric columns and numbers, not text or comparisons")
+    return value
+
+
+def _mask(value) -> np.ndarray:
+    value = np.asarray(value)
+    if value.dtype != bool:
+        raise ValueError("and/or/not need comparisons on both sides")
+    return value
+
+
+def _sort_keys(sort: str | None) -> List[tuple]:
+    keys = []
+    for part in (sort or "").split(","):
+        part = part.strip()
+        if part:
+            keys.append((part.lstrip("-+"), part.startswith("-")))
+    return keys
+
+
+def _value(x):
+    if isinstance(x, (float, np.floating)):
+        return None if np.isnan(x) else float(x)
+    return x
+
+
+def screen(universe: Universe, expression: str | None = None, sort: str | None = None,
+           fields: List[str] | None = None, limit: int = 50) -> Dict:
+    """
+    Symbols of `universe` matching `expression`, ordered by `sort` (comma-
+    separated columns, "-" for descending, NaN last; default symbol order),
+    with `fields` plus every column the filter and sort mention.
+    Raises ValueError for bad expressions or unknown columns.
+    """
+    n = len(universe)
+    mask = np.ones(n, dtype=bool)
+    referenced = []
+    if expression:
+        tree = parse_filter(expression)
+        mask = _mask(np.broadcast_to(_eval(tree, universe), (n,)))
+        referenced = _names(tree)
+    idx = np.flatnonzero(mask)
+
+    keys = _sort_keys(sort)
+    if keys:
+        columns = []
+        for name, descending in reversed(keys):
+            col = universe.column(name)
+            if col.dtype == object:
+                raise ValueError(f"Can't sort by text column {name}; use fund_score")
+            col = col[idx]
+            columns.append(np.where(np.isnan(col), np.inf, -col if descending else col))
+        idx = idx[np.lexsort(columns)]
+
+    fields = list(dict.fromkeys([*(fields or DEFAULT_FIELDS), *referenced, *(k for k, _ in keys)]))
+    columns = {name: universe.column(name) for name in fields}
+    idx = idx[:limit]
+    results = []
+    for i in idx.tolist():
+        row = {"symbol": universe.symbols[i], "date": str(universe.last_dates[i])}
+        row.update({name: _value(col[i]) for name, col in columns.items()})
+        results.append(row)
+    return {
+        "universe": n,
+        "matched": int(mask.sum()),
+        "built_at": datetime.datetime.fromtimestamp(universe.built_at).isoformat(timespec="seconds"),
+        "results": results,
+    }
@@ -0,0 +1,111 @@
+"""
+Nightly recommendation snapshot (written by jobs/precompute.py).
+
+For every symbol in the price store the job records, as of the last bar of
+its DEFAULT_DAYS window: the basic recommendation, the TECH_INDICATORS
+values and the fundamentals analysis. Request handlers use an entry only
+when its last bar (date and close) matches the series they just loaded, so
+a lookup returns exactly what computing it would have.
+
+The file is re-read when its mtime changes (checked at most every
+SNAPSHOT_CHECK_SECONDS), so a finished job is picked up without a restart.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import orjson
+
+from services.price_store import DEFAULT_DAYS, canonical_symbol, store
+from services.recommendation_service import generate_recommendation
+from utils.fundamentals import analysis_row, analyze_fundamentals_batch, fundamentals_table
+from utils.indicators import TECH_INDICATORS, batch_frames
+
+SNAPSHOT_PATH = Path(os.getenv(
+    "SNAPSHOT_PATH",
+    Path(__file__).resolve().parent.parent / 'data' / 'snapshot' / 'recommendations.json',
+))
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "30"))
+
+
+def compute_entries(items: List[Tuple[str, Dict | None]], days: int = DEFAULT_DAYS) -> List[Dict]:
+    """
+    Snapshot entries for [(symbol, fundamentals or None)] from the price
+    store. Indicators for all the symbols are computed together (batch_frames),
+    and so are the fundamentals scores. Symbols without stored prices are skipped.
+    """
+    loaded = [(symbol, fundamentals, store.read(symbol, days)) for symbol, fundamentals in items]
+    loaded = [row for row in loaded if len(row[2])]
+    frames = batch_frames([series.frame() for _, _, series in loaded])
+    scored = analyze_fundamentals_batch(fundamentals_table([fundamentals for _, fundamentals, _ in loaded]))
+    entries = []
+    for i, ((symbol, fundamentals, series), frame) in enumerate(zip(loaded, frames)):
+        entries.append({
+            "symbol": canonical_symbol(symbol),
+            "date": str(series.dates[-1]),
+            "close": float(series.close[-1]),
+            "basic_recommendation": generate_recommendation([], frame),
+            "indicators": frame.compute(TECH_INDICATORS),
+            "fundamental_analysis": analysis_row(scored, i) if fundamentals else None,
+        })
+    return entries
+
+
+class Snapshot:
+    def __init__(self, path: Path = SNAPSHOT_PATH):
+        self.path = Path(path)
+        self.data: Dict = {"symbols": {}}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < SNAPSHOT_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == self._mtime:
+                return
+            try:
+                self.data = orjson.loads(self.path.read_bytes()) if mtime else {"symbols": {}}
+            except (OSError, ValueError) as e:
+                print(f"Snapshot: could not read {self.path}: {e}")
+                return
+            self._mtime = mtime
+
+    def entry(self, symbol: str) -> Dict | None:
+        self._refresh()
+        return self.data["symbols"].get(canonical_symbol(symbol))
+
+    def lookup(self, symbol: str, series) -> Dict | None:
+        """The entry for `symbol` if it was computed from the same last bar as `series`."""
+        entry = self.entry(symbol)
+        if (entry is not None and len(series) and entry["date"] == str(series.dates[-1])
+                and entry["close"] == float(series.close[-1])):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def stats(self) -> Dict:
+        self._refresh()
+        return {
+            "path": str(self.path),
+            "as_of": self.data.get("as_of"),
+            "generated_at": self.data.get("generated_at"),
+            "symbols": len(self.data["symbols"]),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+snapshot = Snapshot()
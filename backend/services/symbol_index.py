@@ -0,0 +1,198 @@
+"""
+In-memory symbol search index for autocomplete.
+
+Every listing contributes a few normalized keys (symbol, base symbol, full
+name and the words of the name) to one sorted array, so a prefix query is a
+bisect plus a scan over just the matching range. Prefixes that match too
+many keys to scan (short prefixes, common words) get their best candidates
+precomputed. Typos are caught by a deletion neighbourhood over base symbols
+and leading name words (one edit on each side).
+
+Results are ranked by how they matched (exact symbol, symbol prefix, name
+prefix, word prefix, fuzzy), then by popularity: the listing's static
+popularity plus how often the symbol has been requested here.
+"""
+import bisect
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List
+
+# Match kinds, best first
+EXACT, SYMBOL, NAME, WORD, FUZZY = range(5)
+
+DEFAULT_LIMIT = int(os.getenv("SEARCH_LIMIT", "20"))
+# Prefix ranges longer than this use a precomputed candidate pool
+POOL_THRESHOLD = 256
+POOL_SIZE = 64
+FUZZY_MIN_LEN = 3
+HOT_MAX = 512
+# Popularity is 0..1; requests add HIT_WEIGHT * log(1 + hits)
+HIT_WEIGHT = 0.25
+
+# Name words that say nothing about the company
+_STOPWORDS = {"ltd", "ltd.", "limited", "the", "of", "and", "&", "co", "co.", "inc", "corp", "pvt", "private", "company"}
+_SPACES = re.compile(r"\s+")
+_RANGE_END = "\uffff"
+
+
+def normalize(text: str) -> str:
+    return _SPACES.sub(" ", (text or "").lower()).strip()
+
+
+def base_symbol(symbol: str) -> str:
+    # "TCS.BSE" -> "TCS"
+    return (symbol or "").strip().upper().split('.')[0]
+
+
+def _deletes(token: str) -> set:
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class SymbolIndex:
+    def __init__(self, listings: Iterable[Dict]):
+        """
+        `listings`: dicts with "symbol" and "name", optionally "popularity"
+        (0..1, higher ranks first; without it earlier listings rank higher)
+        and "aliases" (other symbols of the same company, e.g. its BSE code).
+        """
+        self.listings: List[Dict] = [l for l in listings if l.get("symbol")]
+        n = len(self.listings)
+        self._static = [float(l.get("popularity", (n - i) / n)) for i, l in enumerate(self.listings)]
+        self._symbols = [l["symbol"] for l in self.listings]
+        self._id_keys: List[List[tuple]] = []
+        self.by_base: Dict[str, int] = {}
+        self.by_symbol: Dict[str, int] = {}
+        self.hits: Counter = Counter()
+
+        entries = []
+        fuzzy: Dict[str, set] = {}
+        for i, listing in enumerate(self.listings):
+            name = normalize(listing.get("name"))
+            keys = []
+            for sym in (listing["symbol"], *listing.get("aliases", ())):
+                for key in (normalize(sym), base_symbol(sym).lower()):
+                    if (key, SYMBOL) not in keys:
+                        keys.append((key, SYMBOL))
+                self.by_symbol.setdefault(sym.upper(), i)
+                self.by_base.setdefault(base_symbol(sym), i)
+            base = base_symbol(listing["symbol"]).lower()
+            if name:
+                keys.append((name, NAME))
+                words = name.split(" ")
+                keys.extend((w, WORD) for w in words[1:] if w not in _STOPWORDS)
+            self._id_keys.append(keys)
+            entries.extend((key, kind, i) for key, kind in keys)
+            for token in {base, *(w for w in name.split(" ")[:3] if w not in _STOPWORDS)}:
+                if len(token) >= FUZZY_MIN_LEN:
+                    for variant in _deletes(token):
+                        fuzzy.setdefault(variant, set()).add(i)
+
+        entries.sort()
+        self._keys = [e[0] for e in entries]
+        self._kinds = [e[1] for e in entries]
+        self._ids = [e[2] for e in entries]
+        # Postings best-first, so a query only needs the head of each
+        self._fuzzy = {k: tuple(sorted(v, key=lambda i: (-self._static[i], self._symbols[i])))
+                       for k, v in fuzzy.items()}
+        self._pools: Dict[str, List[tuple]] = {}
+        for first in sorted({k[:1] for k in self._keys if k}):
+            self._build_pools(first)
+
+    def __len__(self):
+        return len(self.listings)
+
+    def _range(self, q: str):
+        return bisect.bisect_left(self._keys, q), bisect.bisect_left(self._keys, q + _RANGE_END)
+
+    def _scan(self, q: str, lo: int, hi: int) -> Dict[int, int]:
+        found: Dict[int, int] = {}
+        for j in range(lo, hi):
+            kind = self._kinds[j]
+            if kind == SYMBOL and self._keys[j] == q:
+                kind = EXACT
+            i = self._ids[j]
+            if kind < found.get(i, FUZZY + 1):
+                found[i] = kind
+        return found
+
+    def _build_pools(self, prefix: str):
+        # Prefixes with huge ranges keep their best candidates by static
+        # popularity (hot symbols are checked separately at query time); then
+        # recurse into the one-longer prefixes that are still huge
+        lo, hi = self._range(prefix)
+        if hi - lo <= POOL_THRESHOLD:
+            return
+        found = self._scan(prefix, lo, hi)
+        self._pools[prefix] = heapq.nsmallest(POOL_SIZE, found.items(), key=self._static_rank)
+        n = len(prefix)
+        for nxt in sorted({k[n] for k in self._keys[lo:hi] if len(k) > n}):
+            self._build_pools(prefix + nxt)
+
+    def _static_rank(self, item):
+        i, kind = item
+        return kind, -self._static[i], self._symbols[i]
+
+    def _rank(self, item):
+        i, kind = item
+        return kind, -(self._static[i] + HIT_WEIGHT * math.log1p(self.hits.get(i, 0))), self._symbols[i]
+
+    def _match(self, i: int, q: str) -> int | None:
+        best = None
+        for key, kind in self._id_keys[i]:
+            if key.startswith(q):
+                kind = EXACT if kind == SYMBOL and key == q else kind
+                best = kind if best is None else min(best, kind)
+        return best
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """Top `limit` listings for an autocomplete query, best first."""
+        q = normalize(query)
+        if not q:
+            return []
+        lo, hi = self._range(q)
+        if hi - lo > POOL_THRESHOLD and q in self._pools:
+            found = dict(self._pools[q])
+            # Copy: record_hit() updates the counter from the event loop
+            # while sync searches run in the threadpool
+            for i, _ in tuple(self.hits.items()):
+                kind = self._match(i, q)
+                if kind is not None:
+                    found[i] = kind
+        else:
+            found = self._scan(q, lo, hi)
+        token = q.rsplit(" ", 1)[-1]
+        if len(found) < limit and len(token) >= FUZZY_MIN_LEN:
+            for variant in _deletes(token):
+                for i in self._fuzzy.get(variant, ())[:limit]:
+                    found.setdefault(i, FUZZY)
+        best = heapq.nsmallest(limit, found.items(), key=self._rank)
+        return [self.listings[i] for i, _ in best]
+
+    def _id(self, symbol: str) -> int | None:
+        # Exact symbol first; exchange suffix variants resolve via the base symbol
+        i = self.by_symbol.get((symbol or "").strip().upper())
+        return i if i is not None else self.by_base.get(base_symbol(symbol))
+
+    def lookup(self, symbol: str) -> Dict | None:
+        i = self._id(symbol)
+        return self.listings[i] if i is not None else None
+
+    def carry_hits(self, old: "SymbolIndex"):
+        """Keep request counts across a rebuild."""
+        for i, count in tuple(old.hits.items()):
+            j = self._id(old._symbols[i])
+            if j is not None:
+                self.hits[j] += count
+
+    def record_hit(self, symbol: str):
+        """Count a request for `symbol` towards its popularity."""
+        i = self._id(symbol)
+        if i is None:
+            return
+        self.hits[i] += 1
+        if len(self.hits) > HOT_MAX:
+            # Keep the hot set (scanned for pooled prefixes) small
+            self.hits = Counter(dict(self.hits.most_common(HOT_MAX // 2)))
@@ -0,0 +1,231 @@
+"""
+Exchange symbol masters (NSE EQUITY_L.csv, BSE Equity.csv) for search.
+
+Drop the official security-master CSVs into SYMBOL_MASTER_DIR. They are read
+in one streaming pass, companies listed on both exchanges are merged by ISIN
+(NSE symbol first, BSE code kept as an alias), and the curated list in
+data/indian_stocks.json is merged in so its ordering still ranks first.
+
+The built SymbolIndex is pickled next to the CSVs, keyed by their names,
+sizes and mtimes, so a restart (or another worker) loads it instead of
+rebuilding. A background task polls the directory and swaps a rebuilt index
+into local_search_service without a restart.
+"""
+import asyncio
+import csv
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from services import local_search_service
+from services.symbol_index import SymbolIndex
+
+MASTER_DIR = Path(os.getenv(
+    "SYMBOL_MASTER_DIR",
+    Path(__file__).resolve().parent.parent / 'data' / 'symbol_master',
+))
+POLL_SECONDS = float(os.getenv("SYMBOL_MASTER_POLL", "60"))
+INDEX_FILE = "index.pkl"
+# Bump when the pickled layout changes so stale files are rebuilt
+INDEX_VERSION = 1
+
+# NSE series that are ordinary listed shares (rolling, trade-for-trade, SME)
+NSE_SERIES = {"EQ", "BE", "BZ", "SM", "ST"}
+
+_fingerprint = None
+_state = {"listings": 0, "loaded_at": None, "source": None}
+_task: asyncio.Task | None = None
+
+
+def _header(row: List[str]) -> Dict[str, int]:
+    return {col.strip().upper(): i for i, col in enumerate(row)}
+
+
+def _rows(path: Path) -> Iterator[Tuple[Dict[str, int], List[str]]]:
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        reader = csv.reader(f)
+        cols = _header(next(reader, []))
+        for row in reader:
+            if row:
+                yield cols, row
+
+
+def _cell(row: List[str], cols: Dict[str, int], *names: str) -> str:
+    for name in names:
+        i = cols.get(name)
+        if i is not None and i < len(row):
+            return row[i].strip()
+    return ""
+
+
+def _read_master(path: Path) -> Iterator[Dict]:
+    """Listings from one master CSV; the exchange is told apart by its header."""
+    for cols, row in _rows(path):
+        if "NAME OF COMPANY" in cols:
+            series = _cell(row, cols, "SERIES")
+            if series and series not in NSE_SERIES:
+                continue
+            symbol = _cell(row, cols, "SYMBOL")
+            name = _cell(row, cols, "NAME OF COMPANY")
+            exchange = "NSE"
+        elif "SECURITY ID" in cols:
+            status = _cell(row, cols, "STATUS")
+            instrument = _cell(row, cols, "INSTRUMENT")
+            if (status and status.lower() != "active") or (instrument and instrument.lower() != "equity"):
+                continue
+            symbol = _cell(row, cols, "SECURITY ID")
+            name = _cell(row, cols, "SECURITY NAME", "ISSUER NAME")
+            exchange = "BSE"
+        else:
+            print(f"Symbol master: unrecognised file {path.name}")
+            return
+        if symbol:
+            yield {
+                "symbol": f"{symbol.upper()}.{exchange}",
+                "name": name,
+                "isin": _cell(row, cols, "ISIN NUMBER", "ISIN NO"),
+            }
+
+
+def _sources(directory: Path = MASTER_DIR) -> List[Path]:
+    if not directory.is_dir():
+        return []
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() == ".csv")
+
+
+def fingerprint(directory: Path = MASTER_DIR):
+    return (INDEX_VERSION,) + tuple(
+        (p.name, p.stat().st_size, p.stat().st_mtime_ns) for p in _sources(directory)
+    )
+
+
+def build_listings(paths: List[Path], curated: List[Dict]) -> List[Dict]:
+    """
+    One listing per company: cross-listed rows are merged by ISIN (NSE
+    first), curated listings keep their symbol and rank ahead of the rest.
+    """
+    merged: Dict[str, Dict] = {}
+    # NSE files first so the NSE symbol becomes the primary one
+    for path in sorted(paths, key=lambda p: "bse" in p.name.lower()):
+        for listing in _read_master(path):
+            key = listing["isin"] or listing["symbol"]
+            known = merged.get(key)
+            if known is None:
+                merged[key] = {**listing, "aliases": []}
+            elif listing["symbol"] != known["symbol"] and listing["symbol"] not in known["aliases"]:
+                known["aliases"].append(listing["symbol"])
+
+    by_base: Dict[str, Dict] = {}
+    for listing in merged.values():
+        for sym in (listing["symbol"], *listing["aliases"]):
+            by_base.setdefault(sym.split('.')[0], listing)
+
+    n = len(curated)
+    listings = []
+    for i, stock in enumerate(curated):
+        # Curated ordering ranks above every master-only listing
+        entry = {"symbol": stock["symbol"], "name": stock.get("name", ""), "popularity": 0.5 + 0.5 * (n - i) / n}
+        master = by_base.get(stock["symbol"].upper().split('.')[0])
+        if master is not None and not master.get("curated"):
+            master["curated"] = True
+            entry["isin"] = master["isin"]
+            entry["aliases"] = [s for s in (master["symbol"], *master["aliases"]) if s != stock["symbol"]]
+        listings.append(entry)
+    for listing in merged.values():
+        if not listing.pop("curated", False):
+            listing["popularity"] = 0.0
+            listings.append(listing)
+    return listings
+
+
+def _load_pickle(path: Path, fp):
+    try:
+        with open(path, 'rb') as f:
+            saved_fp, index = pickle.load(f)
+        return index if saved_fp == fp else None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Symbol master: ignoring unreadable {path.name}: {e}")
+        return None
+
+
+def _save_pickle(path: Path, fp, index: SymbolIndex):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump((fp, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Symbol master: could not save index: {e}")
+        tmp.unlink(missing_ok=True)
+
+
+def reload_if_changed(directory: Path = MASTER_DIR) -> bool:
+    """
+    Load (or rebuild) the index when the master files changed since the last
+    call and swap it in. Blocking; returns True when a new index went live.
+    """
+    global _fingerprint
+    fp = fingerprint(directory)
+    if fp == _fingerprint:
+        return False
+    if len(fp) == 1:
+        # No master files: back to the curated list only
+        swapped = _state["source"] is not None
+        if swapped:
+            local_search_service.set_index(SymbolIndex(local_search_service._STOCKS))
+            _state.update(listings=0, loaded_at=time.time(), source=None)
+        _fingerprint = fp
+        return swapped
+
+    start = time.perf_counter()
+    pickled = directory / INDEX_FILE
+    index = _load_pickle(pickled, fp)
+    source = "pickle"
+    if index is None:
+        listings = build_listings(_sources(directory), local_search_service._STOCKS)
+        index = SymbolIndex(listings)
+        _save_pickle(pickled, fp, index)
+        source = "csv"
+    local_search_service.set_index(index)
+    # Recorded only once the new index is live: a build that failed (e.g. on
+    # a half-written file) is retried on the next poll
+    _fingerprint = fp
+    _state.update(listings=len(index), loaded_at=time.time(), source=source)
+    print(f"Symbol master: {len(index)} listings loaded from {source} in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+def covers_market() -> bool:
+    """Is search backed by the full exchange masters (not just the curated list)?"""
+    return _state["source"] is not None
+
+
+def stats() -> Dict:
+    return {"dir": str(MASTER_DIR), "poll_seconds": POLL_SECONDS, **_state}
+
+
+async def _watch():
+    while True:
+        try:
+            await asyncio.to_thread(reload_if_changed)
+        except Exception as e:
+            print(f"Symbol master reload error: {e}")
+        await asyncio.sleep(POLL_SECONDS)
+
+
+def start():
+    """Load the masters and keep polling for changes (call on app startup)."""
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_watch())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
@@ -0,0 +1,221 @@
+"""
+Background cache warmer.
+
+Keeps the data behind /stock and /predict warm for a set of symbols, namely
+the configured watchlist (WARM_WATCHLIST and/or WARM_WATCHLIST_FILE, one
+symbol per line) followed by the most requested ones. The first visitor of
+the day then finds prices, fundamentals, news and the AI answer cached.
+
+- Full passes run once before the open (WARM_PREMARKET_MINUTES ahead) and
+  once the day's final bar is out (close + EOD settle), on weekdays.
+- Between them, every WARM_TICK_SECONDS a few symbols (WARM_PER_TICK) whose
+  fundamentals, news or AI entries are past WARM_AHEAD_FRACTION of their
+  cache TTL are refetched (bypassing the cache, so the entry is renewed
+  before it expires). New symbols are picked up the same way. News and AI
+  entries are only renewed on weekdays from the pre-market lead until the
+  day's final bar, when someone is likely to read them.
+
+Work is ordered by cost against provider limits: one bulk price download
+for all symbols, then yfinance fundamentals, then Alpha Vantage OVERVIEW at
+background priority (it only uses quota left over from user requests), and
+last the /predict pipeline (NewsAPI and Gemini), which is also capped at
+WARM_PREDICTIONS_PER_DAY. WARM_NEWS_PER_DAY caps every NewsAPI call the
+warmer makes: news refreshed on its own (its TTL is much shorter) and the
+one inside each prediction. Both budgets are per IST day and shared by all
+worker processes (WARM_BUDGET_FILE). A provider whose circuit is open is
+skipped.
+"""
+import asyncio
+import datetime
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+from routes.predict import PRICE_ORDER, warm_news, warm_prediction
+from services.alphavantage_service import fetch_overview_async
+from services.av_quota import background as av_background
+from services.local_search_service import most_requested
+from services.price_providers import fetch_prices_batch
+from services.price_store import canonical_symbol, load_prices_batch_async
+from services.yfinance_service import fetch_yf_fundamentals
+from utils.cache import POLICIES
+from utils.circuit_breaker import get_breaker
+from utils.daily_budget import DailyBudget
+from utils.market_hours import EOD_SETTLE, IST, MARKET_CLOSE, MARKET_OPEN, now_ist
+
+WARM_ENABLED = os.getenv("WARM_ENABLED", "1") != "0"
+WATCHLIST = os.getenv("WARM_WATCHLIST", "")
+WATCHLIST_FILE = Path(os.getenv("WARM_WATCHLIST_FILE") or Path(__file__).resolve().parent.parent / 'data' / 'watchlist.txt')
+TOP_REQUESTED = int(os.getenv("WARM_TOP_REQUESTED", "20"))
+MAX_SYMBOLS = int(os.getenv("WARM_MAX_SYMBOLS", "50"))
+TICK_SECONDS = float(os.getenv("WARM_TICK_SECONDS", "60"))
+PREMARKET_LEAD = datetime.timedelta(minutes=int(os.getenv("WARM_PREMARKET_MINUTES", "45")))
+PER_TICK = int(os.getenv("WARM_PER_TICK", "5"))
+CONCURRENCY = int(os.getenv("WARM_CONCURRENCY", "2"))
+AHEAD_FRACTION = float(os.getenv("WARM_AHEAD_FRACTION", "0.8"))
+PREDICTIONS_PER_DAY = int(os.getenv("WARM_PREDICTIONS_PER_DAY", "80"))
+NEWS_PER_DAY = int(os.getenv("WARM_NEWS_PER_DAY", "60"))
+BUDGET_PATH = Path(os.getenv("WARM_BUDGET_FILE") or Path(__file__).resolve().parent.parent / 'data' / 'warm_budget.json')
+# A full pass skips what was refreshed this recently
+FULL_PASS_MIN_AGE = 3600
+
+
+def _ttl(name: str) -> float:
+    ttl = POLICIES[name][0]
+    return ttl() if callable(ttl) else ttl
+
+
+def watchlist() -> List[str]:
+    """Watchlist symbols, then the most requested ones; canonical, deduplicated, capped."""
+    symbols = [s for s in WATCHLIST.split(",")]
+    try:
+        with open(WATCHLIST_FILE) as f:
+            symbols += [line.split("#")[0] for line in f]
+    except OSError:
+        pass
+    symbols += most_requested(TOP_REQUESTED)
+    symbols = [canonical_symbol(s) for s in symbols if s.strip()]
+    return list(dict.fromkeys(symbols))[:MAX_SYMBOLS]
+
+
+class Warmer:
+    def __init__(self):
+        # kind -> {symbol: monotonic time of the last refresh}
+        self.refreshed: Dict[str, Dict[str, float]] = {"fundamentals": {}, "news": {}, "prediction": {}}
+        self.passes: Dict[str, str] = {}
+        self.counts = {"prices": 0, "fundamentals": 0, "news": 0, "prediction": 0, "skipped": 0, "errors": 0}
+        self.budget = DailyBudget(BUDGET_PATH, {"news": NEWS_PER_DAY, "prediction": PREDICTIONS_PER_DAY})
+        self._task: asyncio.Task | None = None
+
+    def _interval(self, kind: str) -> float:
+        return _ttl({"prediction": "ai_recommendation"}.get(kind, kind)) * AHEAD_FRACTION
+
+    def _due(self, kind: str, symbols: List[str], min_age: float) -> List[str]:
+        now = time.monotonic()
+        last = self.refreshed[kind]
+        return [s for s in symbols if now - last.get(s, -float("inf")) >= min_age]
+
+    def _due_pass(self, now: datetime.datetime) -> str | None:
+        if now.weekday() >= 5:
+            return None
+        today = now.date()
+        open_at = datetime.datetime.combine(today, MARKET_OPEN, IST)
+        if open_at - PREMARKET_LEAD <= now < open_at and self.passes.get("premarket") != today.isoformat():
+            return "premarket"
+        eod = datetime.datetime.combine(today, MARKET_CLOSE, IST) + EOD_SETTLE
+        if now >= eod and self.passes.get("postclose") != today.isoformat():
+            return "postclose"
+        return None
+
+    @staticmethod
+    def _reading_hours(now: datetime.datetime) -> bool:
+        """Weekdays from the pre-market lead until the day's final bar is out."""
+        open_at = datetime.datetime.combine(now.date(), MARKET_OPEN, IST) - PREMARKET_LEAD
+        final_at = datetime.datetime.combine(now.date(), MARKET_CLOSE, IST) + EOD_SETTLE
+        return now.weekday() < 5 and open_at <= now < final_at
+
+    async def _each(self, symbols: List[str], job: Callable[[str], Awaitable[bool]]):
+        slots = asyncio.Semaphore(CONCURRENCY)
+
+        async def run(symbol):
+            async with slots:
+                try:
+                    if not await job(symbol):
+                        self.counts["skipped"] += 1
+                except Exception as e:
+                    self.counts["errors"] += 1
+                    print(f"Warmer: {job.__name__} failed for {symbol}: {e!r}")
+        await asyncio.gather(*(run(s) for s in symbols))
+
+    async def _prices(self, symbols: List[str]):
+        loaded = await load_prices_batch_async(symbols, lambda group, days: fetch_prices_batch(group, days, PRICE_ORDER))
+        self.counts["prices"] += sum(1 for s in symbols if len(loaded.get(s, ())))
+
+    async def _fundamentals(self, symbol: str) -> bool:
+        if get_breaker("yfinance").available():
+            await asyncio.to_thread(fetch_yf_fundamentals.refresh, symbol)
+        # /stock asks Alpha Vantage first; only spend quota users left over
+        with av_background():
+            await fetch_overview_async.refresh(symbol)
+        self.refreshed["fundamentals"][symbol] = time.monotonic()
+        self.counts["fundamentals"] += 1
+        return True
+
+    async def _news(self, symbol: str) -> bool:
+        if not get_breaker("newsapi").available() or not self.budget.spend(news=1):
+            return False
+        await warm_news(symbol)
+        self.refreshed["news"][symbol] = time.monotonic()
+        self.counts["news"] += 1
+        return True
+
+    async def _prediction(self, symbol: str) -> bool:
+        # One NewsAPI call on top: the pipeline refetches the news
+        if not get_breaker("gemini").available() or not self.budget.spend(prediction=1, news=1):
+            return False
+        await warm_prediction(symbol)
+        # The pipeline refetched the news too
+        self.refreshed["prediction"][symbol] = self.refreshed["news"][symbol] = time.monotonic()
+        self.counts["prediction"] += 1
+        return True
+
+    async def full_pass(self, reason: str):
+        symbols = watchlist()
+        if not symbols:
+            return
+        start = time.monotonic()
+        await self._prices(symbols)
+        await self._each(self._due("fundamentals", symbols, FULL_PASS_MIN_AGE), self._fundamentals)
+        await self._each(self._due("prediction", symbols, FULL_PASS_MIN_AGE), self._prediction)
+        print(f"Warmer: {reason} pass over {len(symbols)} symbols took {time.monotonic() - start:.0f}s")
+
+    async def tick(self, now: datetime.datetime):
+        """Refresh a few symbols whose entries are close to expiry (or were never warmed)."""
+        symbols = watchlist()
+        jobs = [("fundamentals", self._fundamentals)]
+        if self._reading_hours(now):
+            jobs += [("prediction", self._prediction), ("news", self._news)]
+        for kind, job in jobs:
+            due = self._due(kind, symbols, self._interval(kind))[:PER_TICK]
+            if due:
+                await self._each(due, job)
+
+    async def run(self):
+        while True:
+            try:
+                now = now_ist()
+                reason = self._due_pass(now)
+                if reason:
+                    await self.full_pass(reason)
+                    self.passes[reason] = now.date().isoformat()
+                else:
+                    await self.tick(now)
+            except Exception as e:
+                self.counts["errors"] += 1
+                print(f"Warmer error: {e!r}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    def start(self):
+        if WARM_ENABLED and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict:
+        spent = self.budget.stats()
+        return {
+            "enabled": WARM_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "symbols": len(watchlist()),
+            "passes": dict(self.passes),
+            "predictions_today": spent["prediction"],
+            "news_today": spent["news"],
+            **self.counts,
+        }
+
+
+warmer = Warmer()
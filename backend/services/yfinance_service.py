@@ -1,96 +1,166 @@
 import yfinance as yf
-import requests_cache
 import datetime
+import time
+import pandas as pd
+from typing import Dict
 
-# Install a cache for yfinance requests
-# This will create a 'yfinance.cache' 
-session = requests_cache.CachedSession('yfinance.cache')
-session.headers['User-agent'] = 'my-program/1.0'
+from utils.cache import cached
+from utils.circuit_breaker import get_breaker, protected, provider_error
+from utils.ohlcv import PriceArrays, YF_COLUMNS
+from utils.singleflight import single_flight
+
+# Results are cached per data type in utils.cache (yfinance itself must use
+# its own curl_cffi session, so a caching requests session can't be passed in)
+
+
+# Failures come back as the old silent fallbacks (empty, None, {}) via
+# protected(); only provider trouble (transport, 5xx, rate limits) counts
+# against the yfinance breaker, not unknown or delisted symbols
+@cached("prices")
+@single_flight
+@protected("yfinance", fallback=PriceArrays.empty, failure_if=provider_error)
+def fetch_yf_daily_arrays(symbol: str, days: int = 365) -> PriceArrays:
+    ticker = yf.Ticker(_yf_symbol(symbol))
+    return PriceArrays.from_frame(ticker.history(period=f'{days}d'), YF_COLUMNS)
 
 
 def fetch_yf_daily(symbol: str, days: int = 365):
-    try:
-        # yfinance symbols: 'RELIANCE.NS', 'TCS.NS', etc.
-        yf_symbol = symbol
-        if symbol.endswith('.BSE'):
-            yf_symbol = symbol.replace('.BSE', '.BO')
-        elif symbol.endswith('.NSE'):
-            yf_symbol = symbol.replace('.NSE', '.NS')
-        ticker = yf.Ticker(yf_symbol)
-        hist = ticker.history(period=f'{days}d')
-        if hist.empty:
-            return []
-        result = []
-        for date, row in hist.iterrows():
-            result.append({
-                "date": str(date.date()),
-                "open": float(row['Open']),
-                "high": float(row['High']),
-                "low": float(row['Low']),
-                "close": float(row['Close']),
-                "volume": int(row['Volume'])
-            })
-        result.reverse()  # most recent last
-        return result
-    except Exception:
-        # Silent failure - return empty, let route try next source
-        return []
+    """fetch_yf_daily_arrays() as latest-first records."""
+    return fetch_yf_daily_arrays(symbol, days).to_records()
+
+
+# Symbols per yf.download call; Yahoo handles large groups but one bad
+# ticker can stall a chunk, so keep them moderate
+BATCH_CHUNK = 50
+
+
+def fetch_yf_daily_batch(symbols, days: int = 365) -> Dict[str, PriceArrays]:
+    """
+    Daily bars for many symbols via yfinance's bulk multi-ticker download.
+    Returns {symbol: PriceArrays} for the symbols that came back with data;
+    each result also fills fetch_yf_daily_arrays' cache for that symbol.
+    A failing chunk loses only its own symbols; the whole batch counts as
+    one call for the yfinance breaker.
+    """
+    out = {}
+    todo = []
+    for symbol in dict.fromkeys(symbols):
+        hit = fetch_yf_daily_arrays.lookup(symbol, days)
+        if hit:
+            out[symbol] = hit
+        else:
+            todo.append(symbol)
+    breaker = get_breaker("yfinance")
+    if not todo or not breaker.allow():
+        return out
+    start = time.monotonic()
+    failed = False
+    for i in range(0, len(todo), BATCH_CHUNK):
+        chunk = todo[i:i + BATCH_CHUNK]
+        try:
+            out.update(_download_chunk(chunk, days))
+        except Exception as e:
+            print(f"yfinance batch download failed for {len(chunk)} symbols: {e!r}")
+            if provider_error(e):
+                # Later chunks would hit the same outage or rate limit
+                failed = True
+                break
+    breaker.record(not failed, time.monotonic() - start)
+    return out
+
 
+def _download_chunk(chunk, days: int) -> Dict[str, PriceArrays]:
+    out = {}
+    tickers = {_yf_symbol(s): s for s in chunk}
+    df = yf.download(list(tickers), period=f'{days}d', group_by='ticker', auto_adjust=True,
+                     threads=True, progress=False)
+    if df is None or df.empty:
+        return out
+    for yf_sym, symbol in tickers.items():
+        if isinstance(df.columns, pd.MultiIndex):
+            if yf_sym not in df.columns.get_level_values(0):
+                continue
+            hist = df[yf_sym]
+        else:
+            hist = df  # single ticker, flat columns
+        # Bulk frames share one date index; drop the other symbols' days
+        series = PriceArrays.from_frame(hist.dropna(subset=['Close']), YF_COLUMNS)
+        if len(series):
+            fetch_yf_daily_arrays.prime(series, symbol, days)
+            out[symbol] = series
+    return out
+
+
+@protected("yfinance", failure_if=provider_error)
+def fetch_yf_quote(symbol: str):
+    """Live (delayed) quote from yfinance, uncached; {} if it has no price."""
+    info = yf.Ticker(_yf_symbol(symbol)).fast_info
+    price = info.get("last_price")
+    prev = info.get("previous_close")
+    if price is None:
+        return {}
+    return {
+        "price": price,
+        "change": price - prev if prev else None,
+        "pchange": (price / prev - 1) * 100 if prev else None,
+        "open": info.get("open"),
+        "high": info.get("day_high"),
+        "low": info.get("day_low"),
+        "prev_close": prev,
+        "volume": info.get("last_volume"),
+    }
+
+
+def _yf_symbol(symbol: str) -> str:
+    # yfinance symbols: 'RELIANCE.NS', 'TCS.NS', etc.
+    if symbol.endswith('.BSE'):
+        return symbol.replace('.BSE', '.BO')
+    if symbol.endswith('.NSE'):
+        return symbol.replace('.NSE', '.NS')
+    return symbol
+
+@cached("company_names")
+@protected("yfinance", fallback=lambda: None, failure_if=provider_error)
 def get_company_name(symbol: str):
     """Extract just the company name from yfinance for a given symbol."""
-    try:
-        yf_symbol = symbol
-        if symbol.endswith('.BSE'):
-            yf_symbol = symbol.replace('.BSE', '.BO')
-        elif symbol.endswith('.NSE'):
-            yf_symbol = symbol.replace('.NSE', '.NS')
-        ticker = yf.Ticker(yf_symbol)
-        info = ticker.info
-        # Try multiple name fields in order of preference
-        return info.get("longName") or info.get("shortName") or None
-    except Exception:
-        return None
+    ticker = yf.Ticker(_yf_symbol(symbol))
+    info = ticker.info
+    # Try multiple name fields in order of preference
+    return info.get("longName") or info.get("shortName") or None
 
+@cached("fundamentals")
+@protected("yfinance", fallback=dict, failure_if=provider_error)
 def fetch_yf_fundamentals(symbol: str):
-    try:
-        yf_symbol = symbol
-        if symbol.endswith('.BSE'):
-            yf_symbol = symbol.replace('.BSE', '.BO')
-        elif symbol.endswith('.NSE'):
-            yf_symbol = symbol.replace('.NSE', '.NS')
-        ticker = yf.Ticker(yf_symbol)
-        info = ticker.info
-        
-        # Calculate dividend yield manually to avoid unit ambiguity
-        div_yield = info.get("dividendYield")
-        if info.get("dividendRate") and info.get("currentPrice"):
-            div_yield = info.get("dividendRate") / info.get("currentPrice")
-        elif info.get("dividendRate") and info.get("previousClose"):
-            div_yield = info.get("dividendRate") / info.get("previousClose")
-
-        return {
-            "pe_ratio": info.get("trailingPE"),
-            "eps": info.get("trailingEps"),
-            "return_on_equity": info.get("returnOnEquity"),
-            "return_on_assets": info.get("returnOnAssets"),
-            "profit_margin": info.get("profitMargins"),
-            "operating_margin": info.get("operatingMargins"),
-            "dividend_yield": div_yield,
-            "debt_to_equity": info.get("debtToEquity"),
-            "price_to_book": info.get("priceToBook"),
-            "ev_to_ebitda": info.get("enterpriseToEbitda"),
-            "quarterly_earnings_growth_yoy": info.get("earningsQuarterlyGrowth"),
-            "quarterly_revenue_growth_yoy": info.get("revenueQuarterlyGrowth"),
-            "beta": info.get("beta"),
-            "market_cap": info.get("marketCap"),
-            "high_52w": info.get("fiftyTwoWeekHigh"),
-            "low_52w": info.get("fiftyTwoWeekLow"),
-            "name": info.get("shortName"),
-            "industry_pe": info.get("industryPE"),
-            "book_value": info.get("bookValue"),
-            "face_value": info.get("faceValue"),
-        }
-    except Exception:
-        # Silent failure - return empty dict
-        return {}
+    ticker = yf.Ticker(_yf_symbol(symbol))
+    info = ticker.info
+    
+    # Calculate dividend yield manually to avoid unit ambiguity
+    div_yield = info.get("dividendYield")
+    if info.get("dividendRate") and info.get("currentPrice"):
+        div_yield = info.get("dividendRate") / info.get("currentPrice")
+    elif info.get("dividendRate") and info.get("previousClose"):
+        div_yield = info.get("dividendRate") / info.get("previousClose")
+
+    return {
+        "pe_ratio": info.get("trailingPE"),
+        "eps": info.get("trailingEps"),
+        "return_on_equity": info.get("returnOnEquity"),
+        "return_on_assets": info.get("returnOnAssets"),
+        "profit_margin": info.get("profitMargins"),
+        "operating_margin": info.get("operatingMargins"),
+        "dividend_yield": div_yield,
+        "debt_to_equity": info.get("debtToEquity"),
+        "price_to_book": info.get("priceToBook"),
+        "ev_to_ebitda": info.get("enterpriseToEbitda"),
+        "quarterly_earnings_growth_yoy": info.get("earningsQuarterlyGrowth"),
+        "quarterly_revenue_growth_yoy": info.get("revenueQuarterlyGrowth"),
+        "beta": info.get("beta"),
+        "market_cap": info.get("marketCap"),
+        "high_52w": info.get("fiftyTwoWeekHigh"),
+        "low_52w": info.get("fiftyTwoWeekLow"),
+        "name": info.get("shortName"),
+        "industry_pe": info.get("industryPE"),
+        "book_value": info.get("bookValue"),
+        "face_value": info.get("faceValue"),
+    }
 
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Run from anywhere: the app imports its modules relative to backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the module-level singletons (store, quota, caches) off the real data dir
+_scratch = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("PRICE_STORE_DIR", os.path.join(_scratch, "prices"))
+os.environ.setdefault("AV_QUOTA_FILE", os.path.join(_scratch, "av_quota.json"))
+os.environ.setdefault("CACHE_DIR", "")
@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from services import av_quota
+from services.av_quota import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, AVQuota, QuotaExhausted
+from utils.file_lock import fcntl
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1_000_000.0, "day": "2026-10-12"}
+    monkeypatch.setattr(av_quota.time, "time", lambda: now["t"])
+    monkeypatch.setattr(av_quota, "_utc_day", lambda: now["day"])
+    return now
+
+
+def grants(quota, n, priority=PRIORITY_HIGH):
+    granted = 0
+    for _ in range(n):
+        try:
+            quota.acquire(priority, max_wait=0)
+            granted += 1
+        except QuotaExhausted:
+            pass
+    return granted
+
+
+def test_per_minute_bucket_refills(tmp_path, clock):
+    quota = AVQuota(tmp_path / "q.json", per_minute=5, per_day=100)
+    assert grants(quota, 10) == 5
+    clock["t"] += 12  # one token at 5/minute
+    assert grants(quota, 10) == 1
+
+
+def test_lower_priorities_leave_a_reserve(tmp_path, clock):
+    quota = AVQuota(tmp_path / "q.json", per_minute=100, per_day=10)
+    assert grants(quota, 10, PRIORITY_LOW) == 10 - av_quota.RESERVE[PRIORITY_LOW]
+    assert grants(quota, 10, PRIORITY_NORMAL) == av_quota.RESERVE[PRIORITY_LOW] - av_quota.RESERVE[PRIORITY_NORMAL]
+    assert grants(quota, 10, PRIORITY_HIGH) == av_quota.RESERVE[PRIORITY_NORMAL]
+
+
+def test_background_floors_the_priority(tmp_path, clock):
+    quota = AVQuota(tmp_path / "q.json", per_minute=100, per_day=10)
+    with av_quota.background():
+        assert grants(quota, 10, PRIORITY_HIGH) == 10 - av_quota.RESERVE[PRIORITY_LOW]
+
+
+def test_day_rolls_over_and_state_survives_restart(tmp_path, clock):
+    path = tmp_path / "q.json"
+    quota = AVQuota(path, per_minute=100, per_day=3)
+    assert grants(quota, 5) == 3
+    assert grants(AVQuota(path, per_minute=100, per_day=3), 1) == 0  # restart sees the spend
+    clock["day"] = "2026-10-13"
+    assert grants(quota, 5) == 3
+
+
+def _contend(path, start, results):
+    import time
+    quota = AVQuota(path, per_minute=5, per_day=25)
+    while time.time() < start:
+        pass
+    results.put(grants(quota, 20))
+
+
+@pytest.mark.skipif(fcntl is None, reason="file locks need fcntl")
+def test_processes_share_one_budget(tmp_path):
+    import time
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    start = time.time() + 0.5
+    procs = [ctx.Process(target=_contend, args=(tmp_path / "q.json", start, results)) for _ in range(6)]
+    for p in procs:
+        p.start()
+    total = sum(results.get(timeout=30) for _ in procs)
+    for p in procs:
+        p.join()
+    # Five tokens in the bucket; at 5/minute the race can't earn another
+    assert total == 5
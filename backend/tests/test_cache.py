@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import TTLCache, cached
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(cache_module.time, "time", lambda: now["t"])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache("t", ttl=60)
+    cache.set("k", 1)
+    clock["t"] += 59
+    assert cache.get("k") == 1
+    clock["t"] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_callable_ttl_is_evaluated_on_set(clock):
+    ttl = {"s": 10}
+    cache = TTLCache("t", ttl=lambda: ttl["s"])
+    cache.set("a", 1)
+    ttl["s"] = 100
+    cache.set("b", 2)
+    clock["t"] += 50
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_memory_tier_evicts_least_recently_used(clock):
+    cache = TTLCache("t", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_restart_and_honours_ttl(tmp_path, clock):
+    TTLCache("t", ttl=60, path=tmp_path, max_disk=10).set("k", {"v": 1})
+    fresh = TTLCache("t", ttl=60, path=tmp_path, max_disk=10)
+    assert fresh.get("k") == {"v": 1}
+    assert fresh.stats()["disk_hits"] == 1
+    clock["t"] += 61
+    assert TTLCache("t", ttl=60, path=tmp_path, max_disk=10).get("k") is None
+
+
+def test_concurrent_disk_writes_of_one_key(tmp_path, clock, capsys):
+    import threading
+    caches = [TTLCache("t", ttl=60, path=tmp_path) for _ in range(8)]
+
+    def write(cache, n):
+        for i in range(50):
+            cache.set("k", {"writer": n, "i": i})
+
+    threads = [threading.Thread(target=write, args=(c, n)) for n, c in enumerate(caches)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert "disk write failed" not in capsys.readouterr().out
+    assert TTLCache("t", ttl=60, path=tmp_path).get("k")["i"] == 49
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_prune_keeps_max_disk_newest_files(tmp_path, clock):
+    cache = TTLCache("t", maxsize=100, ttl=60, path=tmp_path, max_disk=5)
+    for i in range(12):
+        cache.set(f"k{i}", i)
+    cache.prune()
+    assert len(list(tmp_path.glob("*.json"))) == 5
+
+
+def test_cached_skips_falsy_results_and_refresh_bypasses(monkeypatch, clock):
+    monkeypatch.setitem(cache_module.POLICIES, "test_kind", (60, 16, 0))
+    monkeypatch.delitem(cache_module.caches, "test_kind", raising=False)
+    calls = []
+
+    @cached("test_kind")
+    def fetch(symbol):
+        calls.append(symbol)
+        return {"n": len(calls)} if symbol != "EMPTY" else {}
+
+    assert fetch("A") == {"n": 1}
+    assert fetch("A") == {"n": 1}
+    fetch("EMPTY")
+    fetch("EMPTY")
+    assert calls == ["A", "EMPTY", "EMPTY"]
+    assert fetch.refresh("A") == {"n": 4}
+    assert fetch("A") == {"n": 4}
+
+
+def test_cached_async(monkeypatch, clock):
+    monkeypatch.setitem(cache_module.POLICIES, "test_async", (60, 16, 0))
+    monkeypatch.delitem(cache_module.caches, "test_async", raising=False)
+    calls = []
+
+    @cached("test_async")
+    async def fetch(symbol):
+        calls.append(symbol)
+        return [symbol]
+
+    async def run():
+        return [await fetch("A"), await fetch("A")]
+
+    assert asyncio.run(run()) == [["A"], ["A"]]
+    assert calls == ["A"]
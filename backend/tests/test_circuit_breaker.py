@@ -0,0 +1,156 @@
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now["t"])
+    return now
+
+
+def tripped(clock):
+    breaker = CircuitBreaker("test", window=60, min_calls=4, failure_rate=0.5, open_seconds=30)
+    for ok in (True, True, False, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_stays_closed_below_min_calls_and_rate(clock):
+    breaker = CircuitBreaker("test", window=60, min_calls=4, failure_rate=0.5, open_seconds=30)
+    for ok in (False, False, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED  # too few calls to judge
+
+    breaker = CircuitBreaker("test", window=60, min_calls=4, failure_rate=0.5, open_seconds=30)
+    for ok in (True, True, True, False, True, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED  # never half of them failed
+
+
+def test_old_calls_leave_the_window(clock):
+    breaker = CircuitBreaker("test", window=60, min_calls=4, failure_rate=0.5, open_seconds=30)
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    clock["t"] += 61
+    for ok in (True, True, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_open_refuses_until_cool_down(clock):
+    breaker = tripped(clock)
+    assert not breaker.allow()
+    assert not breaker.available()
+    assert breaker.health() == 0.0
+    clock["t"] += 30
+    assert breaker.available()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = tripped(clock)
+    clock["t"] += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # the probe is out
+    assert not breaker.available()
+
+
+def test_probe_success_closes(clock):
+    breaker = tripped(clock)
+    clock["t"] += 30
+    breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens(clock):
+    breaker = tripped(clock)
+    clock["t"] += 30
+    breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_abandoned_probe_frees_the_slot(clock):
+    breaker = tripped(clock)
+    clock["t"] += 30
+    breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_protected_records_and_refuses(clock, monkeypatch):
+    breaker = CircuitBreaker("flaky", window=60, min_calls=2, failure_rate=0.5, open_seconds=30)
+    monkeypatch.setitem(circuit_breaker.breakers, "flaky", breaker)
+
+    @circuit_breaker.protected("flaky")
+    def call(ok):
+        if not ok:
+            raise RuntimeError("upstream down")
+        return "data"
+
+    assert call(True) == "data"
+    with pytest.raises(RuntimeError):
+        call(False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        call(True)
+
+    @circuit_breaker.protected("flaky", fallback=lambda: [])
+    def quiet():
+        return "data"
+
+    assert quiet() == []
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _Response(status_code)
+
+
+class YFRateLimitError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error, counts", [
+    (ConnectionError("reset"), True),
+    (TimeoutError(), True),
+    (_HTTPError(503), True),
+    (_HTTPError(429), True),
+    (YFRateLimitError("Too Many Requests"), True),
+    (_HTTPError(404), False),
+    (KeyError("currentPrice"), False),
+    (ValueError("No data found, symbol may be delisted"), False),
+])
+def test_provider_error(error, counts):
+    assert circuit_breaker.provider_error(error) is counts
+
+
+def test_unknown_symbols_do_not_open_the_circuit(clock, monkeypatch):
+    breaker = CircuitBreaker("shared", window=60, min_calls=2, failure_rate=0.5, open_seconds=30)
+    monkeypatch.setitem(circuit_breaker.breakers, "shared", breaker)
+
+    @circuit_breaker.protected("shared", fallback=dict, failure_if=circuit_breaker.provider_error)
+    def info(symbol):
+        if symbol == "DOWN":
+            raise ConnectionError("reset")
+        raise KeyError(symbol)  # unknown or delisted
+
+    for symbol in ("NOPE1", "NOPE2", "NOPE3", "NOPE4"):
+        assert info(symbol) == {}
+    assert breaker.state == CLOSED
+    for _ in range(4):
+        info("DOWN")
+    assert breaker.state == OPEN
@@ -0,0 +1,53 @@
+import datetime
+import multiprocessing
+
+import pytest
+
+from utils import daily_budget
+from utils.daily_budget import DailyBudget
+from utils.file_lock import fcntl
+from utils.market_hours import IST
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": datetime.datetime(2026, 10, 12, 23, 0, tzinfo=IST)}
+    monkeypatch.setattr(daily_budget, "now_ist", lambda: now["t"])
+    return now
+
+
+def test_spend_is_all_or_nothing(tmp_path, clock):
+    budget = DailyBudget(tmp_path / "b.json", {"news": 3, "prediction": 5})
+    assert budget.spend(news=1)
+    assert budget.spend(prediction=1, news=1)
+    assert budget.spend(news=1)
+    assert not budget.spend(prediction=1, news=1)
+    assert budget.stats() == {"news": 3, "prediction": 1}
+
+
+def test_day_is_the_ist_day_and_survives_restart(tmp_path, clock):
+    path = tmp_path / "b.json"
+    assert DailyBudget(path, {"news": 1}).spend(news=1)
+    assert not DailyBudget(path, {"news": 1}).spend(news=1)  # restart sees the spend
+    clock["t"] += datetime.timedelta(minutes=59)  # 23:59 IST, still the same day
+    assert not DailyBudget(path, {"news": 1}).spend(news=1)
+    clock["t"] += datetime.timedelta(minutes=1)  # midnight IST
+    assert DailyBudget(path, {"news": 1}).spend(news=1)
+
+
+def _contend(path, results):
+    budget = DailyBudget(path, {"news": 10})
+    results.put(sum(budget.spend(news=1) for _ in range(20)))
+
+
+@pytest.mark.skipif(fcntl is None, reason="file locks need fcntl")
+def test_processes_share_one_budget(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_contend, args=(tmp_path / "b.json", results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    total = sum(results.get(timeout=30) for _ in procs)
+    for p in procs:
+        p.join()
+    assert total == 10
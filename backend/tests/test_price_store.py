@@ -0,0 +1,161 @@
+import datetime
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from services import price_store
+from services.price_store import PriceStore
+from utils.file_lock import fcntl
+from utils.market_hours import IST
+from utils.ohlcv import PriceArrays
+
+
+def bars(start, end, close=1.0):
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    c = np.full(len(dates), float(close))
+    return PriceArrays(dates, c, c, c, c, np.ones(len(dates), dtype=np.int64))
+
+
+def ist(day, hour, minute=0):
+    return datetime.datetime(2026, 10, day, hour, minute, tzinfo=IST)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(tmp_path)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Pin time.time() (used for checked_at / last_fetched_at) to a settable moment."""
+    now = {"t": ist(12, 11).timestamp()}
+    monkeypatch.setattr(price_store.time, "time", lambda: now["t"])
+    return now
+
+
+def test_append_overwrites_last_bar_and_adds_new(store):
+    store.merge("X.NSE", bars("2026-10-01", "2026-10-06", close=1))
+    added = store.merge("X.NSE", bars("2026-10-05", "2026-10-08", close=2))
+    series = store.read("X.NSE")
+    assert added == 2
+    assert len(series) == 7
+    assert series.close.tolist() == [1, 1, 1, 1, 2, 2, 2]
+    assert store.meta("X.NSE")["last_date"] == "2026-10-07"
+
+
+def test_backfill_merges_older_history(store):
+    store.merge("X.NSE", bars("2026-10-05", "2026-10-08", close=2))
+    store.merge("X.NSE", bars("2026-10-01", "2026-10-06", close=1))
+    series = store.read("X.NSE")
+    assert str(series.dates[0]) == "2026-10-01"
+    assert (np.diff(series.dates.astype(int)) == 1).all()
+    # Incoming rows win on duplicate dates
+    assert series.close.tolist() == [1, 1, 1, 1, 1, 2, 2]
+
+
+def test_empty_fetch_for_unknown_symbol_leaves_no_trace(store, tmp_path):
+    assert store.merge("NOPE.NSE", []) == 0
+    assert store.symbols() == []
+    assert not any(tmp_path.iterdir())
+
+
+def test_intraday_bar_is_re_requested_until_final(store, clock):
+    # Monday's bar stored at 11:00 IST, mid-session
+    store.merge("X.NSE", bars("2025-10-01", "2026-10-13"), full_window=365)
+    assert store.missing_days("X.NSE", 365, ist(12, 11, 1)) == 0  # just fetched
+    assert store.missing_days("X.NSE", 365, ist(12, 15, 45)) == 1
+    assert store.missing_days("X.NSE", 365, ist(12, 20)) == 1
+    assert store.missing_days("X.NSE", 365, ist(13, 12)) == 2
+
+    # Fetched again after close + settle: final until the next session closes
+    clock["t"] = ist(12, 16, 5).timestamp()
+    store.merge("X.NSE", bars("2026-10-12", "2026-10-13"))
+    assert store.missing_days("X.NSE", 365, ist(12, 20)) == 0
+    assert store.missing_days("X.NSE", 365, ist(13, 12)) == 0
+    assert store.missing_days("X.NSE", 365, ist(13, 16, 5)) == 2
+
+
+def test_short_fetch_does_not_mark_the_head_checked(store):
+    today = datetime.datetime.now(IST).date()
+    start = np.datetime64(today, "D")
+    # ~100 bars (Alpha Vantage compact) answering a 365-day request
+    store.merge("X.NSE", bars(start - 140, start), full_window=365)
+    assert store.meta("X.NSE")["head_days"] == 0
+    later = datetime.datetime.now(IST) + datetime.timedelta(seconds=price_store.HEAD_RECHECK_SECONDS + 1)
+    assert store.missing_days("X.NSE", 365, later) == 365
+
+    store.merge("X.NSE", bars(start - 365, start), full_window=365)
+    assert store.meta("X.NSE")["head_days"] == 365
+    assert store.missing_days("X.NSE", 365, later) < 365
+
+
+def _merge_worker(root, k):
+    store = PriceStore(root)
+    base = np.datetime64("2024-01-01", "D")
+    for i in range(40):
+        lo = k * 500 + i * 3
+        store.merge("X.NSE", bars(base + lo, base + lo + 5, close=k))
+
+
+@pytest.mark.skipif(fcntl is None, reason="file locks need fcntl")
+def test_concurrent_merges_from_several_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_merge_worker, args=(str(tmp_path), k % 2)) for k in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+    store = PriceStore(tmp_path)
+    series = store.read("X.NSE")
+    meta = store.meta("X.NSE")
+    assert len(series) == meta["rows"] == 2 * (39 * 3 + 5)
+    assert (np.diff(series.dates.astype(int)) > 0).all()
+    assert str(series.dates[-1]) == meta["last_date"]
+
+
+def test_read_sees_a_rewrite_by_another_process(tmp_path):
+    reader, writer = PriceStore(tmp_path), PriceStore(tmp_path)
+    writer.merge("X.NSE", bars("2026-10-01", "2026-10-06", close=1))
+    assert reader.read("X.NSE").close.tolist() == [1] * 5
+    # Same dates again: the rewrite path replaces the files, same row count
+    writer.merge("X.NSE", bars("2026-10-01", "2026-10-06", close=3))
+    assert reader.read("X.NSE").close.tolist() == [3] * 5
+
+
+def test_map_cache_is_bounded(store, monkeypatch):
+    monkeypatch.setattr(price_store, "MAX_MAPS", 3)
+    for k in range(5):
+        store.merge(f"S{k}.NSE", bars("2026-10-01", "2026-10-06"))
+        store.read(f"S{k}.NSE")
+    store.read("S2.NSE")
+    assert list(store._maps) == ["S3.NSE", "S4.NSE", "S2.NSE"]
+
+
+def test_readjusted_history_is_fetched_again_and_replaced(store, clock):
+    # Final bars through Monday 12th (fetched after Monday's close + settle)
+    clock["t"] = ist(12, 16, 5).timestamp()
+    store.merge("X.NSE", bars("2026-09-01", "2026-10-13", close=100), full_window=40)
+    # Tuesday: a partial bar changing is not a re-adjustment
+    clock["t"] = ist(13, 11).timestamp()
+    store.merge("X.NSE", bars("2026-10-12", "2026-10-14", close=100))
+    assert not store.meta("X.NSE").get("readjust")
+    clock["t"] = ist(13, 16, 5).timestamp()
+    store.merge("X.NSE", bars("2026-10-13", "2026-10-14", close=100))
+
+    # Wednesday: a dividend went ex; the provider now returns Tuesday at 98
+    clock["t"] = ist(14, 16, 5).timestamp()
+    store.merge("X.NSE", PriceArrays.from_records([
+        {"date": "2026-10-13", "open": 98, "high": 98, "low": 98, "close": 98, "volume": 1},
+        {"date": "2026-10-14", "open": 97, "high": 97, "low": 97, "close": 97, "volume": 1},
+    ]))
+    assert store.meta("X.NSE")["readjust"]
+    need = store.missing_days("X.NSE", 30, ist(14, 16, 6))
+    assert need == (datetime.date(2026, 10, 14) - datetime.date(2026, 9, 1)).days + 1
+
+    store.merge("X.NSE", bars("2026-09-01", "2026-10-15", close=50), full_window=30)
+    series = store.read("X.NSE")
+    assert "readjust" not in store.meta("X.NSE")
+    assert series.close.tolist() == [50] * len(series)
+    assert str(series.dates[0]) == "2026-09-01" and str(series.dates[-1]) == "2026-10-14"
@@ -0,0 +1,16 @@
+from utils.prompt_builder import _num, price_table
+
+
+def test_num_drops_only_fractional_zeros():
+    assert _num(101.50, 2) == "101.5"
+    assert _num(100.0, 2) == "100"
+    assert _num(1500000.0, 0) == "1500000"
+    assert _num(1230.0, 0) == "1230"
+    assert _num(1234.6, 0) == "1235"
+    assert _num(1500000, 0) == "1500000"
+    assert _num(None, 2) == ""
+
+
+def test_price_table_keeps_float_volumes():
+    bars = [{"date": "2025-01-02", "open": 10.0, "high": 12.5, "low": 9.75, "close": 12.0, "volume": 1500000.0}]
+    assert price_table(bars, budget=1000).splitlines()[1] == "2025-01-02,10,12.5,9.75,12,1500000"
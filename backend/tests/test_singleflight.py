@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_threads_share_one_call():
+    group = SingleFlight("t")
+    calls = []
+    start = threading.Barrier(5)
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    results = []
+
+    def caller():
+        start.wait()
+        results.append(group.do("k", slow, 21))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [42] * 5
+    assert calls == [21]
+    assert group.stats()["in_flight"] == 0
+
+
+def test_thread_followers_see_the_leaders_error():
+    group = SingleFlight("t")
+    gate = threading.Event()
+
+    def failing():
+        gate.wait()
+        raise ValueError("boom")
+
+    errors = []
+
+    def caller():
+        try:
+            group.do("k", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3
+
+
+def test_async_callers_share_one_task_and_survive_a_cancelled_follower():
+    group = AsyncSingleFlight("t")
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.1)
+        return x
+
+    async def run():
+        impatient = asyncio.ensure_future(group.do("k", slow, 1))
+        others = [group.do("k", slow, 1) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        results = await asyncio.gather(*others)
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return results
+
+    assert asyncio.run(run()) == [1, 1, 1]
+    assert calls == [1]
+    # Finished calls are not cached
+    assert asyncio.run(group.do("k", slow, 2)) == 2
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from utils.indicators import TECH_INDICATORS, IndicatorFrame
+from utils.streaming import IndicatorState
+
+SPEC = {name: args for name, args in TECH_INDICATORS.items()}
+SPEC.update({"EMA_12": ("ema", 12), "RSI_7": ("rsi", 7)})
+
+
+def history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-01") + n)
+    return [
+        {"date": str(d), "open": c, "high": c * 1.01, "low": c * 0.99, "close": c, "volume": 1000}
+        for d, c in zip(dates, close)
+    ]
+
+
+def close_enough(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(close_enough(a[k], b[k]) for k in a)
+    if a is None or b is None or isinstance(a, str):
+        return a == b
+    return a == pytest.approx(b, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("n", [5, 30, 260, 1200])
+def test_streaming_matches_batch_at_every_bar(n):
+    prices = history(n)
+    state = IndicatorState(SPEC)
+    for i, bar in enumerate(prices):
+        values = state.update(bar)
+        if i % 25 == 0 or i == n - 1:
+            expected = IndicatorFrame(prices[:i + 1]).compute(SPEC)
+            assert close_enough(values, expected), i
+
+
+def test_state_round_trips_through_json_mid_stream():
+    prices = history(400, seed=1)
+    state = IndicatorState.from_history(prices[:300], SPEC)
+    restored = IndicatorState.from_json(state.to_json())
+    for bar in prices[300:]:
+        restored.update(bar)
+    assert close_enough(restored.values(), IndicatorFrame(prices).compute(SPEC))
+
+
+def test_old_or_repeated_bars_are_ignored():
+    prices = history(60)
+    state = IndicatorState.from_history(prices, SPEC)
+    before = state.values()
+    assert state.update(prices[-1]) == before
+    assert state.update(prices[10]) == before
@@ -0,0 +1,55 @@
+import sys
+import threading
+
+from services import local_search_service
+from services.symbol_index import HOT_MAX, SymbolIndex
+
+
+def listings(n):
+    return [{"symbol": f"SYM{i}.NSE", "name": f"Sample {i} Industries Ltd"} for i in range(n)]
+
+
+def test_hits_rank_requested_symbols_first():
+    index = SymbolIndex(listings(50))
+    assert [r["symbol"] for r in index.search("sym4", 2)] == ["SYM4.NSE", "SYM40.NSE"]
+    for _ in range(5):
+        index.record_hit("SYM49.NSE")
+    # An exact symbol still wins; requests reorder the rest
+    assert [r["symbol"] for r in index.search("sym4", 2)] == ["SYM4.NSE", "SYM49.NSE"]
+
+
+def test_search_while_hits_are_recorded():
+    index = SymbolIndex(listings(3000))
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    errors, stop = [], threading.Event()
+
+    def searcher():
+        try:
+            while not stop.is_set():
+                index.search("s")  # pooled prefix: scans the hit counter
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=searcher)
+    thread.start()
+    try:
+        for round_ in range(20):
+            for i in range(HOT_MAX + 1):
+                index.record_hit(f"SYM{(i + round_ * 700) % 3000}.NSE")
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert len(index.hits) <= HOT_MAX
+
+
+def test_request_counter_is_bounded(monkeypatch):
+    monkeypatch.setattr(local_search_service, "_requests", local_search_service.Counter())
+    for _ in range(3):
+        local_search_service.record_request("POPULAR.NSE")
+    for i in range(local_search_service.REQUESTS_MAX + 10):
+        local_search_service.record_request(f"JUNK{i}")
+    assert len(local_search_service._requests) <= local_search_service.REQUESTS_MAX
+    assert local_search_service.most_requested(1) == ["POPULAR.NSE"]
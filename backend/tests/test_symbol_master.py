@@ -0,0 +1,33 @@
+import pytest
+
+from services import local_search_service, symbol_master
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_master, "_fingerprint", None)
+    monkeypatch.setattr(symbol_master, "_state", {"listings": 0, "loaded_at": None, "source": None})
+    monkeypatch.setattr(local_search_service, "index", local_search_service.index)
+    (tmp_path / "EQUITY_L.csv").write_text(
+        "SYMBOL,NAME OF COMPANY,SERIES,ISIN NUMBER\n"
+        "ZZTEST,Zz Test Industries Limited,EQ,INE000Z01011\n"
+    )
+    return tmp_path
+
+
+def test_failed_build_is_retried_on_the_next_poll(master, monkeypatch):
+    build = symbol_master.build_listings
+
+    def broken(*args):
+        raise ValueError("half-written file")
+
+    monkeypatch.setattr(symbol_master, "build_listings", broken)
+    with pytest.raises(ValueError):
+        symbol_master.reload_if_changed(master)
+    assert not symbol_master.covers_market()
+
+    monkeypatch.setattr(symbol_master, "build_listings", build)
+    assert symbol_master.reload_if_changed(master)
+    assert symbol_master.covers_market()
+    assert local_search_service.index.lookup("ZZTEST.NSE")["name"] == "Zz Test Industries Limited"
+    assert not symbol_master.reload_if_changed(master)  # unchanged files: nothing to do
@@ -0,0 +1,111 @@
+"""
+Vectorized backtests of the recommendation rules.
+
+A rule turns a symbols x bars IndicatorFrame (see ohlcv.stack_frame) into
+target positions for every bar at once: 1 long, 0 flat (-1 short when
+allowed). Bars where the rule says "hold" keep the previous position,
+filled forward with an index trick rather than a loop over days.
+
+A position taken at a bar's close earns the next bar's return. Costs
+(cost_bps per unit of position change) are charged on the bar the held
+position changes. NaN padding (shorter histories) counts as flat.
+"""
+from typing import Dict
+
+import numpy as np
+
+from utils.indicators import IndicatorFrame
+
+TRADING_DAYS = 252
+
+
+def _ffill(signal: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value forward along the last axis; leading NaN -> 0."""
+    idx = np.where(np.isnan(signal), 0, np.arange(signal.shape[-1]))
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    out = np.take_along_axis(signal, idx, axis=-1)
+    return np.nan_to_num(out, nan=0.0)
+
+
+def rsi_positions(frame: IndicatorFrame, period: int = 14, lower: float = 30, upper: float = 70,
+                  short: bool = False) -> np.ndarray:
+    """generate_recommendation's rule: RSI < lower = Buy, RSI > upper = Sell, else Hold."""
+    rsi = frame.rsi_series(period)
+    signal = np.full(rsi.shape, np.nan)
+    signal[rsi < lower] = 1.0
+    signal[rsi > upper] = -1.0 if short else 0.0
+    return _ffill(signal)
+
+
+def sma_positions(frame: IndicatorFrame, short_window: int = 20, long_window: int = 50,
+                  short: bool = False) -> np.ndarray:
+    """moving_average_crossover's rule: bullish (short SMA above long) = long, bearish = out."""
+    fast = frame.sma_series(short_window)
+    slow = frame.sma_series(long_window)
+    signal = np.full(fast.shape, np.nan)
+    signal[fast > slow] = 1.0
+    signal[fast < slow] = -1.0 if short else 0.0
+    return _ffill(signal)
+
+
+RULES = {"rsi": rsi_positions, "sma": sma_positions}
+
+
+def backtest(close: np.ndarray, positions: np.ndarray, cost_bps: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Per-row (symbol) performance of `positions` over `close` (both symbols x
+    bars): total and annualized return, annualized volatility, Sharpe, max
+    drawdown, number of trades, hit rate (share of trades that made money),
+    exposure, and buy-and-hold return for comparison. NaN where undefined.
+    """
+    close = np.atleast_2d(close)
+    positions = np.atleast_2d(positions)
+    rows, bars = close.shape
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = np.zeros_like(close)
+        ret[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+    ret = np.nan_to_num(ret, nan=0.0, posinf=0.0, neginf=0.0)
+
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    turnover = np.abs(np.diff(held, axis=-1, prepend=0.0))
+    strat = held * ret - turnover * cost_bps / 1e4
+
+    log_equity = np.cumsum(np.log1p(np.maximum(strat, -0.999999)), axis=-1)
+    equity = np.exp(log_equity)
+    drawdown = equity / np.maximum.accumulate(np.maximum(equity, 1.0), axis=-1) - 1
+
+    present = ~np.isnan(close)
+    n_bars = present.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        years = n_bars / TRADING_DAYS
+        total = equity[:, -1] - 1 if bars else np.full(rows, np.nan)
+        annual = np.where(years > 0, (1 + total) ** (1 / years) - 1, np.nan)
+        mean = strat.sum(axis=-1) / n_bars
+        std = np.sqrt(((strat - mean[:, None]) ** 2 * present).sum(axis=-1) / (n_bars - 1))
+        first = np.take_along_axis(close, np.argmax(present, axis=-1)[:, None], axis=-1)[:, 0]
+        buy_hold = close[:, -1] / first - 1 if bars else np.full(rows, np.nan)
+
+    # Trades: maximal runs of the same non-zero held position
+    prev = np.concatenate([np.zeros((rows, 1)), held[:, :-1]], axis=-1)
+    nxt = np.concatenate([held[:, 1:], np.zeros((rows, 1))], axis=-1)
+    start_r, start_c = np.nonzero((held != 0) & (held != prev))
+    end_r, end_c = np.nonzero((held != 0) & (held != nxt))
+    # Both come out in row-major order, so the k-th start pairs with the k-th end
+    before = np.where(start_c > 0, log_equity[start_r, np.maximum(start_c - 1, 0)], 0.0)
+    wins = (log_equity[end_r, end_c] - before) > 0
+    trades = np.bincount(start_r, minlength=rows)
+    won = np.bincount(start_r, weights=wins, minlength=rows)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "total_return": total,
+            "annual_return": annual,
+            "volatility": std * np.sqrt(TRADING_DAYS),
+            "sharpe": np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), np.nan),
+            "max_drawdown": drawdown.min(axis=-1) if bars else np.full(rows, np.nan),
+            "trades": trades.astype(float),
+            "hit_rate": np.where(trades > 0, won / trades, np.nan),
+            "exposure": (held != 0).sum(axis=-1) / n_bars,
+            "buy_hold_return": buy_hold,
+        }
@@ -0,0 +1,78 @@
+"""
+Helpers for the streaming endpoints: parsing a symbol list, streaming one
+NDJSON line per symbol as soon as its result is ready, and Server-Sent
+Events framing. Also json_response() for large non-streamed payloads.
+"""
+import asyncio
+import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+
+import orjson
+from fastapi import HTTPException, Response
+
+BATCH_MAX_SYMBOLS = int(os.getenv("BATCH_MAX_SYMBOLS", "50"))
+# Per-symbol work (fundamentals, news, AI) running at once within one batch
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+# Streamed responses opt out of GZipMiddleware (and proxy buffering), which
+# would otherwise hold lines back
+STREAM_HEADERS = {"Content-Encoding": "identity", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def json_bytes(data) -> bytes:
+    """orjson with numpy values and NaN (as null) handled; anything else unknown as str()."""
+    return orjson.dumps(data, default=str, option=_JSON_OPTIONS)
+
+
+def json_response(data) -> Response:
+    """
+    A JSON response serialized here. Returning a plain dict makes FastAPI run
+    jsonable_encoder over it before the response class dumps it, which costs
+    far more than the dump itself on a price history.
+    """
+    return Response(json_bytes(data), media_type="application/json")
+
+
+def parse_symbols(raw: str, limit: int = BATCH_MAX_SYMBOLS) -> List[str]:
+    """Comma-separated symbols, blanks and duplicates removed, order kept."""
+    symbols = list(dict.fromkeys(s.strip() for s in (raw or "").split(",") if s.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(symbols) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} symbols per batch")
+    return symbols
+
+
+async def ndjson_as_completed(jobs: Dict[str, Callable[[], Awaitable[Dict]]],
+                              concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[bytes]:
+    """
+    Run {symbol: job()} with at most `concurrency` in flight and yield each
+    result as one JSON line in completion order. A failing symbol yields
+    {"symbol": ..., "error": ...} instead of ending the stream. Unfinished
+    jobs are cancelled if the client goes away.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(symbol: str, job: Callable[[], Awaitable[Dict]]) -> Dict:
+        async with slots:
+            try:
+                return await job()
+            except Exception as e:
+                return {"symbol": symbol, "error": str(e)}
+
+    tasks = [asyncio.create_task(run(symbol, job)) for symbol, job in jobs.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            yield json_bytes(result) + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def sse_event(event: str, data) -> bytes:
+    """One Server-Sent Event with a JSON payload (orjson output has no newlines)."""
+    return b"event: " + event.encode() + b"\ndata: " + json_bytes(data) + b"\n\n"
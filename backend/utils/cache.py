@@ -0,0 +1,285 @@
+"""
+Two-tier caches: an in-process LRU in front of a directory of JSON files.
+
+TTLCache is an LRU with per-entry expiry and hit/miss counters. Given a
+directory it also writes entries through to disk (one JSON file per key) so
+they survive restarts; values must then be JSON-serializable.
+
+Each kind of provider data has its own cache with its own TTL and size
+budgets (POLICIES); services opt in with the @cached decorator. Only truthy
+results are stored, since the providers signal failure with [], {} or None.
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from utils.market_hours import bar_pending, seconds_until_next_eod
+
+_MISSING = object()
+
+# Set CACHE_DIR to "" to keep every cache in memory only
+CACHE_DIR = os.getenv("CACHE_DIR", str(Path(__file__).resolve().parent.parent / "data" / "cache"))
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# A series fetched during a session ends in that day's partial bar
+PARTIAL_PRICES_TTL = float(os.getenv("CACHE_PARTIAL_PRICES_TTL", "300"))
+
+
+def _prices_ttl() -> float:
+    ttl = seconds_until_next_eod()
+    return min(ttl, PARTIAL_PRICES_TTL) if bar_pending() else ttl
+
+
+# name -> (ttl seconds or a callable returning them, memory entries, disk entries)
+POLICIES = {
+    # EOD series stay valid until the next session's bar is out (briefly
+    # while today's bar is still forming). The price store is their durable
+    # copy, so they are not written to disk here.
+    "prices": (_prices_ttl, int(os.getenv("CACHE_PRICES_SIZE", "256")), 0),
+    "fundamentals": (float(os.getenv("CACHE_FUNDAMENTALS_TTL", str(DAY))),
+                     int(os.getenv("CACHE_FUNDAMENTALS_SIZE", "1024")), 4096),
+    "news": (float(os.getenv("CACHE_NEWS_TTL", str(15 * 60))), int(os.getenv("CACHE_NEWS_SIZE", "512")), 2048),
+    "search": (float(os.getenv("CACHE_SEARCH_TTL", str(3 * DAY))), int(os.getenv("CACHE_SEARCH_SIZE", "2048")), 8192),
+    "company_names": (float(os.getenv("CACHE_NAMES_TTL", str(7 * DAY))), 4096, 16384),
+    "ai_recommendation": (float(os.getenv("AI_CACHE_TTL", str(12 * HOUR))), int(os.getenv("AI_CACHE_SIZE", "512")), 4096),
+}
+
+
+def content_key(*parts: Any) -> str:
+    """Stable SHA-256 over a canonical JSON encoding of `parts`."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float | Callable[[], float] = 3600,
+                 path: str | Path | None = None, max_disk: int | None = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.max_disk = max_disk
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        if self.path:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, key: str) -> Path:
+        # Keys may be arbitrary strings; hash them into a safe file name
+        return self.path / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+        item = self._load(key, now)
+        with self._lock:
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.disk_hits += 1
+            self._put(key, item[0], item[1])
+            return item[1]
+
+    def set(self, key: str, value, ttl: float | None = None):
+        if ttl is None:
+            ttl = self.ttl() if callable(self.ttl) else self.ttl
+        expires = time.time() + ttl
+        with self._lock:
+            self._put(key, expires, value)
+        if self.path:
+            # Unique per writer: other threads and worker processes may be
+            # writing the same key at the same time
+            tmp = self._file(key).with_suffix(f".{os.getpid()}.{uuid.uuid4().hex}.tmp")
+            try:
+                with open(tmp, "w") as f:
+                    json.dump({"key": key, "expires": expires, "value": value}, f)
+                os.replace(tmp, self._file(key))
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Cache {self.name}: disk write failed: {e}")
+                tmp.unlink(missing_ok=True)
+                return
+            self._writes += 1
+            if self.max_disk and self._writes % max(1, self.max_disk // 10) == 0:
+                self.prune()
+
+    def prune(self):
+        """Trim the disk tier to max_disk files, dropping the least recently written."""
+        if not self.path or not self.max_disk:
+            return
+        try:
+            files = sorted(self.path.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        except OSError:
+            return
+        for f in files[:max(0, len(files) - self.max_disk)]:
+            try:
+                f.unlink()
+            except OSError:
+                pass
+
+    def _put(self, key: str, expires: float, value):
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str, now: float):
+        if not self.path:
+            return _MISSING
+        try:
+            with open(self._file(key)) as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        if item.get("key") != key or item.get("expires", 0) <= now:
+            return _MISSING
+        return (item["expires"], item["value"])
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.path:
+            try:
+                self._file(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self.path:
+            for f in self.path.glob("*.json"):
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": None if callable(self.ttl) else self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "persistent": bool(self.path),
+            "max_disk": self.max_disk if self.path else 0,
+        }
+
+
+caches: Dict[str, TTLCache] = {}
+
+
+def get_cache(name: str) -> TTLCache:
+    """The shared cache for data kind `name`, built from POLICIES on first use."""
+    cache = caches.get(name)
+    if cache is None:
+        ttl, maxsize, max_disk = POLICIES.get(name, (HOUR, 1024, 0))
+        path = Path(CACHE_DIR) / name if CACHE_DIR and max_disk else None
+        cache = caches[name] = TTLCache(name, maxsize=maxsize, ttl=ttl, path=path, max_disk=max_disk)
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict]:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def invalidate(name: str | None = None):
+    """Drop every entry of one cache, or of all of them."""
+    for cache_name, cache in list(caches.items()):
+        if name is None or cache_name == name:
+            cache.clear()
+
+
+def cached(name: str, key: str | None = None):
+    """
+    Cache a provider function's results in cache `name`, keyed by `key`
+    (default: the function's qualified name) and its bound arguments, defaults
+    applied. Give a sync function and its async twin the same `key` to share
+    entries. Falsy results are not stored. The wrapper's
+    invalidate(*args, **kwargs) drops one entry, lookup(*args, **kwargs)
+    peeks at it, prime(value, *args, **kwargs) fills it and
+    refresh(*args, **kwargs) calls the function regardless of the cache,
+    keeping the old entry if the new result is falsy.
+    """
+    def deco(fn):
+        cache = get_cache(name)
+        sig = inspect.signature(fn)
+        qualname = key or f"{fn.__module__}.{fn.__qualname__}"
+
+        def key_for(args, kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return content_key(qualname, bound.arguments)
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                key = key_for(args, kwargs)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                value = await fn(*args, **kwargs)
+                if value:
+                    cache.set(key, value)
+                return value
+
+            async def refresh(*args, **kwargs):
+                value = await fn(*args, **kwargs)
+                if value:
+                    cache.set(key_for(args, kwargs), value)
+                return value
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = key_for(args, kwargs)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                value = fn(*args, **kwargs)
+                if value:
+                    cache.set(key, value)
+                return value
+
+            def refresh(*args, **kwargs):
+                value = fn(*args, **kwargs)
+                if value:
+                    cache.set(key_for(args, kwargs), value)
+                return value
+
+        wrapper.invalidate = lambda *args, **kwargs: cache.invalidate(key_for(args, kwargs))
+        wrapper.lookup = lambda *args, **kwargs: cache.get(key_for(args, kwargs))
+        # Store a result obtained some other way (e.g. a bulk download) for one call
+        wrapper.prime = lambda value, *args, **kwargs: cache.set(key_for(args, kwargs), value) if value else None
+        wrapper.refresh = refresh
+        wrapper.cache = cache
+        return wrapper
+    return deco
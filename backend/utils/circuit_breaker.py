@@ -0,0 +1,240 @@
+"""
+Per-provider circuit breakers with health scoring.
+
+Each breaker keeps the outcomes of recent calls (rolling time window). When
+enough of them fail the circuit opens and calls are refused without waiting
+on the provider; after a cool-down one probe call is let through (half-open)
+and its result decides whether the circuit closes again.
+
+health() folds error rate, latency and state into a 0..1 score that the
+price provider chain uses to reorder sources.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "120"))
+MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "8"))
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: float = WINDOW_SECONDS, min_calls: int = MIN_CALLS,
+                 failure_rate: float = FAILURE_RATE, open_seconds: float = OPEN_SECONDS,
+                 slow_call: float = SLOW_CALL_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.slow_call = slow_call
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def available(self) -> bool:
+        """Would a call be let through right now? Doesn't claim the half-open probe."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= self.open_seconds
+        return not self._probing
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """The call was abandoned (e.g. lost a race) without an outcome."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                    return
+            self._calls.append((now, ok, latency))
+            self._trim(now)
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, good, _ in self._calls if not good)
+                if failures / len(self._calls) >= self.failure_rate:
+                    self._open(now)
+
+    def _open(self, now: float):
+        if self.state != OPEN:
+            print(f"Circuit breaker '{self.name}' opened")
+        self.state = OPEN
+        self.opened_at = now
+
+    def _summary(self):
+        self._trim(time.monotonic())
+        calls = list(self._calls)
+        n = len(calls)
+        errors = sum(1 for _, ok, _ in calls if not ok)
+        latency = sum(lat for _, _, lat in calls) / n if n else None
+        return n, (errors / n if n else 0.0), latency
+
+    def health(self) -> float:
+        with self._lock:
+            if self.state == OPEN:
+                return 0.0
+            n, error_rate, latency = self._summary()
+            score = 1.0 - error_rate
+            if latency is not None:
+                score *= 1.0 / (1.0 + latency / self.slow_call)
+            if self.state == HALF_OPEN:
+                score *= 0.5
+            return round(score, 3)
+
+    def snapshot(self) -> Dict:
+        health = self.health()
+        with self._lock:
+            n, error_rate, latency = self._summary()
+            return {
+                "state": self.state,
+                "health": health,
+                "calls": n,
+                "error_rate": round(error_rate, 3),
+                "avg_latency": round(latency, 3) if latency is not None else None,
+                "rejected": self.rejected,
+            }
+
+
+PROVIDERS = ("yfinance", "alphavantage", "nse", "newsapi", "gemini")
+breakers: Dict[str, CircuitBreaker] = {name: CircuitBreaker(name) for name in PROVIDERS}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    if name not in breakers:
+        breakers[name] = CircuitBreaker(name)
+    return breakers[name]
+
+
+def breaker_states() -> Dict[str, Dict]:
+    return {name: b.snapshot() for name, b in breakers.items()}
+
+
+def rank_providers(names: List[str]) -> List[str]:
+    """
+    Drop providers whose circuit is open and move degraded ones (health below
+    0.5) behind healthy ones, keeping the given preference order otherwise.
+    """
+    usable = [n for n in names if get_breaker(n).available()]
+    return sorted(usable, key=lambda n: get_breaker(n).health() < 0.5)
+
+
+def _status(e: BaseException) -> int | None:
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status if status is not None else getattr(e, "status_code", None)
+
+
+def provider_error(e: BaseException) -> bool:
+    """
+    Is `e` the provider being unwell (transport error, timeout, 5xx, rate
+    limit) rather than it answering that the symbol is unknown (empty data,
+    missing keys, 404)? Only the former should open a shared circuit.
+    """
+    status = _status(e)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    if isinstance(e, (OSError, httpx.TransportError)):  # incl. ConnectionError, TimeoutError
+        return True
+    # yfinance's YFRateLimitError and the like
+    return "ratelimit" in type(e).__name__.lower() or "rate limit" in str(e).lower()
+
+
+def protected(name: str, fallback: Callable = None, failure_if: Callable[[BaseException], bool] | None = None):
+    """
+    Run a provider call under breaker `name`: refused while open, outcome and
+    latency recorded otherwise. Exceptions (and refusals) turn into
+    fallback() when given, else propagate (CircuitOpen for refusals).
+    With `failure_if` (e.g. provider_error), exceptions it rejects count as
+    answered calls rather than failures.
+    """
+    breaker = get_breaker(name)
+
+    def failed(e: BaseException) -> bool:
+        return failure_if is None or failure_if(e)
+
+    def refuse():
+        if fallback is None:
+            raise CircuitOpen(f"{name} circuit is open")
+        return fallback()
+
+    def deco(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not breaker.allow():
+                    return refuse()
+                start = time.monotonic()
+                try:
+                    result = await fn(*args, **kwargs)
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except Exception as e:
+                    breaker.record(not failed(e), time.monotonic() - start)
+                    if fallback is None:
+                        raise
+                    return fallback()
+                breaker.record(True, time.monotonic() - start)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not breaker.allow():
+                return refuse()
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                breaker.record(not failed(e), time.monotonic() - start)
+                if fallback is None:
+                    raise
+                return fallback()
+            breaker.record(True, time.monotonic() - start)
+            return result
+        return wrapper
+    return deco
@@ -0,0 +1,69 @@
+"""
+Per-day call budgets shared by every process.
+
+Spending is kept in a small JSON file and updated under a file lock (see
+utils/file_lock.py), like the Alpha Vantage quota, so uvicorn workers and
+restarts draw on one budget instead of each starting from zero. The day is
+the IST calendar day; counts reset when it changes.
+"""
+import contextlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+from utils.file_lock import file_lock
+from utils.market_hours import now_ist
+
+
+class DailyBudget:
+    def __init__(self, path: str | Path, limits: Dict[str, int]):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.limits = dict(limits)
+        self._lock = threading.Lock()
+        self.day = now_ist().date().isoformat()
+        self.spent = {kind: 0 for kind in self.limits}
+
+    def _load(self):
+        self.day = now_ist().date().isoformat()
+        self.spent = {kind: 0 for kind in self.limits}
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("day") == self.day:
+            for kind in self.limits:
+                self.spent[kind] = int(state.get("spent", {}).get(kind, 0))
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"day": self.day, "spent": self.spent}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Daily budget: could not persist {self.path}: {e}")
+
+    @contextlib.contextmanager
+    def _shared(self):
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+            yield
+
+    def spend(self, **calls: int) -> bool:
+        """Take `calls` ({kind: n}) from today's budgets, all or nothing; False when any is used up."""
+        with self._shared():
+            if any(self.spent[kind] + n > self.limits[kind] for kind, n in calls.items()):
+                return False
+            for kind, n in calls.items():
+                self.spent[kind] += n
+            self._save()
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._shared():
+            return dict(self.spent)
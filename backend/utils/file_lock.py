@@ -0,0 +1,39 @@
+"""
+Advisory inter-process file locks.
+
+Several processes share state on disk (uvicorn workers, the cache warmer,
+the jobs/ scripts). file_lock() serializes their read-modify-write sections
+with fcntl.flock on a side file. Where fcntl doesn't exist (Windows) it only
+excludes nothing; run a single process there.
+"""
+import contextlib
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextlib.contextmanager
+def file_lock(path: str | Path):
+    """
+    Hold an exclusive lock on `path` (created if missing) for the with-block.
+    If the lock file can't be created the block runs unlocked.
+    """
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, "a")
+    except OSError as e:
+        print(f"Could not open lock file {path}: {e}")
+        yield
+        return
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
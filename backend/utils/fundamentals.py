@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
 
 
 def _f(x: Any) -> float | None:
@@ -31,15 +33,41 @@ def score_metric(value: float | None, good_range: Tuple[float | None, float | No
     return t * weight
 
 
-def analyze_fundamentals(overview: Dict[str, Any]) -> Dict[str, Any]:
-    # Extract metrics
-    market_cap = _f(overview.get("market_cap"))
-    pe = _f(overview.get("pe_ratio"))
-    industry_pe = _f(overview.get("industry_pe"))
-    pb = _f(overview.get("price_to_book"))
-    roe = _f(overview.get("return_on_equity"))
-    eps_growth = _f(overview.get("quarterly_earnings_growth_yoy")) # Proxy for EPS trend
-    dte = _f(overview.get("debt_to_equity"))
+# Overview keys analyze_fundamentals reads
+FIELDS = ("market_cap", "pe_ratio", "industry_pe", "price_to_book", "return_on_equity",
+          "quarterly_earnings_growth_yoy", "debt_to_equity")
+
+
+def _column(values: Sequence[Any]) -> np.ndarray:
+    # The scoring rules treat a falsy value (missing or 0) the same way, so
+    # both become 0.0; NaN is truthy and stays NaN (it then fails every
+    # comparison, exactly as the float would).
+    if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        return values.astype(np.float64)
+    return np.array([_f(x) or 0.0 for x in values], dtype=np.float64)
+
+
+def fundamentals_table(overviews: Sequence[Dict[str, Any] | None]) -> Dict[str, List[Any]]:
+    """Overview dicts (None for unknown) -> the columnar table analyze_fundamentals_batch takes."""
+    return {key: [o.get(key) if o else None for o in overviews] for key in FIELDS}
+
+
+def analyze_fundamentals_batch(table: Dict[str, Sequence[Any]]) -> Dict[str, Any]:
+    """
+    Score many companies at once. `table` maps FIELDS keys to columns of raw
+    overview values (absent keys count as missing). Returns per-row arrays:
+    {"scores": {metric: points}, "total_score": ..., "classification": ...},
+    the same numbers analyze_fundamentals gives each row on its own.
+    """
+    rows = max((len(v) for v in table.values()), default=0)
+    col = lambda key: _column(table[key]) if key in table else np.zeros(rows)
+    market_cap = col("market_cap")
+    pe = col("pe_ratio")
+    industry_pe = col("industry_pe")
+    pb = col("price_to_book")
+    roe = col("return_on_equity")
+    eps_growth = col("quarterly_earnings_growth_yoy") # Proxy for EPS trend
+    dte = col("debt_to_equity")
     # Book value trend is hard to get from single snapshot, defaulting to "Rising" (2) if positive, else Neutral (1)
     # Ideally we need historical book value.
     # For now, we'll assume if Price > Book (PB > 1), market expects growth, so maybe book value is stable/rising.
@@ -48,110 +76,68 @@ def analyze_fundamentals(overview: Dict[str, Any]) -> Dict[str, Any]:
     # Without history, we'll be conservative and give 1.
     book_value_score = 1 
 
+    # np.select picks the first matching branch, like the if/elif chains;
+    # a zero (missing) value matches none of them, so it gets the default.
     scores = {}
-    
-    # 1. Market Cap
-    # Large/Mid (>5000Cr approx? User didn't define ranges, using standard Indian context)
-    # Let's assume input Market Cap is in actual currency units. 
-    # yfinance usually returns full number. 5000 Cr = 50,000,000,000
-    if market_cap:
+    with np.errstate(invalid="ignore", over="ignore"):
+        # 1. Market Cap
+        # Large/Mid (>5000Cr approx? User didn't define ranges, using standard Indian context)
+        # Let's assume input Market Cap is in actual currency units. 
+        # yfinance usually returns full number. 5000 Cr = 50,000,000,000
         mc_cr = market_cap / 10000000 # Convert to Crores
-        if mc_cr > 5000:
-            scores["Market Cap"] = 2
-        elif mc_cr >= 1000:
-            scores["Market Cap"] = 1
-        else:
-            scores["Market Cap"] = 0
-    else:
-        scores["Market Cap"] = 0
-
-    # 2. PE vs Industry
-    if pe and industry_pe:
-        if pe <= industry_pe:
-            scores["PE vs Industry"] = 2
-        elif pe <= industry_pe * 1.2: # Slightly above
-            scores["PE vs Industry"] = 1
-        else:
-            scores["PE vs Industry"] = 0
-    elif pe:
-        # If no industry PE, assume 20-25 is fair? Or just give neutral?
-        # Let's give neutral 1 if reasonable (<30), else 0
-        scores["PE vs Industry"] = 1 if pe < 30 else 0
-    else:
-        scores["PE vs Industry"] = 0
-
-    # 3. PB Ratio
-    if pb:
-        if pb < 3:
-            scores["PB Ratio"] = 2
-        elif pb <= 6:
-            scores["PB Ratio"] = 1
-        else:
-            scores["PB Ratio"] = 0
-    else:
-        scores["PB Ratio"] = 0
+        scores["Market Cap"] = np.select([(market_cap != 0) & (mc_cr > 5000), (market_cap != 0) & (mc_cr >= 1000)], [2, 1], 0)
+
+        # 2. PE vs Industry
+        # Slightly above industry PE scores 1; with no industry PE, give
+        # neutral 1 if reasonable (<30), else 0
+        both = (pe != 0) & (industry_pe != 0)
+        scores["PE vs Industry"] = np.select(
+            [both & (pe <= industry_pe), both & (pe <= industry_pe * 1.2), both, pe != 0],
+            [2, 1, 0, np.where(pe < 30, 1, 0)], 0)
 
-    # 4. ROE
-    # yfinance returns decimal (0.15 for 15%). User wants >18%
-    if roe:
+        # 3. PB Ratio
+        scores["PB Ratio"] = np.select([(pb != 0) & (pb < 3), (pb != 0) & (pb <= 6)], [2, 1], 0)
+
+        # 4. ROE
+        # yfinance returns decimal (0.15 for 15%). User wants >18%
         roe_pct = roe * 100
-        if roe_pct > 18:
-            scores["ROE"] = 2
-        elif roe_pct >= 12:
-            scores["ROE"] = 1
-        else:
-            scores["ROE"] = 0
-    else:
-        scores["ROE"] = 0
-
-    # 5. EPS TTM (Growth)
-    # Using quarterly growth as proxy
-    if eps_growth:
-        if eps_growth > 0:
-            scores["EPS Growth"] = 2
-        elif eps_growth == 0:
-            scores["EPS Growth"] = 1
-        else:
-            scores["EPS Growth"] = 0
-    else:
-        scores["EPS Growth"] = 1 # Assume flat if unknown
-
-    # 6. Debt to Equity
-    if dte:
-        # yfinance D/E is usually a ratio (e.g. 0.5) or percentage? 
-        # yfinance 'debtToEquity' is often percentage (e.g. 50 for 0.5). 
-        # Let's check standard yfinance output. It's usually %.
-        # So 0.5 ratio = 50.
-        # User said <0.5 (ratio) = 2. So < 50.
-        if dte < 50:
-            scores["Debt-to-Equity"] = 2
-        elif dte <= 100:
-            scores["Debt-to-Equity"] = 1
-        else:
-            scores["Debt-to-Equity"] = 0
-    else:
-        scores["Debt-to-Equity"] = 1 # Neutral if unknown
+        scores["ROE"] = np.select([(roe != 0) & (roe_pct > 18), (roe != 0) & (roe_pct >= 12)], [2, 1], 0)
+
+        # 5. EPS TTM (Growth)
+        # Using quarterly growth as proxy; assume flat (1) if unknown
+        scores["EPS Growth"] = np.select([eps_growth == 0, eps_growth > 0], [1, 2], 0)
+
+        # 6. Debt to Equity
+        # yfinance 'debtToEquity' is usually a percentage (50 for a 0.5 ratio).
+        # User said <0.5 (ratio) = 2. So < 50. Neutral (1) if unknown.
+        scores["Debt-to-Equity"] = np.select([dte == 0, dte < 50, dte <= 100], [1, 2, 1], 0)
 
     # 7. Book Value
-    scores["Book Value"] = book_value_score
+    scores["Book Value"] = np.full(rows, book_value_score)
 
     total_score = sum(scores.values())
+    classification = np.select([total_score >= 12, total_score >= 7], ["STRONG", "MODERATE"], "WEAK").astype(object)
+
+    return {
+        "scores": scores,
+        "total_score": total_score,
+        "classification": classification,
+    }
 
-    if total_score >= 12:
-        classification = "STRONG"
-    elif total_score >= 7:
-        classification = "MODERATE"
-    else:
-        classification = "WEAK"
 
+def analysis_row(batch: Dict[str, Any], i: int) -> Dict[str, Any]:
+    """Row `i` of an analyze_fundamentals_batch result as analyze_fundamentals returns it."""
+    total_score = int(batch["total_score"][i])
+    classification = str(batch["classification"][i])
     explanation = f"Score {total_score}/14. {classification} fundamentals based on key metrics."
 
     return {
-        "scores": scores,
+        "scores": {name: int(points[i]) for name, points in batch["scores"].items()},
         "total_score": total_score,
         "classification": classification,
         "explanation": explanation
     }
 
 
-
+def analyze_fundamentals(overview: Dict[str, Any]) -> Dict[str, Any]:
+    return analysis_row(analyze_fundamentals_batch(fundamentals_table([overview])), 0)
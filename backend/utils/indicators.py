@@ -1,6 +1,7 @@
-from typing import List, Dict
+from typing import Dict, List, Tuple
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 def to_series(prices: List[Dict]):
@@ -13,92 +14,338 @@ def to_series(prices: List[Dict]):
     return df
 
 
-def simple_moving_average(prices: List[Dict], window: int) -> float | None:
-    df = to_series(prices)
-    if len(df) < window:
+def _to_float(x) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# Array kernels. They operate along the last axis so the same code serves a
+# single symbol (1-D) and a symbols x days matrix (2-D). Windows that are not
+# full, or that contain a NaN, yield NaN just like pandas' rolling().
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if window <= 0 or x.shape[-1] < window:
+        return out
+    out[..., window - 1:] = sliding_window_view(x, window, axis=-1).mean(axis=-1)
+    return out
+
+
+def _rolling_std(x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if window <= ddof or x.shape[-1] < window:
+        return out
+    out[..., window - 1:] = sliding_window_view(x, window, axis=-1).std(axis=-1, ddof=ddof)
+    return out
+
+
+def _shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if n < x.shape[-1]:
+        out[..., n:] = x[..., :-n]
+    return out
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    # Same recursion as pandas ewm(span=span, adjust=False): y0 = x0,
+    # yt = a*xt + (1-a)*y(t-1). NaN inputs carry the previous value forward.
+    alpha = 2.0 / (span + 1.0)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] == 0:
+        return out
+    if x.ndim == 1:
+        prev = np.nan
+        for i, v in enumerate(x.tolist()):
+            if v != v:
+                out[i] = prev
+                continue
+            prev = v if prev != prev else alpha * v + (1 - alpha) * prev
+            out[i] = prev
+        return out
+    prev = x[..., 0].astype(float)
+    out[..., 0] = prev
+    for i in range(1, x.shape[-1]):
+        v = x[..., i]
+        nxt = np.where(np.isnan(prev), v, alpha * v + (1 - alpha) * prev)
+        prev = np.where(np.isnan(v), prev, nxt)
+        out[..., i] = prev
+    return out
+
+
+def _rsi(close: np.ndarray, period: int) -> np.ndarray:
+    delta = close - _shift(close)
+    gain = _rolling_mean(np.clip(delta, 0, None), period)
+    loss = _rolling_mean(-np.clip(delta, None, 0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = gain / np.where(loss == 0, np.nan, loss)
+        return 100 - (100 / (1 + rs))
+
+
+def _adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    prev_close = _shift(close)
+    prev_high = _shift(high)
+    prev_low = _shift(low)
+    tr = np.fmax(np.fmax(np.abs(high - low), np.abs(high - prev_close)), np.abs(low - prev_close))
+    up = high - prev_high
+    down = prev_low - low
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dm_plus = np.where(up > down, np.maximum(up, 0), 0.0)
+        dm_minus = np.where(down > up, np.maximum(down, 0), 0.0)
+        atr = _rolling_mean(tr, period)
+        plus_di = 100 * (_rolling_mean(dm_plus, period) / atr)
+        minus_di = 100 * (_rolling_mean(dm_minus, period) / atr)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return _rolling_mean(dx, period)
+
+
+def _last(x: np.ndarray) -> float | None:
+    if x.shape[-1] == 0:
         return None
-    return float(df["close"].rolling(window=window).mean().iloc[-1])
+    val = x[-1]
+    return float(val) if not np.isnan(val) else None
+
+
+class IndicatorFrame:
+    """
+    OHLCV parsed once into contiguous oldest-first NumPy arrays.
+
+    Rows without a valid close are dropped, as in to_series(). Every indicator
+    series is memoized per parameter set, so asking for SMA_50 twice (or the
+    MACD and an EMA sharing a span) computes it once.
+    """
+
+    def __init__(self, prices: List[Dict]):
+        dates = np.array([str(p.get("date")) for p in prices], dtype=str)
+        order = np.argsort(dates, kind="stable")
+        rows = [prices[i] for i in order]
+        self._set_arrays(
+            dates[order],
+            np.array([_to_float(p.get("open")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("high")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("low")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("close")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("volume")) for p in rows], dtype=np.float64),
+        )
+
+    @classmethod
+    def from_arrays(cls, dates, open, high, low, close, volume) -> "IndicatorFrame":
+        """Wrap oldest-first arrays (e.g. price store views) without copying them."""
+        frame = cls.__new__(cls)
+        frame._set_arrays(dates, open, high, low, close, volume)
+        return frame
+
+    def _set_arrays(self, dates, open, high, low, close, volume):
+        close = np.asarray(close, dtype=np.float64)
+        keep = ~np.isnan(close)
+        if close.ndim > 1 or keep.all():
+            # 2-D (batch) matrices are NaN-padded on purpose; leave them be
+            keep = slice(None)
+        self.dates = dates[keep]
+        self.open = np.asarray(open, dtype=np.float64)[keep]
+        self.high = np.asarray(high, dtype=np.float64)[keep]
+        self.low = np.asarray(low, dtype=np.float64)[keep]
+        self.close = close[keep]
+        self.volume = np.asarray(volume)[keep]
+        self._cache: Dict[Tuple, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.close)
+
+    def _memo(self, key: Tuple, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    # Full series (oldest-first, NaN where undefined)
+
+    def sma_series(self, window: int) -> np.ndarray:
+        return self._memo(("sma", window), lambda: _rolling_mean(self.close, window))
+
+    def std_series(self, window: int) -> np.ndarray:
+        return self._memo(("std", window), lambda: _rolling_std(self.close, window))
+
+    def ema_series(self, span: int) -> np.ndarray:
+        return self._memo(("ema", span), lambda: _ema(self.close, span))
+
+    def rsi_series(self, period: int = 14) -> np.ndarray:
+        return self._memo(("rsi", period), lambda: _rsi(self.close, period))
+
+    def macd_series(self, fast=12, slow=26, signal=9) -> Tuple[np.ndarray, np.ndarray]:
+        def build():
+            line = self.ema_series(fast) - self.ema_series(slow)
+            return line, _ema(line, signal)
+        return self._memo(("macd", fast, slow, signal), build)
+
+    def adx_series(self, period=14) -> np.ndarray:
+        return self._memo(("adx", period), lambda: _adx(self.high, self.low, self.close, period))
+
+    # Latest values, with the same None rules as the list-based functions
+
+    def sma(self, window: int) -> float | None:
+        if len(self) < window:
+            return None
+        return _last(self.sma_series(window))
+
+    def ema(self, span: int) -> float | None:
+        return _last(self.ema_series(span))
+
+    def rsi(self, period: int = 14) -> float | None:
+        if len(self) <= period:
+            return None
+        return _last(self.rsi_series(period))
+
+    def macd(self, fast=12, slow=26, signal=9):
+        if len(self) < slow:
+            return None
+        line, sig = self.macd_series(fast, slow, signal)
+        return {
+            "line": float(line[-1]),
+            "signal": float(sig[-1]),
+            "hist": float(line[-1] - sig[-1])
+        }
+
+    def bollinger(self, window=20, num_std=2):
+        if len(self) < window:
+            return None
+        sma = self.sma_series(window)[-1]
+        std = self.std_series(window)[-1]
+        return {
+            "upper": float(sma + std * num_std),
+            "middle": float(sma),
+            "lower": float(sma - std * num_std)
+        }
+
+    def adx(self, period=14) -> float | None:
+        if len(self) < period + 1:
+            return None
+        return _last(self.adx_series(period))
+
+    def crossover(self, short_window: int = 20, long_window: int = 50) -> str:
+        short = self.sma(short_window)
+        long = self.sma(long_window)
+        if short is None or long is None:
+            return "neutral"
+        if short > long:
+            return "bullish"
+        if short < long:
+            return "bearish"
+        return "neutral"
+
+    def compute(self, spec: Dict[str, Tuple]) -> Dict:
+        """
+        Compute a named set of indicators in one go, e.g.
+        {"SMA_20": ("sma", 20), "RSI": ("rsi", 14), "MACD": ("macd",)}.
+        Accepted kinds: sma, ema, rsi, macd, bollinger, adx, crossover.
+        """
+        out = {}
+        for name, args in spec.items():
+            if isinstance(args, str):
+                args = (args,)
+            kind, params = args[0], args[1:]
+            if kind not in _KINDS:
+                raise ValueError(f"Unknown indicator: {kind}")
+            out[name] = getattr(self, kind)(*params)
+        return out
+
+
+_KINDS = {"sma", "ema", "rsi", "macd", "bollinger", "adx", "crossover"}
+
+# The indicator set behind the AI recommendation (and the nightly snapshot)
+TECH_INDICATORS = {
+    "SMA_20": ("sma", 20),
+    "SMA_50": ("sma", 50),
+    "SMA_200": ("sma", 200),
+    "RSI": ("rsi", 14),
+    "MACD": ("macd",),
+    "Bollinger": ("bollinger",),
+    "ADX": ("adx",),
+}
+
+
+class _BatchRow(IndicatorFrame):
+    """
+    One symbol of a batch: series are rows of the batch's 2-D results, so
+    compute() on any row fills the indicator for every symbol at once.
+    """
+
+    def __init__(self, batch: IndicatorFrame, row: int, frame: IndicatorFrame):
+        self._batch = batch
+        self._row = row
+        self.dates, self.open, self.high = frame.dates, frame.open, frame.high
+        self.low, self.close, self.volume = frame.low, frame.close, frame.volume
+        self._cache = {}
+
+    def _tail(self, matrix: np.ndarray) -> np.ndarray:
+        # Rows are right-aligned; drop this symbol's left padding
+        n = len(self.close)
+        return matrix[self._row, matrix.shape[-1] - n:]
+
+    def sma_series(self, window: int) -> np.ndarray:
+        return self._tail(self._batch.sma_series(window))
+
+    def std_series(self, window: int) -> np.ndarray:
+        return self._tail(self._batch.std_series(window))
+
+    def ema_series(self, span: int) -> np.ndarray:
+        return self._tail(self._batch.ema_series(span))
+
+    def rsi_series(self, period: int = 14) -> np.ndarray:
+        return self._tail(self._batch.rsi_series(period))
+
+    def macd_series(self, fast=12, slow=26, signal=9) -> Tuple[np.ndarray, np.ndarray]:
+        line, sig = self._batch.macd_series(fast, slow, signal)
+        return self._tail(line), self._tail(sig)
+
+    def adx_series(self, period=14) -> np.ndarray:
+        return self._tail(self._batch.adx_series(period))
+
+
+def batch_frames(frames: List[IndicatorFrame]) -> List[IndicatorFrame]:
+    """
+    Stack several symbols' frames into one symbols x days matrix (right-aligned
+    on the latest bar, NaN-padded on the left) and return per-symbol views of
+    it. Indicators asked of any view are computed for all symbols in one
+    vectorized pass; values equal what each frame would compute alone, since
+    the padding behaves like the missing history (windows over it are NaN).
+    """
+    if not frames:
+        return []
+    width = max(len(f) for f in frames)
+
+    def stack(attr: str) -> np.ndarray:
+        out = np.full((len(frames), width), np.nan)
+        for i, f in enumerate(frames):
+            if len(f):
+                out[i, width - len(f):] = getattr(f, attr)
+        return out
+
+    batch = IndicatorFrame.from_arrays(np.arange(width), stack("open"), stack("high"), stack("low"),
+                                       stack("close"), stack("volume"))
+    return [_BatchRow(batch, i, f) for i, f in enumerate(frames)]
+
+
+def simple_moving_average(prices: List[Dict], window: int) -> float | None:
+    return IndicatorFrame(prices).sma(window)
 
 
 def rsi(prices: List[Dict], period: int = 14) -> float | None:
-    df = to_series(prices)
-    if len(df) <= period:
-        return None
-    delta = df["close"].diff()
-    gain = (delta.clip(lower=0)).rolling(window=period).mean()
-    loss = (-delta.clip(upper=0)).rolling(window=period).mean()
-    rs = gain / loss.replace(0, np.nan)
-    out = 100 - (100 / (1 + rs))
-    val = out.iloc[-1]
-    return float(val) if pd.notna(val) else None
+    return IndicatorFrame(prices).rsi(period)
 
 
 def moving_average_crossover(prices: List[Dict], short_window: int = 20, long_window: int = 50) -> str:
-    short = simple_moving_average(prices, short_window)
-    long = simple_moving_average(prices, long_window)
-    if short is None or long is None:
-        return "neutral"
-    if short > long:
-        return "bullish"
-    if short < long:
-        return "bearish"
-    return "neutral"
+    return IndicatorFrame(prices).crossover(short_window, long_window)
 
 
 def macd(prices: List[Dict], fast=12, slow=26, signal=9):
-    df = to_series(prices)
-    if len(df) < slow:
-        return None
-    exp1 = df["close"].ewm(span=fast, adjust=False).mean()
-    exp2 = df["close"].ewm(span=slow, adjust=False).mean()
-    macd_line = exp1 - exp2
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    hist = macd_line - signal_line
-    return {
-        "line": float(macd_line.iloc[-1]),
-        "signal": float(signal_line.iloc[-1]),
-        "hist": float(hist.iloc[-1])
-    }
+    return IndicatorFrame(prices).macd(fast, slow, signal)
+
 
 def bollinger_bands(prices: List[Dict], window=20, num_std=2):
-    df = to_series(prices)
-    if len(df) < window:
-        return None
-    sma = df["close"].rolling(window=window).mean()
-    std = df["close"].rolling(window=window).std()
-    upper = sma + (std * num_std)
-    lower = sma - (std * num_std)
-    return {
-        "upper": float(upper.iloc[-1]),
-        "middle": float(sma.iloc[-1]),
-        "lower": float(lower.iloc[-1])
-    }
+    return IndicatorFrame(prices).bollinger(window, num_std)
+
 
 def adx(prices: List[Dict], period=14):
     # Simplified ADX calculation
-    df = to_series(prices)
-    if len(df) < period + 1:
-        return None
-    
-    df['high'] = pd.to_numeric(df['high'], errors='coerce')
-    df['low'] = pd.to_numeric(df['low'], errors='coerce')
-    df['close'] = pd.to_numeric(df['close'], errors='coerce')
-    
-    df['tr0'] = abs(df['high'] - df['low'])
-    df['tr1'] = abs(df['high'] - df['close'].shift())
-    df['tr2'] = abs(df['low'] - df['close'].shift())
-    df['tr'] = df[['tr0', 'tr1', 'tr2']].max(axis=1)
-    
-    df['dm_plus'] = np.where((df['high'] - df['high'].shift()) > (df['low'].shift() - df['low']), 
-                             np.maximum(df['high'] - df['high'].shift(), 0), 0)
-    df['dm_minus'] = np.where((df['low'].shift() - df['low']) > (df['high'] - df['high'].shift()), 
-                              np.maximum(df['low'].shift() - df['low'], 0), 0)
-    
-    atr = df['tr'].rolling(window=period).mean()
-    plus_di = 100 * (df['dm_plus'].rolling(window=period).mean() / atr)
-    minus_di = 100 * (df['dm_minus'].rolling(window=period).mean() / atr)
-    
-    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-    adx_val = dx.rolling(window=period).mean().iloc[-1]
-    
-    return float(adx_val) if pd.notna(adx_val) else None
+    return IndicatorFrame(prices).adx(period)
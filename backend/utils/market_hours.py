@@ -0,0 +1,58 @@
+"""
+NSE/BSE session times (IST). Weekends are skipped; exchange holidays are not
+modelled.
+"""
+import datetime
+import os
+
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+MARKET_OPEN = datetime.time(9, 15)
+MARKET_CLOSE = datetime.time(15, 30)
+# Providers publish the final daily bar a little after the close
+EOD_SETTLE = datetime.timedelta(minutes=int(os.getenv("EOD_SETTLE_MINUTES", "30")))
+
+
+def now_ist() -> datetime.datetime:
+    return datetime.datetime.now(IST)
+
+
+def is_market_open(now: datetime.datetime | None = None) -> bool:
+    """Is a regular session under way (weekdays, IST)?"""
+    now = (now or now_ist()).astimezone(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def bar_pending(now: datetime.datetime | None = None) -> bool:
+    """Is today's daily bar still provisional (a weekday between the open and close + settle)?"""
+    now = (now or now_ist()).astimezone(IST)
+    open_at = datetime.datetime.combine(now.date(), MARKET_OPEN, IST)
+    final_at = datetime.datetime.combine(now.date(), MARKET_CLOSE, IST) + EOD_SETTLE
+    return now.weekday() < 5 and open_at <= now < final_at
+
+
+def last_session_date(now: datetime.datetime | None = None) -> datetime.date:
+    """Most recent weekday whose session has closed (IST). Exchange holidays are not modelled."""
+    now = (now or now_ist()).astimezone(IST)
+    day = now.date()
+    if now.time() < MARKET_CLOSE:
+        day -= datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+def next_eod(now: datetime.datetime | None = None) -> datetime.datetime:
+    """When the next session's final daily bar should be available (close + settle time)."""
+    now = (now or now_ist()).astimezone(IST)
+    day = now.date()
+    while True:
+        if day.weekday() < 5:
+            eod = datetime.datetime.combine(day, MARKET_CLOSE, IST) + EOD_SETTLE
+            if eod > now:
+                return eod
+        day += datetime.timedelta(days=1)
+
+
+def seconds_until_next_eod(now: datetime.datetime | None = None) -> float:
+    now = (now or now_ist()).astimezone(IST)
+    return (next_eod(now) - now).total_seconds()
@@ -0,0 +1,179 @@
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+from utils.indicators import IndicatorFrame, _to_float
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+# Provider DataFrame columns -> canonical OHLCV columns
+YF_COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+NSE_COLUMNS = {
+    "CH_OPENING_PRICE": "open",
+    "CH_TRADE_HIGH_PRICE": "high",
+    "CH_TRADE_LOW_PRICE": "low",
+    "CH_CLOSING_PRICE": "close",
+    "CH_TOT_TRADED_QTY": "volume",
+}
+NSE_DATE_COLUMN = "mTIMESTAMP"
+NSE_DATE_FORMAT = "%d-%b-%Y"
+
+
+class PriceArrays:
+    """
+    Columnar OHLCV: oldest-first parallel arrays, dates as datetime64[D].
+
+    Arrays may be read-only views into a memory map (see price_store), so
+    slicing never copies. List-of-dicts is only built at the API edge via
+    to_records().
+    """
+
+    def __init__(self, dates, open, high, low, close, volume):
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def empty(cls) -> "PriceArrays":
+        f = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype="datetime64[D]"), f, f, f, f, np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_records(cls, prices: List[Dict]) -> "PriceArrays":
+        """Parse provider rows (any order) into sorted arrays; rows with unparseable dates are dropped."""
+        dates = np.array([_to_date(p.get("date")) for p in prices], dtype="datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        order = order[~np.isnat(dates[order])]
+        rows = [prices[i] for i in order]
+        return cls(
+            dates[order],
+            np.array([_to_float(p.get("open")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("high")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("low")) for p in rows], dtype=np.float64),
+            np.array([_to_float(p.get("close")) for p in rows], dtype=np.float64),
+            np.array([_to_int(p.get("volume")) for p in rows], dtype=np.int64),
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Dict[str, str], date_column: str | None = None,
+                   date_format: str | None = None) -> "PriceArrays":
+        """
+        Normalize a provider DataFrame with whole-column operations: dates from
+        `date_column` (parsed with `date_format`) or the index, values renamed
+        through `columns` (provider name -> canonical name). Missing value
+        columns read as 0, unparseable numbers as NaN (volume 0); rows whose
+        date can't be parsed are dropped.
+        """
+        if df is None or df.empty:
+            return cls.empty()
+        if date_column is not None:
+            dates = pd.to_datetime(df[date_column], format=date_format, errors="coerce")
+        else:
+            dates = pd.DatetimeIndex(df.index)
+            if dates.tz is not None:
+                # Keep the exchange-local calendar day
+                dates = dates.tz_localize(None)
+        dates = np.asarray(dates, dtype="datetime64[ns]").astype("datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        order = order[~np.isnat(dates[order])]
+
+        by_name = {canon: src for src, canon in columns.items()}
+        values = {}
+        for name in COLUMNS:
+            src = by_name.get(name)
+            if src is None or src not in df.columns:
+                col = np.zeros(len(df), dtype=np.float64)
+            else:
+                col = pd.to_numeric(df[src], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            values[name] = col[order]
+        volume = values["volume"]
+        return cls(
+            dates[order],
+            values["open"], values["high"], values["low"], values["close"],
+            np.where(np.isnan(volume), 0, volume).astype(np.int64),
+        )
+
+    def slice(self, start: int = 0, stop: int | None = None) -> "PriceArrays":
+        return PriceArrays(*(getattr(self, c)[start:stop] for c in ("dates",) + COLUMNS))
+
+    def last_days(self, days: int) -> "PriceArrays":
+        """Bars whose date falls within the last `days` calendar days of the series."""
+        if not len(self):
+            return self
+        cutoff = self.dates[-1] - np.timedelta64(days - 1, "D")
+        return self.slice(int(np.searchsorted(self.dates, cutoff, side="left")))
+
+    def frame(self) -> IndicatorFrame:
+        return IndicatorFrame.from_arrays(
+            self.dates.astype(str), self.open, self.high, self.low, self.close, self.volume
+        )
+
+    def between(self, start=None, end=None) -> "PriceArrays":
+        """Bars dated from `start` to `end` inclusive (ISO dates or datetime64; None = open-ended)."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, "D"), side="left"))
+        hi = None if end is None else int(np.searchsorted(self.dates, np.datetime64(end, "D"), side="right"))
+        return self.slice(lo, hi)
+
+    def _columns_latest_first(self, columns) -> List[List]:
+        # Whole-column conversion; NaN prices become None
+        cols = [self.dates[::-1].astype(str).tolist()]
+        for name in columns:
+            col = getattr(self, name)[::-1]
+            missing = np.isnan(col) if col.dtype.kind == "f" else None
+            if missing is not None and missing.any():
+                col = col.astype(object)
+                col[missing] = None
+            cols.append(col.tolist())
+        return cols
+
+    def to_records(self, columns=COLUMNS) -> List[Dict]:
+        # Latest-first, matching what the provider adapters return
+        keys = ("date",) + tuple(columns)
+        return [dict(zip(keys, row)) for row in zip(*self._columns_latest_first(columns))]
+
+    def to_columns(self, columns=COLUMNS) -> Dict[str, List]:
+        """Latest-first parallel lists: {"date": [...], "close": [...], ...}."""
+        keys = ("date",) + tuple(columns)
+        return dict(zip(keys, self._columns_latest_first(columns)))
+
+
+def as_arrays(prices: List[Dict] | PriceArrays | None) -> PriceArrays:
+    """Provider output in either shape (records or arrays) as PriceArrays."""
+    if isinstance(prices, PriceArrays):
+        return prices
+    return PriceArrays.from_records(prices or [])
+
+
+def stack_frame(series: List[PriceArrays], bars: int | None = None) -> IndicatorFrame:
+    """
+    Several symbols' last `bars` bars (default: the longest history) as one
+    symbols x bars IndicatorFrame, right-aligned on each symbol's latest bar
+    and NaN-padded on the left (see indicators.batch_frames).
+    """
+    if bars is None:
+        bars = max((len(s) for s in series), default=0)
+    mats = {name: np.full((len(series), bars), np.nan) for name in COLUMNS}
+    for i, s in enumerate(series):
+        n = min(len(s), bars)
+        if n:
+            for name, mat in mats.items():
+                mat[i, bars - n:] = getattr(s, name)[-n:]
+    return IndicatorFrame.from_arrays(np.arange(bars), *(mats[name] for name in COLUMNS))
+
+
+def _to_date(x):
+    try:
+        return np.datetime64(str(x)[:10], "D")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+
+
+def _to_int(x) -> int:
+    v = _to_float(x)
+    return 0 if v != v else int(v)
@@ -0,0 +1,152 @@
+"""
+Compact, token-budgeted builder for the Gemini analysis prompt.
+
+The price window is sent as a CSV-style table (one header, rounded values)
+instead of thirty JSON objects with repeated keys, the other sections as
+minified JSON with rounded floats. Each input section has a token budget;
+sections that overflow are trimmed (oldest bars / last headlines first).
+Token counts are estimated locally so no extra API round-trip is needed.
+"""
+import json
+import os
+import textwrap
+from typing import Dict, List, Tuple
+
+# Roughly 4 characters per token for English/number-heavy text on Gemini
+CHARS_PER_TOKEN = 4
+
+DEFAULT_BUDGETS = {
+    "prices": int(os.getenv("PROMPT_PRICES_TOKENS", "500")),
+    "indicators": int(os.getenv("PROMPT_INDICATORS_TOKENS", "150")),
+    "fundamentals": int(os.getenv("PROMPT_FUNDAMENTALS_TOKENS", "100")),
+    "news": int(os.getenv("PROMPT_NEWS_TOKENS", "250")),
+}
+PRICE_ROWS = 30
+PRICE_DECIMALS = 2
+VALUE_DECIMALS = 4
+HEADLINE_CHARS = 140
+
+ANALYSIS_TEMPLATE = textwrap.dedent("""\
+    **EDUCATIONAL PURPOSE ONLY**: This analysis is a simulation for educational purposes.
+
+    You are a **Decisive Financial Analysis Engine**.
+    Your goal is to provide a clear **Buy, Sell, or Hold** recommendation based on the weight of evidence.
+
+    **INPUT DATA**:
+    - **Price History** (latest first, CSV):
+    {prices}
+    - **Technical Indicators**: {indicators}
+    - **Fundamentals**: {fundamentals}
+    - **News & Sentiment**: {news}
+    - **Context**: Sector Trend="Neutral", Market Regime="{market_regime}"
+
+    **DECISION LOGIC (WEIGHTED RESOLUTION)**:
+    1. **Do NOT default to "Hold"** just because signals conflict. You MUST resolve the conflict.
+    2. **Trend Priority**: If the Medium-Term Trend (SMA50, MACD) is strong, follow the trend for the Recommendation (Buy/Sell).
+    3. **Fundamental Impact**: Use Fundamentals to adjust the **Confidence Score**, not to block the trade.
+       - *Example*: Strong Uptrend + Weak Fundamentals = **"Buy"** (with Low Confidence/Speculative warning).
+       - *Example*: Strong Downtrend + Strong Fundamentals = **"Sell"** (Price action leads).
+    4. **"Hold" Criteria**: ONLY recommend "Hold" if the market is truly ranging/sideways (e.g., ADX < 20, Flat SMAs) with no clear directional bias.
+
+    **SCORING GUIDE**:
+    - **Strong Buy**: Bullish Trend + Bullish Fundamentals + Positive News.
+    - **Buy**: Bullish Trend (even if Fundamentals are mixed).
+    - **Sell**: Bearish Trend (even if Fundamentals are mixed).
+    - **Strong Sell**: Bearish Trend + Bearish Fundamentals + Negative News.
+    - **Hold**: Neutral Trend / Sideways Market.
+
+    **OUTPUT FORMAT (STRICT JSON)**:
+    {{"recommendation": "Strong Buy" | "Buy" | "Hold" | "Sell" | "Strong Sell", "confidence": 0.0 to 1.0, "reasoning": "Explain the decision. If signals conflict, explain why the Trend won out (e.g., 'Despite weak fundamentals, the strong technical breakout dictates a speculative Buy')."}}
+
+    Return ONLY the JSON.
+    """)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _round(obj, decimals: int):
+    if isinstance(obj, float):
+        return round(obj, decimals)
+    if isinstance(obj, dict):
+        return {k: _round(v, decimals) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_round(v, decimals) for v in obj]
+    return obj
+
+
+def compact_json(obj, decimals: int = VALUE_DECIMALS) -> str:
+    return json.dumps(_round(obj, decimals), separators=(",", ":"))
+
+
+def _num(x, decimals: int) -> str:
+    if x is None:
+        return ""
+    if isinstance(x, float):
+        text = f"{round(x, decimals):.{decimals}f}"
+        # %g-style: drops trailing zeros (101.50 -> 101.5), but only after the
+        # decimal point (1500000.0 at 0 decimals stays 1500000)
+        return text.rstrip("0").rstrip(".") if decimals > 0 else text
+    return str(x)
+
+
+def price_table(stock_data: List[Dict], budget: int, rows: int = PRICE_ROWS, decimals: int = PRICE_DECIMALS) -> str:
+    """Latest-first CSV of the last `rows` bars, dropping the oldest rows to fit `budget` tokens."""
+    lines = ["date,open,high,low,close,volume"]
+    used = estimate_tokens(lines[0]) + 1
+    for bar in stock_data[:rows]:
+        line = ",".join([
+            str(bar.get("date")),
+            _num(bar.get("open"), decimals),
+            _num(bar.get("high"), decimals),
+            _num(bar.get("low"), decimals),
+            _num(bar.get("close"), decimals),
+            _num(bar.get("volume"), 0),
+        ])
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def _fit_json(obj, budget: int) -> str:
+    text = compact_json(obj)
+    if estimate_tokens(text) <= budget or not isinstance(obj, dict):
+        return text
+    # Over budget: drop empty fields first, then trailing keys
+    items = [(k, v) for k, v in obj.items() if v is not None]
+    while items and estimate_tokens(compact_json(dict(items))) > budget:
+        items.pop()
+    return compact_json(dict(items))
+
+
+def news_lines(news_input: List[Dict], budget: int) -> str:
+    items = []
+    for n in news_input:
+        headline = (n.get("headline") or "")[:HEADLINE_CHARS]
+        item = {"headline": headline}
+        if n.get("sentiment") is not None:
+            item["sentiment"] = n["sentiment"]
+        if estimate_tokens(compact_json(items + [item])) > budget:
+            break
+        items.append(item)
+    return compact_json(items)
+
+
+def build_analysis_prompt(stock_data: List[Dict], tech_ind: Dict, fund_input: Dict, news_input: List[Dict],
+                          market_regime: str, budgets: Dict[str, int] | None = None) -> Tuple[str, Dict[str, int]]:
+    """Returns (prompt, token estimates per section plus "total")."""
+    budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+    sections = {
+        "prices": price_table(stock_data, budgets["prices"]),
+        "indicators": _fit_json(tech_ind, budgets["indicators"]),
+        "fundamentals": _fit_json(fund_input, budgets["fundamentals"]),
+        "news": news_lines(news_input, budgets["news"]),
+    }
+    prompt = ANALYSIS_TEMPLATE.format(market_regime=market_regime, **sections)
+    report = {name: estimate_tokens(text) for name, text in sections.items()}
+    report["total"] = estimate_tokens(prompt)
+    return prompt, report
@@ -0,0 +1,120 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each hitting the upstream provider. Nothing is cached: once the
+call finishes the next caller starts a fresh one (pair with utils.cache for
+that).
+"""
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Thread-based: for blocking provider calls run in worker threads."""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self):
+        return {"name": self.name, "in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+class AsyncSingleFlight:
+    """asyncio-based: followers await the leader's task."""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable], *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            self.leaders += 1
+            task.add_done_callback(lambda _t, key=key: self._tasks.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: one caller giving up (client disconnect, stage timeout) must
+        # not cancel the computation the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"name": self.name, "in_flight": len(self._tasks), "leaders": self.leaders, "shared": self.shared}
+
+
+_groups: Dict[str, Any] = {}
+
+
+def _key(args, kwargs) -> Hashable:
+    return (args, tuple(sorted(kwargs.items())))
+
+
+def single_flight(fn: Callable):
+    """Coalesce concurrent calls of a blocking function with equal (hashable) arguments."""
+    group = _groups[f"{fn.__module__}.{fn.__qualname__}"] = SingleFlight(fn.__qualname__)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return group.do(_key(args, kwargs), fn, *args, **kwargs)
+    return wrapper
+
+
+def single_flight_async(fn: Callable):
+    """Coalesce concurrent awaits of a coroutine function with equal (hashable) arguments."""
+    group = _groups[f"{fn.__module__}.{fn.__qualname__}"] = AsyncSingleFlight(fn.__qualname__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await group.do(_key(args, kwargs), fn, *args, **kwargs)
+    return wrapper
+
+
+def register(name: str, group):
+    _groups[name] = group
+    return group
+
+
+def single_flight_stats():
+    return {name: group.stats() for name, group in _groups.items()}
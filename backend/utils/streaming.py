@@ -0,0 +1,462 @@
+"""
+Incremental indicator state.
+
+Each indicator keeps just enough state (a fixed-size window with running sums,
+or the previous EMA value) to absorb one new bar in constant time, and gives
+the same values as the batch functions in utils.indicators. States serialize
+to plain JSON-friendly dicts so they can be stored per symbol and restored
+when the next bar arrives.
+"""
+import json
+import math
+from collections import deque
+from typing import Dict, List
+
+from utils.indicators import IndicatorFrame, _to_float
+
+# Running sums drift slightly as values enter and leave the window; rebuild
+# them from the window contents this often (amortized O(1)).
+_RESYNC_EVERY = 512
+
+_NAN = float("nan")
+
+
+def _isnan(x: float) -> bool:
+    return x != x
+
+
+def _out(x: float) -> float | None:
+    return None if _isnan(x) else float(x)
+
+
+def _enc(x):
+    return None if isinstance(x, float) and _isnan(x) else x
+
+
+def _dec(x):
+    return _NAN if x is None else x
+
+
+class _Window:
+    """Fixed-size rolling window with running sum, sum of squares and NaN/zero counts."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self._reset_sums()
+
+    def _reset_sums(self):
+        # Sums are taken around a shift so the variance does not suffer from
+        # cancellation on price-sized numbers.
+        finite = [v for v in self.values if not _isnan(v)]
+        self.shift = finite[0] if finite else 0.0
+        self.total = sum(v - self.shift for v in finite)
+        self.total_sq = sum((v - self.shift) ** 2 for v in finite)
+        self.nans = len(self.values) - len(finite)
+        self.zeros = sum(1 for v in finite if v == 0)
+        self.pushes = 0
+
+    def push(self, x: float):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            if _isnan(old):
+                self.nans -= 1
+            else:
+                self.total -= old - self.shift
+                self.total_sq -= (old - self.shift) ** 2
+                if old == 0:
+                    self.zeros -= 1
+        self.values.append(x)
+        if _isnan(x):
+            self.nans += 1
+        else:
+            self.total += x - self.shift
+            self.total_sq += (x - self.shift) ** 2
+            if x == 0:
+                self.zeros += 1
+        self.pushes += 1
+        if self.pushes >= _RESYNC_EVERY:
+            self._reset_sums()
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.size and self.nans == 0
+
+    def mean(self) -> float:
+        if not self.ready:
+            return _NAN
+        if self.zeros == self.size:
+            return 0.0
+        return self.shift + self.total / self.size
+
+    def std(self, ddof: int = 1) -> float:
+        if not self.ready or self.size <= ddof:
+            return _NAN
+        n = self.size
+        var = (self.total_sq - self.total * self.total / n) / (n - ddof)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self) -> Dict:
+        return {"size": self.size, "values": [_enc(v) for v in self.values]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "_Window":
+        w = cls(data["size"])
+        w.values.extend(_dec(v) for v in data["values"])
+        w._reset_sums()
+        return w
+
+
+class StreamingIndicator:
+    """Base class: subclasses implement _push(bar) and value()."""
+
+    kind = ""
+
+    def update(self, bar: Dict):
+        close = _to_float(bar.get("close"))
+        if _isnan(close):
+            # Batch indicators drop rows without a valid close
+            return self.value()
+        self._push(close, _to_float(bar.get("high")), _to_float(bar.get("low")))
+        return self.value()
+
+    def _push(self, close: float, high: float, low: float):
+        raise NotImplementedError
+
+    def value(self):
+        raise NotImplementedError
+
+    def params(self) -> List:
+        raise NotImplementedError
+
+    def to_dict(self) -> Dict:
+        raise NotImplementedError
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        raise NotImplementedError
+
+
+class StreamingSMA(StreamingIndicator):
+    kind = "sma"
+
+    def __init__(self, window: int):
+        self.window = _Window(window)
+
+    def _push(self, close, high, low):
+        self.window.push(close)
+
+    def value(self):
+        return _out(self.window.mean())
+
+    def params(self):
+        return [self.window.size]
+
+    def to_dict(self):
+        return {"window": self.window.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["window"]["size"])
+        obj.window = _Window.from_dict(data["window"])
+        return obj
+
+
+class StreamingEMA(StreamingIndicator):
+    kind = "ema"
+
+    def __init__(self, span: int):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.current = _NAN
+
+    def push_value(self, x: float):
+        if _isnan(x):
+            return
+        if _isnan(self.current):
+            self.current = x
+        else:
+            self.current = self.alpha * x + (1 - self.alpha) * self.current
+
+    def _push(self, close, high, low):
+        self.push_value(close)
+
+    def value(self):
+        return _out(self.current)
+
+    def params(self):
+        return [self.span]
+
+    def to_dict(self):
+        return {"span": self.span, "current": _enc(self.current)}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["span"])
+        obj.current = _dec(data["current"])
+        return obj
+
+
+class StreamingRSI(StreamingIndicator):
+    kind = "rsi"
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = _NAN
+        self.gains = _Window(period)
+        self.losses = _Window(period)
+
+    def _push(self, close, high, low):
+        delta = close - self.prev_close
+        self.gains.push(max(delta, 0.0) if not _isnan(delta) else _NAN)
+        self.losses.push(max(-delta, 0.0) if not _isnan(delta) else _NAN)
+        self.prev_close = close
+
+    def value(self):
+        gain = self.gains.mean()
+        loss = self.losses.mean()
+        if _isnan(gain) or _isnan(loss) or loss == 0:
+            return None
+        return float(100 - (100 / (1 + gain / loss)))
+
+    def params(self):
+        return [self.period]
+
+    def to_dict(self):
+        return {
+            "period": self.period,
+            "prev_close": _enc(self.prev_close),
+            "gains": self.gains.to_dict(),
+            "losses": self.losses.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["period"])
+        obj.prev_close = _dec(data["prev_close"])
+        obj.gains = _Window.from_dict(data["gains"])
+        obj.losses = _Window.from_dict(data["losses"])
+        return obj
+
+
+class StreamingMACD(StreamingIndicator):
+    kind = "macd"
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.count = 0
+
+    def _push(self, close, high, low):
+        self.fast.push_value(close)
+        self.slow.push_value(close)
+        self.signal.push_value(self.fast.current - self.slow.current)
+        self.count += 1
+
+    def value(self):
+        if self.count < self.slow.span:
+            return None
+        line = self.fast.current - self.slow.current
+        return {
+            "line": float(line),
+            "signal": float(self.signal.current),
+            "hist": float(line - self.signal.current)
+        }
+
+    def params(self):
+        return [self.fast.span, self.slow.span, self.signal.span]
+
+    def to_dict(self):
+        return {
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "signal": self.signal.to_dict(),
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls()
+        obj.fast = StreamingEMA.from_dict(data["fast"])
+        obj.slow = StreamingEMA.from_dict(data["slow"])
+        obj.signal = StreamingEMA.from_dict(data["signal"])
+        obj.count = data["count"]
+        return obj
+
+
+class StreamingBollinger(StreamingIndicator):
+    kind = "bollinger"
+
+    def __init__(self, window=20, num_std=2):
+        self.window = _Window(window)
+        self.num_std = num_std
+
+    def _push(self, close, high, low):
+        self.window.push(close)
+
+    def value(self):
+        if len(self.window.values) < self.window.size:
+            return None
+        sma = self.window.mean()
+        std = self.window.std()
+        return {
+            "upper": float(sma + std * self.num_std),
+            "middle": float(sma),
+            "lower": float(sma - std * self.num_std)
+        }
+
+    def params(self):
+        return [self.window.size, self.num_std]
+
+    def to_dict(self):
+        return {"window": self.window.to_dict(), "num_std": self.num_std}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["window"]["size"], data["num_std"])
+        obj.window = _Window.from_dict(data["window"])
+        return obj
+
+
+class StreamingADX(StreamingIndicator):
+    kind = "adx"
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev = [_NAN, _NAN, _NAN]  # high, low, close
+        self.count = 0
+        self.tr = _Window(period)
+        self.dm_plus = _Window(period)
+        self.dm_minus = _Window(period)
+        self.dx = _Window(period)
+
+    def _push(self, close, high, low):
+        prev_high, prev_low, prev_close = self.prev
+        parts = [abs(high - low), abs(high - prev_close), abs(low - prev_close)]
+        finite = [p for p in parts if not _isnan(p)]
+        self.tr.push(max(finite) if finite else _NAN)
+        up = high - prev_high
+        down = prev_low - low
+        self.dm_plus.push(max(up, 0.0) if up > down else 0.0)
+        self.dm_minus.push(max(down, 0.0) if down > up else 0.0)
+        atr = self.tr.mean()
+        plus_di = 100 * _div(self.dm_plus.mean(), atr)
+        minus_di = 100 * _div(self.dm_minus.mean(), atr)
+        self.dx.push(100 * _div(abs(plus_di - minus_di), plus_di + minus_di))
+        self.prev = [high, low, close]
+        self.count += 1
+
+    def value(self):
+        if self.count < self.period + 1:
+            return None
+        return _out(self.dx.mean())
+
+    def params(self):
+        return [self.period]
+
+    def to_dict(self):
+        return {
+            "period": self.period,
+            "prev": [_enc(v) for v in self.prev],
+            "count": self.count,
+            "tr": self.tr.to_dict(),
+            "dm_plus": self.dm_plus.to_dict(),
+            "dm_minus": self.dm_minus.to_dict(),
+            "dx": self.dx.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["period"])
+        obj.prev = [_dec(v) for v in data["prev"]]
+        obj.count = data["count"]
+        for name in ("tr", "dm_plus", "dm_minus", "dx"):
+            setattr(obj, name, _Window.from_dict(data[name]))
+        return obj
+
+
+def _div(a: float, b: float) -> float:
+    # IEEE semantics like NumPy: x/0 -> +-inf, 0/0 -> nan
+    if _isnan(a) or _isnan(b):
+        return _NAN
+    if b == 0:
+        return _NAN if a == 0 else math.copysign(math.inf, a)
+    return a / b
+
+
+STREAMING_KINDS = {
+    cls.kind: cls
+    for cls in (StreamingSMA, StreamingEMA, StreamingRSI, StreamingMACD, StreamingBollinger, StreamingADX)
+}
+
+
+class IndicatorState:
+    """
+    A named set of streaming indicators for one symbol, using the same spec
+    format as IndicatorFrame.compute(), e.g. {"SMA_20": ("sma", 20)}.
+
+    Bars must arrive in date order; a bar dated at or before the last one
+    seen is ignored.
+    """
+
+    def __init__(self, spec: Dict):
+        self.indicators: Dict[str, StreamingIndicator] = {}
+        for name, args in spec.items():
+            if isinstance(args, str):
+                args = (args,)
+            kind, params = args[0], args[1:]
+            if kind not in STREAMING_KINDS:
+                raise ValueError(f"Unknown streaming indicator: {kind}")
+            self.indicators[name] = STREAMING_KINDS[kind](*params)
+        self.last_date: str | None = None
+
+    @classmethod
+    def from_history(cls, prices: List[Dict], spec: Dict) -> "IndicatorState":
+        state = cls(spec)
+        frame = IndicatorFrame(prices)
+        for i in range(len(frame)):
+            state.update({
+                "date": str(frame.dates[i]),
+                "high": frame.high[i],
+                "low": frame.low[i],
+                "close": frame.close[i],
+            })
+        return state
+
+    def update(self, bar: Dict) -> Dict:
+        date = str(bar.get("date"))
+        if self.last_date is not None and date <= self.last_date:
+            return self.values()
+        for ind in self.indicators.values():
+            ind.update(bar)
+        if not _isnan(_to_float(bar.get("close"))):
+            self.last_date = date
+        return self.values()
+
+    def values(self) -> Dict:
+        return {name: ind.value() for name, ind in self.indicators.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            "last_date": self.last_date,
+            "indicators": {
+                name: {"kind": ind.kind, "state": ind.to_dict()}
+                for name, ind in self.indicators.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "IndicatorState":
+        state = cls({})
+        state.last_date = data.get("last_date")
+        for name, item in data["indicators"].items():
+            state.indicators[name] = STREAMING_KINDS[item["kind"]].from_dict(item["state"])
+        return state
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, raw: str) -> "IndicatorState":
+        return cls.from_dict(json.loads(raw))